@@ -0,0 +1,141 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER_CODE = """
+import json
+import sys
+from controllers.accessLog import AccessLog
+from controllers.server import httpServer
+from controllers.asyncServer import asyncHttpServer
+options = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+if 'access_log' in options:
+    options['access_log'] = AccessLog(options['access_log'])
+server_class = asyncHttpServer if len(sys.argv) > 4 and sys.argv[4] == 'asyncio' else httpServer
+server = server_class(port=int(sys.argv[1]), type=sys.argv[2], **options)
+server.start()
+"""
+
+
+def free_port() -> int:
+    """
+    Retorna uma porta TCP livre na interface local.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    """
+    Espera até o servidor aceitar conexões.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Servidor não respondeu em {host}:{port}")
+
+
+@contextmanager
+def run_server(port: int, server_type: str = 'ipv4', mode: str = 'selectors', workdir: Optional[str] = None, **options):
+    """
+    Sobe o servidor em um subprocesso e o encerra ao sair do contexto.
+    `mode` escolhe o backend (selectors ou asyncio) e `options` são repassadas ao
+    construtor do servidor (ex.: metrics=False; `access_log` é o caminho do log ou None).
+    `workdir` é o diretório de trabalho do servidor (o banco fica em `<workdir>/models`).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.Popen(
+        [sys.executable, '-c', SERVER_CODE, str(port), server_type, json.dumps(options), mode],
+        cwd=workdir or ROOT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        host = '::1' if server_type == 'ipv6' else '127.0.0.1'
+        wait_for_port(host, port)
+        yield proc
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def http_request(host: str, port: int, raw_request: bytes, timeout: float = 10.0) -> bytes:
+    """
+    Envia uma requisição em uma nova conexão e lê a resposta até o servidor fechar.
+    """
+    with socket.create_connection((host, port), timeout=timeout) as s:
+        s.sendall(raw_request)
+        chunks = []
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return b''.join(chunks)
+
+
+class KeepAliveClient:
+    """
+    Cliente HTTP/1.1 que reaproveita a mesma conexão entre requisições.
+    """
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.buffer = bytearray()
+
+    def send(self, raw_request: bytes):
+        self.sock.sendall(raw_request)
+
+    def read_response(self) -> bytes:
+        """
+        Lê exatamente uma resposta (headers + `Content-Length` bytes de body).
+        """
+        while b'\r\n\r\n' not in self.buffer:
+            self._fill()
+        header_end = self.buffer.index(b'\r\n\r\n') + 4
+        content_length = 0
+        for line in bytes(self.buffer[:header_end]).split(b'\r\n'):
+            if line.lower().startswith(b'content-length:'):
+                content_length = int(line.split(b':', 1)[1])
+        total = header_end + content_length
+        while len(self.buffer) < total:
+            self._fill()
+        response = bytes(self.buffer[:total])
+        del self.buffer[:total]
+        return response
+
+    def request(self, raw_request: bytes) -> bytes:
+        self.send(raw_request)
+        return self.read_response()
+
+    def _fill(self):
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError('Conexão fechada pelo servidor')
+        self.buffer += data
+
+    def close(self):
+        self.sock.close()
+
+
+def percentile(samples: list, p: float) -> float:
+    """
+    Percentil p (0-100) de uma lista de amostras.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,73 @@
+"""
+Benchmark de conexões persistentes.
+
+Compara a vazão de GET /health abrindo uma conexão por requisição, reaproveitando a
+conexão com keep-alive e enviando requisições em pipeline na mesma escrita.
+
+Uso: python -m bench.keepalive [--requests 5000] [--pipeline 16]
+"""
+import argparse
+import time
+
+from bench.common import KeepAliveClient, free_port, http_request, run_server
+
+CLOSE_REQUEST = b'GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'
+KEEPALIVE_REQUEST = b'GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n'
+
+
+def bench_close(port: int, total: int) -> float:
+    start = time.perf_counter()
+    for _ in range(total):
+        http_request('127.0.0.1', port, CLOSE_REQUEST)
+    return total / (time.perf_counter() - start)
+
+
+def bench_keepalive(port: int, total: int, max_requests: int) -> float:
+    start = time.perf_counter()
+    done = 0
+    while done < total:
+        client = KeepAliveClient('127.0.0.1', port)
+        # O servidor fecha a conexão após `max_requests` requisições
+        for _ in range(min(max_requests, total - done)):
+            client.request(KEEPALIVE_REQUEST)
+            done += 1
+        client.close()
+    return total / (time.perf_counter() - start)
+
+
+def bench_pipeline(port: int, total: int, depth: int, max_requests: int) -> float:
+    start = time.perf_counter()
+    done = 0
+    client = KeepAliveClient('127.0.0.1', port)
+    served = 0
+    while done < total:
+        batch = min(depth, total - done, max_requests - served)
+        client.send(KEEPALIVE_REQUEST * batch)
+        for _ in range(batch):
+            client.read_response()
+        done += batch
+        served += batch
+        if served == max_requests:
+            client.close()
+            client = KeepAliveClient('127.0.0.1', port)
+            served = 0
+    client.close()
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--pipeline', type=int, default=16)
+    parser.add_argument('--max-requests', type=int, default=100, help='max_keepalive_requests do servidor')
+    args = parser.parse_args()
+
+    port = free_port()
+    with run_server(port):
+        print(f"connection: close   req/s={bench_close(port, args.requests):>9.1f}")
+        print(f"keep-alive          req/s={bench_keepalive(port, args.requests, args.max_requests):>9.1f}")
+        print(f"pipeline ({args.pipeline:>3})      req/s={bench_pipeline(port, args.requests, args.pipeline, args.max_requests):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Benchmark de carga e de regressão do servidor.
+
+Sobe o servidor localmente (IPv4, IPv6 ou Dual, backend selectors ou asyncio) e, para cada
+cenário, mantém `--concurrency` conexões keep-alive fazendo requisições sem pausa durante
+`--duration` segundos. Os clientes rodam em `--client-procs` processos com asyncio, para
+o gerador de carga não ser o gargalo. Cenários: GET /, GET /health, GET /api/data e
+POST /api/data com bodies de vários tamanhos (`--body-sizes`).
+
+Mostra req/s e latências p50/p99/p999 de cada cenário e grava tudo em JSON (`--output`).
+Com `--baseline`, compara com um resultado anterior e sai com código 1 se a vazão de algum
+cenário caiu mais que `--max-regression` por cento.
+
+O servidor roda em um diretório temporário com uma cópia de models/fake_db.json, para os
+POSTs não alterarem o banco do repositório.
+
+Uso: python -m bench.load [--types ipv4,ipv6,dual] [--mode selectors] [--concurrency 16]
+         [--duration 5] [--body-sizes 64,4096,65536] [--output bench/results/atual.json]
+         [--baseline bench/results/base.json] [--max-regression 10]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from bench.common import ROOT_DIR, free_port, percentile, run_server
+
+GET_SCENARIOS = [
+    ('GET /', b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n'),
+    ('GET /health', b'GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n'),
+    ('GET /api/data', b'GET /api/data HTTP/1.1\r\nHost: localhost\r\n\r\n'),
+]
+HOSTS = {'ipv4': ['127.0.0.1'], 'ipv6': ['::1'], 'dual': ['127.0.0.1', '::1']}
+
+
+def post_request(size: int, client_id: int) -> bytes:
+    """
+    POST /api/data com um body JSON de `size` bytes. Cada conexão sobrescreve a própria
+    chave, para o banco não crescer durante o teste.
+    """
+    prefix = f'{{"bench-{client_id}": "'.encode('utf-8')
+    body = prefix + b'x' * max(0, size - len(prefix) - 2) + b'"}'
+    return (
+        b'POST /api/data HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+        b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\n\r\n' + body
+    )
+
+
+def scenarios(body_sizes: list) -> list:
+    """
+    Lista de (nome, fábrica da requisição por conexão).
+    """
+    result = [(name, lambda client_id, raw=raw: raw) for name, raw in GET_SCENARIOS]
+    for size in body_sizes:
+        result.append((f'POST /api/data {size}B', lambda client_id, size=size: post_request(size, client_id)))
+    return result
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """
+    Lê uma resposta com `Content-Length` e devolve o status.
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    content_length = 0
+    for line in head.split(b'\r\n'):
+        if line[:15].lower() == b'content-length:':
+            content_length = int(line[15:])
+    if content_length:
+        await reader.readexactly(content_length)
+    if b'connection: close' in head.lower():
+        raise ConnectionResetError('Servidor fechou a conexão')
+    return status
+
+
+async def client_loop(host: str, port: int, raw: bytes, deadline: float, warmup_until: float, latencies: list, counters: dict):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            writer.write(raw)
+            status = await read_response(reader)
+            end = time.perf_counter()
+            if start < warmup_until:
+                continue
+            if status < 400:
+                latencies.append(end - start)
+            else:
+                counters['errors'] += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            # Conexão fechada pelo servidor (ex.: max_keepalive_requests): reconecta
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            if time.perf_counter() >= warmup_until:
+                counters['reconnects'] += 1
+    if writer is not None:
+        writer.close()
+
+
+def run_clients(args: tuple) -> dict:
+    """
+    Executa as conexões de um processo cliente.
+    """
+    hosts, port, requests, duration, warmup = args
+
+    async def main():
+        latencies = []
+        counters = {'errors': 0, 'reconnects': 0}
+        warmup_until = time.perf_counter() + warmup
+        deadline = warmup_until + duration
+        await asyncio.gather(*(
+            client_loop(hosts[i % len(hosts)], port, raw, deadline, warmup_until, latencies, counters)
+            for i, raw in enumerate(requests)
+        ))
+        return {'latencies': latencies, **counters}
+    return asyncio.run(main())
+
+
+def run_scenario(pool, hosts: list, port: int, make_request, concurrency: int, procs: int, duration: float, warmup: float) -> dict:
+    per_proc = [[] for _ in range(procs)]
+    for client_id in range(concurrency):
+        per_proc[client_id % procs].append(make_request(client_id))
+    jobs = [(hosts, port, requests, duration, warmup) for requests in per_proc if requests]
+    results = pool.map(run_clients, jobs)
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    return {
+        'requests': len(latencies),
+        'errors': sum(result['errors'] for result in results),
+        'reconnects': sum(result['reconnects'] for result in results),
+        'req_per_sec': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'p999_ms': round(percentile(latencies, 99.9) * 1000, 3),
+    }
+
+
+def ipv6_available() -> bool:
+    if not socket.has_ipv6:
+        return False
+    try:
+        with socket.socket(socket.AF_INET6, socket.SOCK_STREAM) as s:
+            s.bind(('::1', 0))
+        return True
+    except OSError:
+        return False
+
+
+def prepare_workdir() -> str:
+    """
+    Diretório de trabalho do servidor com uma cópia do banco (o Database usa ./models).
+    """
+    workdir = tempfile.mkdtemp(prefix='bench-load-')
+    os.mkdir(os.path.join(workdir, 'models'))
+    shutil.copy(os.path.join(ROOT_DIR, 'models', 'fake_db.json'), os.path.join(workdir, 'models', 'fake_db.json'))
+    return workdir
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results: list, baseline: dict, max_regression: float) -> bool:
+    """
+    Mostra a diferença para o baseline. Retorna False se algum cenário regrediu além do limite.
+    """
+    previous = {(r['server_type'], r['scenario'], r['concurrency']): r for r in baseline.get('results', [])}
+    ok = True
+    matched = 0
+    print(f"\nComparação com o baseline ({baseline.get('meta', {}).get('revision') or 'sem revisão'}):")
+    for result in results:
+        old = previous.get((result['server_type'], result['scenario'], result['concurrency']))
+        if not old or not old['req_per_sec']:
+            continue
+        matched += 1
+        delta = (result['req_per_sec'] - old['req_per_sec']) / old['req_per_sec'] * 100
+        p99_delta = result['p99_ms'] - old['p99_ms']
+        regressed = delta < -max_regression
+        ok &= not regressed
+        print(
+            f"{result['server_type']:<5} {result['scenario']:<24} req/s {delta:+7.1f}%  "
+            f"p99 {p99_delta:+8.3f}ms{'  REGRESSÃO' if regressed else ''}"
+        )
+    if not matched:
+        print("Nenhum cenário em comum (mesmo tipo de servidor, cenário e concorrência)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--types', default='ipv4', help='ipv4, ipv6 e/ou dual, separados por vírgula')
+    parser.add_argument('--mode', choices=('selectors', 'asyncio'), default='selectors')
+    parser.add_argument('--concurrency', type=int, default=16, help='conexões simultâneas')
+    parser.add_argument('--client-procs', type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument('--duration', type=float, default=5.0, help='segundos medidos por cenário')
+    parser.add_argument('--warmup', type=float, default=1.0, help='segundos descartados no início de cada cenário')
+    parser.add_argument('--body-sizes', default='64,4096,65536', help='tamanhos dos bodies do POST, em bytes')
+    parser.add_argument('--threads', type=int, default=8, help='pool_size do servidor')
+    parser.add_argument('--output', help='arquivo JSON com os resultados')
+    parser.add_argument('--baseline', help='resultado anterior para comparar')
+    parser.add_argument('--max-regression', type=float, default=10.0, help='queda de req/s tolerada, em %%')
+    args = parser.parse_args()
+
+    body_sizes = [int(size) for size in args.body_sizes.split(',') if size]
+    server_types = [t.strip() for t in args.types.split(',') if t.strip() in HOSTS]
+    if any(t != 'ipv4' for t in server_types) and not ipv6_available():
+        print('IPv6 indisponível nesta máquina; rodando só ipv4')
+        server_types = ['ipv4']
+
+    workdir = prepare_workdir()
+    results = []
+    try:
+        with multiprocessing.Pool(args.client_procs) as pool:
+            for server_type in server_types:
+                port = free_port()
+                # Sem log de acesso e sem limite de requisições por conexão: mede o servidor, não o log
+                with run_server(port, server_type, mode=args.mode, workdir=workdir, pool_size=args.threads,
+                                max_keepalive_requests=1000000, access_log=None):
+                    for name, make_request in scenarios(body_sizes):
+                        result = run_scenario(pool, HOSTS[server_type], port, make_request, args.concurrency,
+                                              args.client_procs, args.duration, args.warmup)
+                        result = {'server_type': server_type, 'scenario': name, 'concurrency': args.concurrency, **result}
+                        results.append(result)
+                        print(
+                            f"{server_type:<5} {name:<24} req/s={result['req_per_sec']:>9.1f}  p50={result['p50_ms']:>7.3f}ms  "
+                            f"p99={result['p99_ms']:>7.3f}ms  p999={result['p999_ms']:>7.3f}ms  erros={result['errors']}"
+                        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'mode': args.mode,
+            'client_procs': args.client_procs,
+            'duration': args.duration,
+            'threads': args.threads,
+        },
+        'results': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em {args.output}")
+
+    ok = all(result['requests'] for result in results)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            ok &= compare(results, json.load(f), args.max_regression)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark do custo das métricas.
+
+Mede o HttpRouter.route em processo (sem rede) e a vazão de GET com keep-alive contra o
+servidor, com as métricas ligadas e desligadas, e mostra a diferença percentual.
+
+Uso: python -m bench.metrics_overhead [--iterations 50000] [--requests 5000]
+"""
+import argparse
+import time
+
+from bench.common import KeepAliveClient, free_port, run_server
+from controllers.httpRequest import HttpRequest
+from controllers.httpRouter import HttpRouter
+from controllers.metrics import Metrics
+
+REQUESTS = [
+    b'GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n',
+    b'GET /info HTTP/1.1\r\nHost: localhost\r\n\r\n',
+    b'GET /nao-existe HTTP/1.1\r\nHost: localhost\r\n\r\n',
+]
+
+
+def bench_router(enabled: bool, iterations: int) -> float:
+    router = HttpRouter(metrics=Metrics(enabled=enabled))
+    requests = [REQUESTS[i % len(REQUESTS)] for i in range(iterations)]
+    start = time.perf_counter()
+    for raw in requests:
+        router.route(HttpRequest(raw))
+    return iterations / (time.perf_counter() - start)
+
+
+def bench_server(enabled: bool, total: int) -> float:
+    port = free_port()
+    with run_server(port, metrics=enabled, pool_size=0):
+        client = KeepAliveClient('127.0.0.1', port)
+        served = 0
+        start = time.perf_counter()
+        for i in range(total):
+            if served == 100:
+                # max_keepalive_requests padrão do servidor
+                client.close()
+                client = KeepAliveClient('127.0.0.1', port)
+                served = 0
+            client.request(REQUESTS[i % len(REQUESTS)])
+            served += 1
+        elapsed = time.perf_counter() - start
+        client.close()
+    return total / elapsed
+
+
+def report(name: str, off: float, on: float):
+    overhead = (off - on) / off * 100
+    print(f"{name:<8} sem métricas req/s={off:>10.1f}  com métricas req/s={on:>10.1f}  custo={overhead:>5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50000, help='chamadas ao HttpRouter.route')
+    parser.add_argument('--requests', type=int, default=5000, help='requisições HTTP ao servidor')
+    args = parser.parse_args()
+
+    report('router', bench_router(False, args.iterations), bench_router(True, args.iterations))
+    report('servidor', bench_server(False, args.requests), bench_server(True, args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Microbenchmark do parser de requisições.
+
+Compara o HttpRequest atual (bytes/memoryview, headers e body sob demanda) com o parser
+anterior, que decodificava a requisição inteira para str e a dividia em linhas.
+Mede requisições/s e alocações por requisição (tracemalloc) para um GET pequeno e um
+POST de 1 MB.
+
+Uso: python -m bench.parser_bench [--iterations 20000]
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+from controllers.httpRequest import HttpRequest
+from models.httpMethods import HttpMethod
+
+
+class LegacyHttpRequest:
+    """
+    Parser anterior, mantido aqui só como referência de comparação.
+    """
+    def __init__(self, raw_request: bytes):
+        self.raw_request = raw_request.decode('utf-8', errors='ignore')
+        self.method: Optional[HttpMethod] = None
+        self.path: str = ""
+        self.version: str = ""
+        self.headers: Dict[str, str] = {}
+        self.body: str = ""
+        self.query_params: Dict[str, str] = {}
+        self._parse_request()
+
+    def _parse_request(self):
+        lines = self.raw_request.split('\r\n')
+        if not lines:
+            return
+        first_line = lines[0].split()
+        if len(first_line) >= 3:
+            try:
+                self.method = HttpMethod(first_line[0])
+            except ValueError:
+                self.method = None
+            full_path = first_line[1]
+            if '?' in full_path:
+                self.path, query_string = full_path.split('?', 1)
+                for param in query_string.split('&'):
+                    if '=' in param:
+                        key, value = param.split('=', 1)
+                        self.query_params[key] = value
+            else:
+                self.path = full_path
+            self.version = first_line[2]
+        header_end = 0
+        for i, line in enumerate(lines[1:], 1):
+            if line == '':
+                header_end = i + 1
+                break
+            if ':' in line:
+                key, value = line.split(':', 1)
+                self.headers[key.strip().lower()] = value.strip()
+        if header_end < len(lines):
+            self.body = '\r\n'.join(lines[header_end:])
+
+
+SMALL_GET = (
+    b'GET /health?verbose=1 HTTP/1.1\r\n'
+    b'Host: localhost:8080\r\n'
+    b'User-Agent: bench/1.0\r\n'
+    b'Accept: */*\r\n'
+    b'Connection: keep-alive\r\n\r\n'
+)
+BIG_BODY = b'{"payload": "' + b'x' * (1024 * 1024) + b'"}'
+BIG_POST = (
+    b'POST /api/data HTTP/1.1\r\n'
+    b'Host: localhost:8080\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Content-Length: ' + str(len(BIG_BODY)).encode() + b'\r\n\r\n' + BIG_BODY
+)
+
+
+def route_only(request):
+    # O que o servidor precisa para rotear: método, path e o header Connection
+    return request.method, request.path, request.headers.get('connection')
+
+
+def with_body(request):
+    return route_only(request), len(request.body)
+
+
+def measure(parser, raw: bytes, access, iterations: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        access(parser(raw))
+    elapsed = time.perf_counter() - start
+
+    # Mantém as requisições vivas para contar o que cada uma aloca e retém
+    sample = min(iterations, 200)
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(sample):
+        request = parser(raw)
+        access(request)
+        kept.append(request)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    allocations = sum(max(stat.count_diff, 0) for stat in stats)
+    size = sum(max(stat.size_diff, 0) for stat in stats)
+    del kept
+
+    return {
+        'req_per_sec': iterations / elapsed,
+        'allocs_per_req': allocations / sample,
+        'kb_per_req': size / sample / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    scenarios = [
+        ('GET pequeno', SMALL_GET, route_only, args.iterations),
+        ('POST 1 MB (sem ler body)', BIG_POST, route_only, max(args.iterations // 100, 10)),
+        ('POST 1 MB (lendo body)', BIG_POST, with_body, max(args.iterations // 100, 10)),
+    ]
+    for name, raw, access, iterations in scenarios:
+        for label, cls in (('anterior', LegacyHttpRequest), ('bytes', HttpRequest)):
+            result = measure(cls, raw, access, iterations)
+            print(
+                f"{name:<26} {label:<9} req/s={result['req_per_sec']:>11.1f}  "
+                f"allocs/req={result['allocs_per_req']:>6.1f}  mem/req={result['kb_per_req']:>9.1f} KB"
+            )
+
+
+if __name__ == '__main__':
+    main()
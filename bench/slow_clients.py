@@ -0,0 +1,137 @@
+"""
+Benchmark de carga com clientes lentos.
+
+Abre muitas conexões que enviam os headers byte a byte (sem nunca terminar a requisição)
+e, ao mesmo tempo, mede vazão e latência de clientes rápidos. Com o loop de eventos,
+a vazão e o p99 dos clientes rápidos devem se manter próximos do cenário sem clientes lentos.
+O servidor sobe com `header_timeout` curto: os clientes lentos devem ser desconectados
+(408) ao fim do prazo, mesmo mandando um byte por segundo. Sai com código 1 se algum
+cliente rápido falhou ou se algum cliente lento não foi desconectado.
+
+Uso: python -m bench.slow_clients [--slow 1000] [--fast 16] [--duration 5] [--header-timeout 2] [--mode selectors]
+"""
+import argparse
+import socket
+import sys
+import threading
+import time
+
+from bench.common import free_port, http_request, percentile, run_server
+
+REQUEST = b'GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'
+SLOW_PREFIX = b'GET / HTTP/1.1\r\nHost: localhost\r\nX-Slow: '
+
+
+def fast_client(port: int, stop: threading.Event, latencies: list, errors: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = http_request('127.0.0.1', port, REQUEST)
+        except OSError:
+            errors.append(1)
+            continue
+        if response.startswith(b'HTTP/1.1 200'):
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(1)
+
+
+def slow_clients(port: int, count: int, stop: threading.Event, result: dict):
+    """
+    Mantém `count` conexões abertas enviando um byte por segundo, e conta quantas o
+    servidor fechou (resposta 408 ou fim da conexão).
+    """
+    sockets = []
+    for _ in range(count):
+        try:
+            s = socket.create_connection(('127.0.0.1', port))
+            s.sendall(SLOW_PREFIX)
+            s.setblocking(False)
+            sockets.append(s)
+        except OSError:
+            break
+    result['opened'] = len(sockets)
+    closed = set()
+    while not stop.wait(1.0):
+        for s in sockets:
+            if s in closed:
+                continue
+            try:
+                # Qualquer retorno (408 ou b'') quer dizer que o servidor respondeu e fechou
+                s.recv(4096)
+                closed.add(s)
+                continue
+            except BlockingIOError:
+                pass
+            except OSError:
+                closed.add(s)
+                continue
+            try:
+                s.send(b'a')
+            except OSError:
+                closed.add(s)
+    result['closed'] = len(closed)
+    for s in sockets:
+        s.close()
+
+
+def run_scenario(port: int, slow: int, fast: int, duration: float) -> dict:
+    stop = threading.Event()
+    latencies, errors = [], []
+    slow_result = {'opened': 0, 'closed': 0}
+    slow_thread = None
+    if slow:
+        slow_thread = threading.Thread(target=slow_clients, args=(port, slow, stop, slow_result))
+        slow_thread.start()
+        time.sleep(1.0)
+
+    threads = [threading.Thread(target=fast_client, args=(port, stop, latencies, errors)) for _ in range(fast)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if slow_thread:
+        slow_thread.join()
+
+    return {
+        'slow_clients': slow_result['opened'],
+        'slow_closed': slow_result['closed'],
+        'requests': len(latencies),
+        'errors': len(errors),
+        'req_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slow', type=int, default=1000)
+    parser.add_argument('--fast', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--header-timeout', type=float, default=2.0)
+    parser.add_argument('--mode', choices=('selectors', 'asyncio'), default='selectors')
+    args = parser.parse_args()
+
+    port = free_port()
+    failed = False
+    with run_server(port, mode=args.mode, header_timeout=args.header_timeout):
+        for slow in (0, args.slow):
+            result = run_scenario(port, slow, args.fast, args.duration)
+            print(
+                f"slow={result['slow_clients']:>6}  desconectados={result['slow_closed']:>6}  "
+                f"req/s={result['req_per_sec']:>9.1f}  p50={result['p50_ms']:.2f}ms  "
+                f"p99={result['p99_ms']:.2f}ms  erros={result['errors']}"
+            )
+            failed |= result['errors'] > 0 or result['requests'] == 0
+            if args.duration > args.header_timeout + 1:
+                failed |= result['slow_closed'] < result['slow_clients']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark da partida a frio do servidor.
+
+Inicia `main.py` várias vezes, como uma instância nova de um autoscaling, e mede o tempo
+desde o início do processo até a porta aceitar conexões (listen) e até a primeira resposta
+de GET /health. Mostra também a partida do próprio interpretador (`python -c pass`), o
+piso que nenhuma otimização do servidor remove.
+
+O servidor roda em um diretório temporário com uma cópia de models/fake_db.json; uma
+partida de aquecimento, fora da medição, converte o banco para shards e deixa o cache de
+bytecode pronto. Com `--profile`, mostra o relatório do `--profile-startup` de uma partida.
+
+Uso: python -m bench.startup [--modes selectors,asyncio] [--runs 20] [--profile]
+         [--output bench/results/startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from bench.common import ROOT_DIR, free_port, percentile
+from bench.load import git_revision, prepare_workdir
+
+HEALTH_REQUEST = b'GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'
+
+
+def first_response(port: int, proc: subprocess.Popen, timeout: float = 10.0) -> tuple:
+    """
+    Tenta GET /health até o servidor responder. Retorna os instantes (time.perf_counter) da
+    primeira conexão aceita e da resposta completa.
+    """
+    deadline = time.perf_counter() + timeout
+    connected_at = None
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"O servidor terminou com código {proc.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=timeout) as s:
+                if connected_at is None:
+                    connected_at = time.perf_counter()
+                s.sendall(HEALTH_REQUEST)
+                response = b''
+                while True:
+                    data = s.recv(65536)
+                    if not data:
+                        break
+                    response += data
+        except (ConnectionRefusedError, ConnectionResetError):
+            time.sleep(0.001)
+            continue
+        if response.startswith(b'HTTP/1.1 200'):
+            return connected_at, time.perf_counter()
+    raise RuntimeError(f"Sem resposta de GET /health em {timeout}s")
+
+
+def start_once(mode: str, workdir: str, extra: list = (), stderr=subprocess.DEVNULL) -> tuple:
+    """
+    Uma partida: (ms até o listen, ms até a primeira resposta, stderr do servidor).
+    """
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT_DIR, 'main.py'), str(port), 'ipv4', '--mode', mode, '--access-log', 'off', *extra],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=stderr,
+    )
+    try:
+        connected_at, responded_at = first_response(port, proc)
+    finally:
+        proc.terminate()
+        _, errors = proc.communicate()
+    return (connected_at - started) * 1000, (responded_at - started) * 1000, errors
+
+
+def interpreter_startup(runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summary(samples: list) -> dict:
+    return {
+        'min_ms': round(min(samples), 2),
+        'p50_ms': round(percentile(samples, 50), 2),
+        'p90_ms': round(percentile(samples, 90), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='selectors,asyncio', help='backends, separados por vírgula')
+    parser.add_argument('--runs', type=int, default=20, help='partidas medidas por backend')
+    parser.add_argument('--profile', action='store_true', help='mostra o --profile-startup de uma partida')
+    parser.add_argument('--output', help='arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip() in ('selectors', 'asyncio')]
+    workdir = prepare_workdir()
+    results = []
+    try:
+        interpreter = summary(interpreter_startup(args.runs))
+        print(f"{'python -c pass':<16} {'':>26} processo={interpreter['p50_ms']:>7.1f}ms (p50)")
+        for mode in modes:
+            # Aquecimento: migração do banco para shards e bytecode compilado
+            start_once(mode, workdir)
+            listen, response = [], []
+            for _ in range(args.runs):
+                listen_ms, response_ms, _ = start_once(mode, workdir)
+                listen.append(listen_ms)
+                response.append(response_ms)
+            result = {'mode': mode, 'listen': summary(listen), 'first_response': summary(response)}
+            results.append(result)
+            print(
+                f"{mode:<16} listen p50={result['listen']['p50_ms']:>7.1f}ms  "
+                f"primeira resposta min={result['first_response']['min_ms']:>7.1f}ms  "
+                f"p50={result['first_response']['p50_ms']:>7.1f}ms  p90={result['first_response']['p90_ms']:>7.1f}ms"
+            )
+            if args.profile:
+                _, _, errors = start_once(mode, workdir, ['--profile-startup'], stderr=subprocess.PIPE)
+                print(errors.decode('utf-8', 'replace'))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'runs': args.runs,
+        },
+        'interpreter': interpreter,
+        'results': results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,173 @@
 import sys
-from models import serverTypes
+from models import serverTypes, serverModes
 
 class Preprocessing:
+    # Opções sem valor: não consomem o argumento seguinte (que pode ser a porta ou o tipo)
+    FLAGS = frozenset(('no-compression', 'compact-json', 'no-metrics', 'no-h2c', 'profile-startup'))
+
     @staticmethod
     def args_parser() -> dict:
         """
         Função de pre-processamento dos argumentos dados ao python.
         Basicamente, é um parser que utiliza os argumentos passados ao interpretador python como parâmetros.
         O primeiro argumento é o número da porta do servidor, e o segundo argumento é o tipo de servidor (IPv4, IPv6, Dual).
-        
+        Opções nomeadas podem vir em qualquer posição, como `--workers 4` ou `--workers=4`:
+            --workers: Número de processos worker (padrão 1, sem supervisor)
+            --mode: Backend do servidor (selectors, asyncio)
+            --threads: Threads do pool que executa os handlers (padrão 8; 0 executa no loop de eventos)
+            --queue-depth: Requisições que podem esperar por uma thread antes do 503 (padrão 64)
+            --static: Diretórios de arquivos estáticos, `prefixo=diretório` separados por vírgula
+                (ex: `--static /assets=./public,/img=./images`)
+            --compress-min-size: Tamanho mínimo do body para comprimir com gzip/deflate (padrão 1024)
+            --no-compression: Desliga a compressão das respostas
+            --compact-json: Gera JSON sem indentação
+            --no-metrics: Desliga a coleta de métricas e a rota /metrics
+            --access-log: Arquivo do log de acesso (padrão `-`, stdout; `off` desliga; `{pid}` vira o pid do worker)
+            --log-format: Formato do log (common, json)
+            --log-level: Nível mínimo do log (debug, info, warning, error)
+            --log-sample: Fração das requisições bem-sucedidas registrada (padrão 1.0)
+            --log-max-bytes: Tamanho que dispara a rotação do arquivo de log (padrão 0, sem rotação)
+            --rate-limit: Requisições por segundo por cliente (padrão 0, sem limite; acima disso 429)
+            --rate-burst: Requisições seguidas permitidas por cliente (padrão: o valor de --rate-limit)
+            --max-conns-per-ip: Conexões simultâneas por cliente (padrão 0, sem limite)
+            --ipv6-prefix: Bits do prefixo que identificam um cliente IPv6 nos limites (padrão 64)
+            --header-timeout: Segundos para receber todos os headers de uma requisição (padrão 10)
+            --body-timeout: Segundos sem receber bytes do body (padrão 30)
+            --write-timeout: Segundos sem conseguir enviar bytes da resposta (padrão 30)
+            --keepalive-timeout: Segundos de ociosidade entre requisições (padrão 5)
+            --drain-timeout: Segundos que o encerramento gracioso (SIGTERM/SIGINT) espera as
+                requisições em andamento (padrão 10)
+            --db-shards: Número de shards de um banco novo (padrão 8)
+            --db-index: Campos dos registros com índice secundário, separados por vírgula
+                (ex: `--db-index name,email`, para `GET /api/data?name=...`)
+            --no-h2c: Não aceita HTTP/2 sem TLS (prefácio do HTTP/2 com conhecimento prévio)
+            --tls-cert: Certificado (PEM) que liga o TLS nos sockets de escuta
+            --tls-key: Chave privada do certificado (padrão: a do próprio arquivo do certificado)
+            --tls-min-version: Versão mínima do TLS (1.2, 1.3; padrão 1.2)
+            --tls-ciphers: Cifras do TLS 1.2 no formato do OpenSSL (padrão: as do Python)
+            --tls-alpn: Protocolos do ALPN, separados por vírgula (padrão `h2,http/1.1`)
+            --tls-tickets: Session tickets do TLS 1.3 por handshake (padrão 2; 0 desliga a retomada de sessão)
+            --profile-startup: Mostra no stderr o tempo de cada fase da partida, até o primeiro accept
+
         :return: Dicionário com os argumentos
         :rtype: dict
         """
         SERVER_PORT = 8080
-        SERVER_TYPE = 'DUAL'
-        for i, arg in enumerate(sys.argv):
-            
+        SERVER_TYPE = serverTypes.serverTypes.DUAL.value
+        server_type_values = [server_type.value for server_type in serverTypes.serverTypes]
+        server_mode_values = [server_mode.value for server_mode in serverModes.serverModes]
 
-            if i == 1 and arg.isdigit():
+        positional, options = Preprocessing._split_args(sys.argv[1:])
+        for i, arg in enumerate(positional):
+            if i == 0 and arg.isdigit():
                 SERVER_PORT = int(arg)
-            if i == 2 and arg in serverTypes.serverTypes:
-                SERVER_TYPE = arg
+            if i == 1 and arg.lower() in server_type_values:
+                SERVER_TYPE = arg.lower()
+
+        SERVER_MODE = options.get('mode', '').lower()
+        if SERVER_MODE not in server_mode_values:
+            SERVER_MODE = serverModes.serverModes.SELECTORS.value
 
         return {
             'SERVER_PORT': SERVER_PORT,
-            'TYPE_SERVER': SERVER_TYPE
+            'TYPE_SERVER': SERVER_TYPE,
+            'WORKERS': Preprocessing._int_option(options, 'workers', 1),
+            'SERVER_MODE': SERVER_MODE,
+            'POOL_SIZE': Preprocessing._int_option(options, 'threads', 8),
+            'QUEUE_DEPTH': Preprocessing._int_option(options, 'queue-depth', 64),
+            'STATIC_DIRS': Preprocessing._static_option(options),
+            'COMPRESSION': 'no-compression' not in options,
+            'COMPRESS_MIN_SIZE': Preprocessing._int_option(options, 'compress-min-size', 1024),
+            'COMPACT_JSON': 'compact-json' in options,
+            'METRICS': 'no-metrics' not in options,
+            'ACCESS_LOG': Preprocessing._access_log_option(options),
+            'LOG_FORMAT': options.get('log-format', 'common') if options.get('log-format') in ('common', 'json') else 'common',
+            'LOG_LEVEL': options.get('log-level', 'info') if options.get('log-level') in ('debug', 'info', 'warning', 'error') else 'info',
+            'LOG_SAMPLE': Preprocessing._float_option(options, 'log-sample', 1.0),
+            'LOG_MAX_BYTES': Preprocessing._int_option(options, 'log-max-bytes', 0),
+            'RATE_LIMIT': Preprocessing._float_option(options, 'rate-limit', 0.0),
+            'RATE_BURST': Preprocessing._int_option(options, 'rate-burst', 0),
+            'MAX_CONNS_PER_IP': Preprocessing._int_option(options, 'max-conns-per-ip', 0),
+            'IPV6_PREFIX': min(Preprocessing._int_option(options, 'ipv6-prefix', 64), 128),
+            'HEADER_TIMEOUT': Preprocessing._float_option(options, 'header-timeout', 10.0),
+            'BODY_TIMEOUT': Preprocessing._float_option(options, 'body-timeout', 30.0),
+            'WRITE_TIMEOUT': Preprocessing._float_option(options, 'write-timeout', 30.0),
+            'KEEPALIVE_TIMEOUT': Preprocessing._float_option(options, 'keepalive-timeout', 5.0),
+            'DRAIN_TIMEOUT': Preprocessing._float_option(options, 'drain-timeout', 10.0),
+            'DB_SHARDS': max(1, Preprocessing._int_option(options, 'db-shards', 8)),
+            'DB_INDEXES': [field.strip() for field in options.get('db-index', '').split(',') if field.strip()],
+            'H2C': 'no-h2c' not in options,
+            'TLS_CERT': options.get('tls-cert'),
+            'TLS_KEY': options.get('tls-key'),
+            'TLS_MIN_VERSION': options.get('tls-min-version') if options.get('tls-min-version') in ('1.2', '1.3') else '1.2',
+            'TLS_CIPHERS': options.get('tls-ciphers'),
+            'TLS_ALPN': [protocol.strip() for protocol in options.get('tls-alpn', 'h2,http/1.1').split(',') if protocol.strip() in ('h2', 'http/1.1')],
+            'TLS_TICKETS': Preprocessing._int_option(options, 'tls-tickets', 2),
+            'PROFILE_STARTUP': 'profile-startup' in options,
+
+        }
+
+    @staticmethod
+    def _split_args(args: list) -> tuple:
+        """
+        Separa os argumentos posicionais das opções `--nome valor` / `--nome=valor`.
+        As opções de `FLAGS` não têm valor: `--no-h2c 9000` deixa 9000 como posicional.
+        """
+        positional = []
+        options = {}
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg.startswith('--'):
+                name, sep, value = arg[2:].partition('=')
+                if not sep:
+                    if name.lower() in Preprocessing.FLAGS:
+                        value = 'true'
+                    elif i + 1 < len(args) and not args[i + 1].startswith('--'):
+                        value = args[i + 1]
+                        i += 1
+                    else:
+                        value = 'true'
+                options[name.lower()] = value
+            else:
+                positional.append(arg)
+            i += 1
+        return positional, options
+
+    @staticmethod
+    def _int_option(options: dict, name: str, default: int) -> int:
+        """
+        Lê uma opção inteira, mantendo o padrão se o valor for inválido.
+        """
+        value = options.get(name, '')
+        return int(value) if value.isdigit() else default
 
-        }
\ No newline at end of file
+    @staticmethod
+    def _static_option(options: dict) -> dict:
+        """
+        Lê a opção `--static` como {prefixo da URL: diretório}, ignorando itens sem `=`.
+        """
+        static_dirs = {}
+        for item in options.get('static', '').split(','):
+            prefix, sep, directory = item.partition('=')
+            if sep and prefix.startswith('/') and directory:
+                static_dirs[prefix] = directory
+        return static_dirs
+
+    @staticmethod
+    def _float_option(options: dict, name: str, default: float) -> float:
+        """
+        Lê uma opção decimal, mantendo o padrão se o valor for inválido.
+        """
+        try:
+            return float(options.get(name, default))
+        except ValueError:
+            return default
+
+    @staticmethod
+    def _access_log_option(options: dict):
+        """
+        Lê a opção `--access-log`: um caminho, `-` para stdout ou `off` (None) para desligar.
+        """
+        value = options.get('access-log', '-')
+        return None if value.lower() == 'off' else value
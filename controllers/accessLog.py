@@ -0,0 +1,224 @@
+import collections
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+
+class AccessLog:
+    """
+    Log de acesso e de erros do servidor, escrito por uma thread em segundo plano.
+    Quem registra só monta uma tupla com os campos e a coloca em uma fila em memória; a
+    formatação e a escrita acontecem na thread de log, em lotes: a fila é esvaziada a cada
+    `flush_interval` segundos ou quando acumula `batch_size` linhas. Se a fila passar de
+    `max_queue` (disco lento, stdout preso), as linhas novas são descartadas e contadas em
+    `dropped`, mas a requisição nunca espera pelo log.
+    Formatos: `json` (uma linha JSON por registro) ou `common` (Common Log Format).
+    Requisições com status < 400 podem ser amostradas com `sample_rate`; erros são sempre
+    registrados. O nível de cada acesso vem do status (info, warning para 4xx, error para 5xx).
+    :param path: Arquivo do log, "-" para stdout ou None para desligar. `{pid}` no nome é
+        trocado pelo pid, para cada worker ter o seu arquivo
+    :param log_format: "json" ou "common"
+    :param level: Nível mínimo registrado (debug, info, warning, error)
+    :param sample_rate: Fração das requisições bem-sucedidas que é registrada (0 a 1)
+    :param max_bytes: Tamanho que dispara a rotação do arquivo (0 para não rotacionar)
+    :param backup_count: Arquivos antigos mantidos na rotação (`access.log.1`, `.2`, ...)
+    :param flush_interval: Segundos máximos entre um registro e sua escrita
+    :param batch_size: Linhas pendentes que disparam a escrita antes do intervalo
+    :param max_queue: Linhas pendentes acima das quais novos registros são descartados
+    """
+    def __init__(self, path: Optional[str] = '-', log_format: str = 'common', level: str = 'info', sample_rate: float = 1.0,
+                 max_bytes: int = 0, backup_count: int = 5, flush_interval: float = 1.0, batch_size: int = 256,
+                 max_queue: int = 65536):
+        if log_format not in ('json', 'common'):
+            raise ValueError(f"Formato de log desconhecido: {log_format}")
+        self.path = path
+        self.enabled = path is not None
+        self.log_format = log_format
+        self.min_level = LEVELS[level]
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_pid = None
+        self._file = None
+        self._file_bytes = 0
+        self._closing = False
+
+    def access(self, remote, request, response, duration: float):
+        """
+        Registra uma requisição atendida.
+        :param remote: Endereço do cliente (tupla do socket)
+        :param request: HttpRequest
+        :param response: HttpResponse enviada
+        :param duration: Segundos desde que a requisição foi lida
+        """
+        if not self.enabled:
+            return
+        status = response.status_code
+        level = 'error' if status >= 500 else 'warning' if status >= 400 else 'info'
+        if LEVELS[level] < self.min_level or (status < 400 and self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        method = request.method.value if request.method else '-'
+        target = request.path + ('?' + request.query_string if request.query_string else '')
+        user_agent = referer = None
+        if self.log_format == 'json':
+            user_agent = request.get_header('user-agent')
+            referer = request.get_header('referer')
+        self._put(('access', time.time(), level, remote[0] if remote else '-', method, target, request.version, status,
+                   response.body_length(), duration, user_agent, referer))
+
+    def debug(self, message: str, **fields):
+        self.message('debug', message, **fields)
+
+    def info(self, message: str, **fields):
+        self.message('info', message, **fields)
+
+    def warning(self, message: str, **fields):
+        self.message('warning', message, **fields)
+
+    def error(self, message: str, **fields):
+        self.message('error', message, **fields)
+
+    def message(self, level: str, message: str, **fields):
+        """
+        Registra uma mensagem do servidor (ex.: erro em um handler) com campos extras.
+        """
+        if self.enabled and LEVELS[level] >= self.min_level:
+            self._put(('message', time.time(), level, message, fields))
+
+    def _put(self, record: tuple):
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        queue.append(record)
+        if self._writer_pid != os.getpid():
+            self._ensure_writer()
+        if len(queue) >= self.batch_size and not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def _ensure_writer(self):
+        """
+        Sobe a thread de escrita neste processo (threads não sobrevivem a um fork).
+        """
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._file = None
+            self._writer = threading.Thread(target=self._write_loop, name='access-log', daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+
+    def close(self):
+        """
+        Escreve o que estiver pendente e encerra a thread de escrita.
+        """
+        with self._lock:
+            writer = self._writer if self._writer_pid == os.getpid() else None
+        if writer:
+            self._closing = True
+            self._wakeup.set()
+            writer.join()
+            self._closing = False
+            self._writer = None
+            self._writer_pid = None
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+        self._file = None
+
+    def _write_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except OSError as e:
+                print(f"Erro ao escrever o log de acesso: {e}", file=sys.stderr)
+            if self._closing:
+                return
+
+    def _drain(self):
+        queue = self._queue
+        lines = []
+        while queue:
+            lines.append(self._format(queue.popleft()))
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            lines.append(self._format(('message', time.time(), 'warning', 'Linhas de log descartadas (fila cheia)', {'dropped': dropped})))
+        if not lines:
+            return
+        payload = '\n'.join(lines) + '\n'
+        file = self._open()
+        file.write(payload)
+        file.flush()
+        if self.max_bytes and file is not sys.stdout:
+            self._file_bytes += len(payload.encode('utf-8'))
+            if self._file_bytes >= self.max_bytes:
+                self._rotate()
+
+    def _open(self):
+        if self._file is None:
+            if self.path == '-':
+                self._file = sys.stdout
+            else:
+                self._file = open(self._file_path(), 'a', encoding='utf-8')
+                self._file_bytes = self._file.tell()
+        return self._file
+
+    def _file_path(self) -> str:
+        return self.path.replace('{pid}', str(os.getpid()))
+
+    def _rotate(self):
+        """
+        access.log -> access.log.1 -> access.log.2 ... até `backup_count`.
+        """
+        self._file.close()
+        self._file = None
+        path = self._file_path()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{path}.{i}"):
+                    os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+            os.replace(path, f"{path}.1")
+        else:
+            open(path, 'w').close()
+
+    def _format(self, record: tuple) -> str:
+        if record[0] == 'access':
+            _, timestamp, level, remote, method, target, version, status, length, duration, user_agent, referer = record
+            if self.log_format == 'json':
+                return json.dumps({
+                    'time': _iso_time(timestamp), 'level': level, 'remote': remote, 'method': method, 'path': target,
+                    'version': version, 'status': status, 'bytes': length, 'duration_ms': round(duration * 1000, 3),
+                    'user_agent': user_agent, 'referer': referer,
+                })
+            size = '-' if length is None else length
+            return f'{remote} - - [{_clf_time(timestamp)}] "{method} {target} {version}" {status} {size}'
+
+        _, timestamp, level, message, fields = record
+        if self.log_format == 'json':
+            return json.dumps({'time': _iso_time(timestamp), 'level': level, 'message': message, **fields}, default=str, ensure_ascii=False)
+        extra = ''.join(f" {name}={value}" for name, value in fields.items())
+        return f"[{_clf_time(timestamp)}] {level.upper()} {message}{extra}"
+
+
+def _iso_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds')
+
+
+def _clf_time(timestamp: float) -> str:
+    return time.strftime('%d/%b/%Y:%H:%M:%S %z', time.localtime(timestamp))
@@ -0,0 +1,400 @@
+import asyncio
+import time
+from controllers.server import H2_WRITE_BUDGET, httpServer
+from controllers.http2 import Http2Connection, Http2Error, is_preface
+from controllers.httpRequest import HttpRequest, HttpResponse
+from models.httpMethods import HttpStatus
+from controllers.requestReader import RequestReader, RequestReaderError
+from controllers.socketHandoff import notify_ready
+from controllers.staticFiles import FileRegion
+
+# Bytes enviados por chamada de sendfile
+SENDFILE_SLICE = 1024 * 1024
+
+
+class asyncHttpServer(httpServer):
+    """
+    Implementação do servidor HTTP sobre asyncio.
+    Usa os mesmos sockets de escuta (IPv4/IPv6/Dual), roteador, leitor de requisições e
+    regras de keep-alive do httpServer, mas cada conexão é uma corrotina. Handlers
+    registrados como `async def` são aguardados no loop sem travar as outras conexões.
+    Os timeouts usam os timers do próprio loop do asyncio (um heap): cada leitura e cada
+    drain espera no máximo o prazo da fase em que a conexão está.
+    Numa conexão HTTP/2 (h2c, ou h2 no ALPN do TLS) cada stream é uma task; veja `_serve_h2`.
+    Com TLS o handshake é feito em `_handle_client` (`StreamWriter.start_tls`), e não pelo
+    `start_server`, para contar os handshakes e as falhas como o httpServer.
+    Aceita os mesmos parâmetros do httpServer.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._stop_event = None
+        self._shutdown_event = None
+        self._writers = set()
+
+    def active_connections(self) -> int:
+        return len(self._writers)
+
+    def start(self):
+        """
+        Inicia o servidor e bloqueia até `stop` ser chamado ou o encerramento gracioso terminar.
+        """
+        asyncio.run(self._serve())
+
+    def stop(self):
+        """
+        Pede o fim do servidor. Pode ser chamado de um signal handler ou de outra thread.
+        """
+        if self._loop and self._stop_event:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+    def shutdown(self):
+        """
+        Encerramento gracioso (ver httpServer.shutdown). Pode ser chamado de um signal
+        handler ou de outra thread.
+        """
+        if self._shutdown_requested:
+            self.stop()
+            return
+        self._shutdown_requested = True
+        if self._loop and self._shutdown_event:
+            self._loop.call_soon_threadsafe(self._shutdown_event.set)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        if self._shutdown_requested:
+            self._shutdown_event.set()
+        servers = []
+        for server_socket in self._create_server_list():
+            # start_server chama listen() de novo; sem `backlog` a fila cairia para 100
+            servers.append(await asyncio.start_server(self._handle_client, sock=server_socket, backlog=self.backlog))
+        self.startup.mark('event loop')
+        notify_ready()
+
+        sweeper = asyncio.create_task(self._sweep_rate_limiter()) if self.rate_limiter else None
+        stopped = asyncio.create_task(self._stop_event.wait())
+        shutdown = asyncio.create_task(self._shutdown_event.wait())
+        await asyncio.wait([stopped, shutdown], return_when=asyncio.FIRST_COMPLETED)
+        shutdown.cancel()
+
+        if not self._stop_event.is_set():
+            await self._accept_pending()
+        for server in servers:
+            server.close()
+        if not self._stop_event.is_set():
+            await self._drain_connections(stopped)
+        stopped.cancel()
+        if sweeper:
+            sweeper.cancel()
+        for writer in list(self._writers):
+            writer.close()
+        for server in servers:
+            await server.wait_closed()
+
+    async def _accept_pending(self):
+        """
+        Aceita as conexões que já estão na fila dos sockets de escuta antes de fechá-los
+        (ver httpServer._begin_drain).
+        O asyncio para de aceitar primeiro, e as conexões que ele já aceitou ganham uma volta
+        do loop para se registrarem no Server: uma conexão aceita que chega depois de
+        `Server.close` é descartada.
+        """
+        for server_socket in self._create_server_list():
+            self._loop.remove_reader(server_socket.fileno())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for server_socket in self._create_server_list():
+            while True:
+                try:
+                    sock, _ = server_socket.accept()
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break
+                sock.setblocking(False)
+                self._loop.create_task(self._handle_accepted(sock))
+
+    async def _handle_accepted(self, sock):
+        reader, writer = await asyncio.open_connection(sock=sock)
+        await self._handle_client(reader, writer)
+
+    async def _drain_connections(self, stopped: asyncio.Task):
+        """
+        Encerramento gracioso: com os sockets de escuta já fechados, espera as conexões
+        terminarem (ver httpServer._begin_drain), até `drain_timeout` segundos ou um `stop`.
+        """
+        self._draining = True
+        self.log.info("Encerrando: aguardando as conexões em andamento", connections=len(self._writers))
+        deadline = self._loop.time() + self.drain_timeout
+        # Dorme antes de olhar `_writers`: conexões recém-aceitas ainda podem estar esperando
+        # a vez de entrar em `_handle_client`
+        await asyncio.sleep(0.05)
+        while self._writers and not stopped.done() and self._loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if self._writers:
+            self.log.warning("Prazo do encerramento esgotado", connections=len(self._writers))
+
+    async def _sweep_rate_limiter(self):
+        """
+        Descarta periodicamente os buckets de clientes parados.
+        """
+        while True:
+            await asyncio.sleep(1.0)
+            self.rate_limiter.sweep()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Atende uma conexão: lê requisições (inclusive em pipeline), roteia e responde,
+        mantendo a conexão enquanto houver keep-alive.
+        """
+        self.startup.finish('first accept')
+        addr = writer.get_extra_info('peername')
+        key = self._client_key(addr)
+        over_limit = not self._acquire_connection(key, addr)
+        request_reader = RequestReader(self.max_header_size, self.max_body_size)
+        requests_served = 0
+        self._writers.add(writer)
+        self.metrics.connection_opened()
+        try:
+            if self.tls_context:
+                if not await self._tls_handshake(writer, addr):
+                    return
+                if writer.get_extra_info('ssl_object').selected_alpn_protocol() == 'h2':
+                    await self._serve_h2(reader, writer, addr, key, over_limit, b'')
+                    return
+            # O prazo dos headers da primeira requisição conta desde a conexão (ou o handshake)
+            header_deadline = self._loop.time() + self.header_timeout
+            while True:
+                preface = is_preface(request_reader.buffer) if self.h2c and requests_served == 0 else False
+                if preface:
+                    self.h2c_connections += 1
+                    await self._serve_h2(reader, writer, addr, key, over_limit, bytes(request_reader.buffer))
+                    break
+                try:
+                    # Com um possível começo do prefácio do HTTP/2 no buffer, espera mais bytes
+                    request = None if preface is None else request_reader.next_request()
+                except RequestReaderError as e:
+                    self.log.warning("Requisição rejeitada", remote=addr[0] if addr else '-', status=e.status.value, reason=e.message)
+                    response = HttpResponse.error_response(e.status.value, e.message)
+                    response.set_keep_alive(False)
+                    writer.write(response.to_bytes())
+                    await self._drain(writer)
+                    break
+
+                if request is None:
+                    if request_reader.pop_continue():
+                        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                    if request_reader.reading_body():
+                        phase, deadline = 'body', self._loop.time() + self.body_timeout
+                    elif request_reader.has_partial_request() or requests_served == 0:
+                        if header_deadline is None:
+                            header_deadline = self._loop.time() + self.header_timeout
+                        phase, deadline = 'header', header_deadline
+                    else:
+                        phase, deadline = 'idle', self._loop.time() + self.keepalive_timeout
+                    try:
+                        async with asyncio.timeout_at(deadline):
+                            data = await reader.read(65536)
+                    except TimeoutError:
+                        self.timeouts[phase] += 1
+                        if phase == 'body' or (phase == 'header' and request_reader.has_partial_request()):
+                            self.log.warning("Tempo esgotado lendo a requisição", remote=addr[0] if addr else '-', phase=phase)
+                            response = HttpResponse.error_response(HttpStatus.REQUEST_TIMEOUT.value)
+                            response.set_keep_alive(False)
+                            writer.write(response.to_bytes())
+                            await self._drain(writer)
+                        break
+                    if not data:
+                        break
+                    self.metrics.add_bytes_received(len(data))
+                    request_reader.feed(data)
+                    continue
+
+                try:
+                    response = self._rate_limited(key, over_limit) or await self.router.route_async(request)
+                except Exception as e:
+                    self.log.error("Erro ao processar pedido", remote=addr[0] if addr else '-', error=repr(e))
+                    response = HttpResponse.error_response(500)
+
+                header_deadline = None
+                requests_served += 1
+                keep_alive = self._apply_keep_alive(request, response, requests_served)
+                self.log.access(addr, request, response, time.perf_counter() - request.received_at)
+                await self._write_response(writer, response, chunked=request.version != 'HTTP/1.0')
+                if not keep_alive:
+                    break
+        except TimeoutError:
+            # Os timeouts de leitura são tratados acima; este é o de um envio (`write_timeout`)
+            self.timeouts['write'] += 1
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            if self.connection_limiter and not over_limit:
+                self.connection_limiter.release(key)
+            writer.close()
+
+    async def _tls_handshake(self, writer: asyncio.StreamWriter, addr) -> bool:
+        """
+        Faz o handshake TLS da conexão (ver httpServer._handshake), com o prazo de
+        `header_timeout`. Retorna False se ele falhou e a conexão deve ser fechada.
+        """
+        try:
+            async with asyncio.timeout(self.header_timeout):
+                await writer.start_tls(self.tls_context)
+        except TimeoutError:
+            self.timeouts['handshake'] += 1
+            return False
+        except (ConnectionError, OSError) as e:
+            # Cliente que não fala TLS, sem versão ou cifra em comum, ou conexão resetada
+            self.tls_stats.handshake_failed()
+            self.log.debug("Falha no handshake TLS", remote=addr[0] if addr else '-', error=repr(e))
+            return False
+        self.tls_stats.handshake_completed(writer.get_extra_info('ssl_object'))
+        return True
+
+    async def _serve_h2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, addr, key, over_limit: bool,
+                        initial: bytes):
+        """
+        Atende uma conexão HTTP/2 (ver httpServer._process_h2). Cada stream completo vira
+        uma task, então um handler lento não segura os outros streams; uma task separada
+        envia os frames conforme ficam prontos, esperando o drain entre um lote de DATA e
+        outro. O prazo de leitura segue a fase da conexão (Http2Connection.phase): body,
+        controle de fluxo parado ou ociosa; com handlers em andamento não há prazo.
+        """
+        h2 = Http2Connection(self.max_header_size, self.max_body_size)
+        h2.feed(initial)
+        ready = asyncio.Event()
+        handlers = set()
+        limits = {'body': self.body_timeout, 'write': self.write_timeout, 'idle': self.keepalive_timeout}
+        last_activity = self._loop.time()
+
+        async def handle(request: HttpRequest):
+            nonlocal last_activity
+            try:
+                response = self._rate_limited(key, over_limit) or await self.router.route_async(request)
+            except Exception as e:
+                self.log.error("Erro ao processar pedido", remote=addr[0] if addr else '-', error=repr(e))
+                response = HttpResponse.error_response(500)
+            self._queue_h2_response(h2, addr, request, response)
+            last_activity = self._loop.time()
+            ready.set()
+
+        async def send():
+            while True:
+                await ready.wait()
+                ready.clear()
+                while h2.wants_write():
+                    data = h2.data_to_send(H2_WRITE_BUDGET)
+                    writer.write(data)
+                    self.metrics.add_bytes_sent(len(data))
+                    await self._drain(writer)
+                if h2.finished():
+                    return
+
+        sender = asyncio.create_task(send())
+        # Terminado o envio (GOAWAY e streams concluídos, ou erro), a leitura recebe EOF
+        sender.add_done_callback(lambda task: writer.close())
+        try:
+            while True:
+                try:
+                    requests = h2.receive()
+                except Http2Error as e:
+                    self.log.warning("Erro de protocolo HTTP/2", remote=addr[0] if addr else '-', code=e.code, reason=e.message)
+                    h2.close(e.code)
+                    requests = []
+                for request in requests:
+                    task = asyncio.create_task(handle(request))
+                    handlers.add(task)
+                    task.add_done_callback(handlers.discard)
+                if self._draining:
+                    h2.close()
+                ready.set()
+
+                phase = h2.phase()
+                if phase is None:
+                    deadline = self._loop.time() + self.keepalive_timeout
+                else:
+                    deadline = last_activity + limits[phase]
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        data = await reader.read(65536)
+                except TimeoutError:
+                    # A fase pode ter mudado durante a espera (ex.: um handler terminou)
+                    phase = h2.phase()
+                    if phase is None or self._loop.time() < last_activity + limits[phase]:
+                        continue
+                    self.timeouts[phase] += 1
+                    h2.close()
+                    writer.write(h2.data_to_send(0))
+                    break
+                if not data:
+                    break
+                last_activity = self._loop.time()
+                self.metrics.add_bytes_received(len(data))
+                h2.feed(data)
+        finally:
+            sender.cancel()
+            for task in list(handlers):
+                task.cancel()
+        if not sender.cancelled() and sender.done() and isinstance(sender.exception(), TimeoutError):
+            self.timeouts['write'] += 1
+
+    async def _write_response(self, writer: asyncio.StreamWriter, response: HttpResponse, chunked: bool = True):
+        """
+        Escreve as partes da resposta sem concatená-las; um body em streaming é enviado
+        chunk a chunk, esperando o drain entre eles para não acumular tudo em memória, e
+        um trecho de arquivo vai com `loop.sendfile`.
+        """
+        pending = []
+        sent = 0
+        for buffer in response.to_buffers(chunked):
+            if isinstance(buffer, (bytes, bytearray, memoryview)):
+                pending.append(buffer)
+                sent += memoryview(buffer).nbytes
+                continue
+            writer.writelines(pending)
+            pending = []
+            if isinstance(buffer, FileRegion):
+                sent += buffer.remaining
+                await self._send_file(writer, buffer)
+            else:
+                for chunk in buffer:
+                    writer.write(chunk)
+                    sent += len(chunk)
+                    await self._drain(writer)
+        writer.writelines(pending)
+        self.metrics.add_bytes_sent(sent)
+        await self._drain(writer)
+
+    async def _drain(self, writer: asyncio.StreamWriter):
+        """
+        Espera o buffer de escrita esvaziar, por no máximo `write_timeout` segundos.
+        """
+        async with asyncio.timeout(self.write_timeout):
+            await writer.drain()
+
+    async def _send_file(self, writer: asyncio.StreamWriter, region: FileRegion):
+        """
+        Envia um trecho de arquivo com sendfile, em fatias de SENDFILE_SLICE bytes para que
+        `write_timeout` valha por fatia e não pelo arquivo inteiro. Sem suporte no transporte
+        (ou com TLS, em que os bytes precisam passar pelo OpenSSL), lê o arquivo em blocos (o
+        fallback do asyncio mexeria na posição do arquivo compartilhado).
+        """
+        if writer.get_extra_info('ssl_object') is None:
+            try:
+                offset, remaining = region.offset, region.remaining
+                while remaining:
+                    count = min(remaining, SENDFILE_SLICE)
+                    async with asyncio.timeout(self.write_timeout):
+                        await self._loop.sendfile(writer.transport, region.file.file, offset, count, fallback=False)
+                    offset += count
+                    remaining -= count
+                return
+            except asyncio.SendfileNotAvailableError:
+                pass
+        for chunk in region.iter_chunks():
+            writer.write(chunk)
+            await self._drain(writer)
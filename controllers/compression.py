@@ -0,0 +1,113 @@
+import zlib
+from typing import Iterable, Optional
+
+from controllers.httpRequest import HttpRequest, HttpResponse
+
+# wbits do zlib para cada Content-Encoding ("deflate" no HTTP é o formato zlib)
+ENCODING_WBITS = {'gzip': 31, 'deflate': 15}
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+def accepted_encoding(accept_encoding: Optional[str], encodings: Iterable[str] = ('gzip', 'deflate')) -> Optional[str]:
+    """
+    Escolhe a codificação pelo header `Accept-Encoding` (com pesos `q`), entre as que o
+    servidor oferece, na ordem de preferência de `encodings`. Retorna None para enviar sem
+    compressão.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible_type(content_type: Optional[str]) -> bool:
+    """
+    Tipos de texto se beneficiam da compressão; imagens e binários já vêm comprimidos.
+    """
+    if not content_type:
+        return False
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return (media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES
+            or media_type.endswith('+json') or media_type.endswith('+xml'))
+
+
+class Compressor:
+    """
+    Compressão gzip/deflate das respostas, negociada pelo `Accept-Encoding`.
+    Só são comprimidos bodies de tipos de texto com pelo menos `min_size` bytes (abaixo
+    disso os headers extras e o custo de CPU não compensam) e bodies em streaming, que
+    são comprimidos chunk a chunk. Bodies que não estão em memória (ex.: arquivos servidos
+    com sendfile) saem como estão.
+    :param min_size: Tamanho mínimo do body para comprimir
+    :param level: Nível de compressão do zlib (1 a 9)
+    :param enabled: Desliga a compressão quando False
+    """
+    def __init__(self, min_size: int = 1024, level: int = 6, enabled: bool = True):
+        self.min_size = min_size
+        self.level = level
+        self.enabled = enabled
+
+    def negotiate(self, request: HttpRequest) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return accepted_encoding(request.get_header('accept-encoding'))
+
+    def is_compressible(self, response: HttpResponse) -> bool:
+        """
+        Indica se a resposta tem uma variante comprimida (e portanto precisa de `Vary`).
+        """
+        if not self.enabled or not response.has_body() or 'Content-Encoding' in response.headers:
+            return False
+        if not is_compressible_type(response.content_type):
+            return False
+        return response.is_streaming() or len(response.body_data) >= self.min_size
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODING_WBITS[encoding])
+        return compressor.compress(data) + compressor.flush()
+
+    def apply(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        """
+        Comprime o body da resposta se o cliente aceitar e valer a pena.
+        """
+        if not self.is_compressible(response):
+            return response
+        response.add_header('Vary', 'Accept-Encoding')
+        encoding = self.negotiate(request)
+        if encoding is None:
+            return response
+        if response.is_streaming():
+            response.body = self._compress_stream(response.body_stream, encoding)
+        else:
+            response.body = self.compress(response.body_data, encoding)
+        response.add_header('Content-Encoding', encoding)
+        etag = response.headers.get('ETag')
+        if etag and etag.endswith('"'):
+            # A variante comprimida é outra representação: precisa de outro ETag
+            response.add_header('ETag', f'{etag[:-1]}-{encoding}"')
+        return response
+
+    def _compress_stream(self, chunks: Iterable, encoding: str):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODING_WBITS[encoding])
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
@@ -0,0 +1,160 @@
+import collections
+import socket
+from controllers.requestReader import RequestReader
+from controllers.staticFiles import FileRegion
+
+# sendmsg não existe no Windows; lá cada buffer vai em um send
+HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+# Segura os headers no kernel para saírem no mesmo segmento do início do arquivo (Linux)
+MSG_MORE = getattr(socket, 'MSG_MORE', 0)
+# Limite de buffers por chamada (IOV_MAX é 1024 no Linux; um lote menor já basta)
+MAX_IOVECS = 64
+
+
+class Connection:
+    """
+    Estado de uma conexão de cliente no loop de eventos do servidor.
+    Guarda o socket não bloqueante, o leitor incremental de requisições e a fila de escrita.
+    A fila guarda os buffers das respostas sem concatená-los (headers e body são enviados
+    juntos com uma única chamada `sendmsg`), geradores de bodies em streaming, consumidos
+    conforme o socket aceita mais dados, e trechos de arquivos (FileRegion), enviados com sendfile.
+    Com TLS a conexão é uma tls.TlsConnection.
+    :param sock: Socket do cliente
+    :param addr: Endereço do cliente
+    :param reader: Leitor de requisições da conexão
+    """
+    # Exceções de uma leitura ou envio que só pode continuar quando o socket estiver pronto
+    would_block = (BlockingIOError, InterruptedError)
+    tls = False
+
+    def __init__(self, sock: socket.socket, addr, reader: RequestReader):
+        self.sock = sock
+        self.addr = addr
+        self.reader = reader
+        self.out_queue = collections.deque()
+        self.close_after_write = False
+        self.closed = False
+        self.busy = False
+        self.requests_served = 0
+        self.bytes_sent = 0
+        # Chave do cliente nos limites por IP (rateLimit.client_key), se houver limites
+        self.client_key = None
+        # Conexão acima do limite por cliente: a primeira requisição recebe 429
+        self.over_limit = False
+        # Timeout agendado na roda de timers do servidor e a fase a que ele se refere
+        self.timer = None
+        self.phase = None
+        # Estado HTTP/2 (Http2Connection) depois que o cliente enviou o prefácio do h2c
+        self.h2 = None
+        # Handshake TLS pendente (ver TlsConnection)
+        self.handshaking = False
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def recv(self, size: int = 65536) -> bytes:
+        """
+        Lê o que estiver disponível no socket e entrega ao leitor de requisições (ou ao
+        HTTP/2). Retorna b'' quando o cliente fechou a conexão.
+        """
+        data = self.sock.recv(size)
+        (self.reader if self.h2 is None else self.h2).feed(data)
+        return data
+
+    def queue(self, data: bytes):
+        """
+        Enfileira bytes para envio ao cliente.
+        """
+        if data:
+            self.out_queue.append(memoryview(data).cast('B'))
+
+    def queue_buffers(self, buffers: list):
+        """
+        Enfileira as partes de uma resposta (bytes, um gerador de bytes ou um FileRegion), na ordem.
+        """
+        for buffer in buffers:
+            if isinstance(buffer, (bytes, bytearray, memoryview)):
+                self.queue(buffer)
+            else:
+                self.out_queue.append(buffer)
+
+    def has_pending_output(self) -> bool:
+        return bool(self.out_queue)
+
+    def flush(self) -> bool:
+        """
+        Envia o máximo possível da fila de escrita sem bloquear.
+        Retorna True quando a fila ficou vazia.
+        """
+        queue = self.out_queue
+        while queue:
+            if isinstance(queue[0], FileRegion):
+                try:
+                    self.bytes_sent += queue[0].send(self.sock)
+                except self.would_block:
+                    return False
+                if not queue[0].remaining:
+                    queue.popleft()
+                continue
+            buffers = self._next_buffers()
+            if not buffers:
+                continue
+            try:
+                sent = self._send(buffers)
+            except self.would_block:
+                return False
+            self.bytes_sent += sent
+            if not self._consume(sent):
+                return False
+        return True
+
+    def _send(self, buffers: list) -> int:
+        """
+        Envia um lote de buffers do início da fila; retorna quantos bytes o socket aceitou.
+        """
+        if HAS_SENDMSG:
+            queue = self.out_queue
+            followed_by_file = len(queue) > len(buffers) and isinstance(queue[len(buffers)], FileRegion)
+            return self.sock.sendmsg(buffers, [], MSG_MORE if followed_by_file else 0)
+        return self.sock.send(buffers[0])
+
+    def _next_buffers(self) -> list:
+        """
+        Junta os buffers prontos do início da fila (até MAX_IOVECS), parando no primeiro
+        gerador ou FileRegion. Um gerador no início da fila tem o próximo chunk puxado
+        para a frente dele; gerador esgotado sai da fila.
+        """
+        queue = self.out_queue
+        if not isinstance(queue[0], memoryview):
+            chunk = next(queue[0], None)
+            if chunk is None:
+                queue.popleft()
+            elif chunk:
+                queue.appendleft(memoryview(chunk).cast('B'))
+            return []
+        buffers = []
+        for buffer in queue:
+            if not isinstance(buffer, memoryview) or len(buffers) == MAX_IOVECS:
+                break
+            buffers.append(buffer)
+        return buffers
+
+    def _consume(self, sent: int) -> bool:
+        """
+        Remove da fila os bytes enviados. Retorna False se o socket aceitou menos do que o
+        primeiro lote (envio parcial: o buffer do kernel encheu).
+        """
+        queue = self.out_queue
+        while sent and queue:
+            buffer = queue[0]
+            if sent < len(buffer):
+                queue[0] = buffer[sent:]
+                return False
+            sent -= len(buffer)
+            queue.popleft()
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.sock.close()
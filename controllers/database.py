@@ -1,31 +1,739 @@
 import os
 import json
+import time
+import zlib
+import heapq
+import bisect
+import threading
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+try:
+    import fcntl
+except ImportError:
+    # Sem flock (Windows): os arquivos do banco não podem ser compartilhados entre processos
+    fcntl = None
+
+
+def _index_key(value) -> Optional[str]:
+    """
+    Chave de um valor no índice secundário. Só valores escalares são indexados.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return json.dumps(value)
+    return None
+
+
+def _query_keys(raw: str) -> Set[str]:
+    """
+    Chaves do índice que um valor vindo da query string pode representar: `?age=30` casa
+    com o número 30 e com o texto "30".
+    """
+    keys = {json.dumps(raw)}
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return keys
+    key = _index_key(parsed)
+    if key is not None:
+        keys.add(key)
+    return keys
+
+
+class DatabaseShard:
+    """
+    Um shard do banco: os registros cujas chaves caem nele ficam em memória, com snapshot
+    JSON e write-ahead log próprios. Cada escrita é registrada no log (`<arquivo>.wal`)
+    antes de retornar; escritas concorrentes no shard são agrupadas em um único fsync
+    (group commit). Periodicamente, ou quando o log passa de `compact_bytes`, o snapshot é
+    reescrito de forma atômica (arquivo temporário + rename) e o log é truncado.
+    Os arquivos podem ser compartilhados por vários processos (os workers): quem anexa ao
+    log ou o compacta segura um lock exclusivo (flock de `<arquivo>.lock`), e antes de cada
+    operação o shard traz para a memória o que os outros processos gravaram (`_sync`). A
+    compactação parte desse estado completo, então não descarta as escritas dos outros
+    workers. O arquivo de lock também guarda a geração (número de compactações) e o
+    tamanho do log: quem vê a geração mudar recarrega o snapshot, e quem vê só o tamanho
+    mudar lê o final do log.
+    Além do dict de dados, o shard mantém as chaves ordenadas (para o scan por faixa) e os
+    índices secundários dos campos em `index_fields`.
+    :param path_db: Caminho do snapshot do shard
+    :param flush_interval: Segundos entre compactações do log no snapshot
+    :param compact_bytes: Tamanho do log que dispara a compactação antes do intervalo
+    :param index_fields: Campos dos registros (objetos JSON) com índice secundário
+    """
+    def __init__(self, path_db: str, flush_interval: float = 5.0, compact_bytes: int = 1024 * 1024,
+                 index_fields: Iterable[str] = ()):
+        self.path_db = path_db
+        self.path_wal = self.path_db + '.wal'
+        self.path_lock = self.path_db + '.lock'
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self.index_fields = set(index_fields)
+        self._lock = threading.Lock()
+        self._commit_cond = threading.Condition(self._lock)
+        self._data: Optional[Dict[str, Any]] = None
+        self._keys: List[str] = []
+        # campo -> chave do valor no índice -> chaves dos registros
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {}
+        # Operações ('put', chave, valor) / ('del', chave) ainda não gravadas no log, e as
+        # do lote que o committer está gravando
+        self._pending = []
+        self._inflight = []
+        self._next_seq = 0
+        self._committed_seq = 0
+        # Estado do disco visto por último (`_read_state`) e bytes do log já aplicados em `_data`
+        self._state = None
+        self._wal_offset = 0
+        self._wal_file = None
+        self._lock_fd = None
+        self._lock_fd_pid = None
+        self._committer = None
+        self._committer_pid = None
+        self._compact_requested = False
+        self._commit_error = None
+        self._closing = False
+        self._last_compaction = time.monotonic()
+
+    def get(self, key: str):
+        with self._lock:
+            self._sync()
+            return self._data.get(key)
+
+    def items(self) -> Dict[str, Any]:
+        """
+        Cópia rasa dos registros do shard.
+        """
+        with self._lock:
+            self._sync()
+            return dict(self._data)
+
+    def write(self, puts: Iterable[Tuple[str, Any]] = (), deletes: Iterable[str] = ()) -> Tuple[int, int]:
+        """
+        Aplica as escritas em memória e as coloca na fila do log, sem esperar o fsync.
+        Retorna (número de sequência para `wait`, quantas chaves removidas existiam).
+        """
+        ops = []
+        removed = 0
+        with self._lock:
+            self._sync()
+            self._ensure_committer()
+            for key, value in puts:
+                self._apply_put(key, value)
+                ops.append(('put', key, value))
+            for key in deletes:
+                if self._apply_delete(key):
+                    removed += 1
+                    ops.append(('del', key))
+            if not ops:
+                return self._committed_seq, removed
+            self._pending.extend(ops)
+            self._next_seq += 1
+            self._commit_cond.notify_all()
+            return self._next_seq, removed
+
+    def wait(self, seq: int):
+        """
+        Espera o committer gravar (com fsync) o lote que contém a escrita `seq`.
+        """
+        with self._lock:
+            while self._committed_seq < seq:
+                self._commit_cond.wait()
+            if self._commit_error:
+                raise self._commit_error
+
+    def scan(self, start: Optional[str], end: Optional[str], limit: Optional[int]) -> List[Tuple[str, Any]]:
+        """
+        Registros com `start <= chave < end`, em ordem de chave, no máximo `limit`.
+        """
+        with self._lock:
+            self._sync()
+            low = 0 if start is None else bisect.bisect_left(self._keys, start)
+            high = len(self._keys) if end is None else bisect.bisect_left(self._keys, end)
+            if limit is not None:
+                high = min(high, low + limit)
+            return [(key, self._data[key]) for key in self._keys[low:high]]
+
+    def find(self, field: str, value_keys: Set[str]) -> Dict[str, Any]:
+        """
+        Registros cujo `field` tem um dos valores (chaves do índice) pedidos.
+        """
+        with self._lock:
+            self._sync()
+            index = self._indexes[field]
+            found = {}
+            for value_key in value_keys:
+                for key in index.get(value_key, ()):
+                    found[key] = self._data[key]
+            return found
+
+    def version(self) -> bytes:
+        """
+        Estado publicado do shard (veja `_read_state`): muda a cada lote gravado no log e a
+        cada compactação, de qualquer processo.
+        """
+        return self._read_state()
+
+    def add_index(self, field: str):
+        with self._lock:
+            self.index_fields.add(field)
+            if self._data is not None and field not in self._indexes:
+                self._build_index(field)
+
+    def _apply(self, op: tuple):
+        if op[0] == 'put':
+            self._apply_put(op[1], op[2])
+        else:
+            self._apply_delete(op[1])
+
+    def _apply_put(self, key: str, value):
+        if key in self._data:
+            self._unindex(key, self._data[key])
+        else:
+            bisect.insort(self._keys, key)
+        self._data[key] = value
+        self._index(key, value)
+
+    def _apply_delete(self, key: str) -> bool:
+        if key not in self._data:
+            return False
+        self._unindex(key, self._data.pop(key))
+        del self._keys[bisect.bisect_left(self._keys, key)]
+        return True
+
+    def _index(self, key: str, value):
+        if not self._indexes or not isinstance(value, dict):
+            return
+        for field, index in self._indexes.items():
+            if field in value:
+                value_key = _index_key(value[field])
+                if value_key is not None:
+                    index.setdefault(value_key, set()).add(key)
+
+    def _unindex(self, key: str, value):
+        if not self._indexes or not isinstance(value, dict):
+            return
+        for field, index in self._indexes.items():
+            if field in value:
+                value_key = _index_key(value[field])
+                keys = index.get(value_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[value_key]
+
+    def _build_index(self, field: str):
+        index = self._indexes[field] = {}
+        for key, value in self._data.items():
+            if isinstance(value, dict) and field in value:
+                value_key = _index_key(value[field])
+                if value_key is not None:
+                    index.setdefault(value_key, set()).add(key)
+
+    def flush(self):
+        """
+        Força a compactação do log no snapshot JSON e espera terminar.
+        """
+        with self._lock:
+            if self._data is None:
+                return
+            self._ensure_committer()
+            self._compact_requested = True
+            self._commit_cond.notify_all()
+            while self._compact_requested:
+                self._commit_cond.wait()
+
+    def close(self):
+        """
+        Grava o que estiver pendente no snapshot e encerra a thread de escrita.
+        """
+        with self._lock:
+            committer = self._committer if self._committer_pid == os.getpid() else None
+            self._closing = True
+            self._commit_cond.notify_all()
+        if committer:
+            committer.join()
+        with self._lock:
+            if self._data is not None and self._wal_offset:
+                self._compact()
+            if self._wal_file:
+                self._wal_file.close()
+                self._wal_file = None
+            if self._lock_fd_pid == os.getpid():
+                os.close(self._lock_fd)
+            self._lock_fd = None
+            self._lock_fd_pid = None
+            self._committer = None
+            self._closing = False
+
+    def _sync(self, force: bool = False):
+        """
+        Deixa `_data` igual ao disco mais as escritas locais ainda não gravadas: na primeira
+        utilização carrega o snapshot e reaplica o log; depois, aplica só os registros que
+        outros processos anexaram ao log, ou recarrega tudo se um deles compactou o log.
+        Sem novidade no disco custa um pread. Com `force` (usado com o lock do log) lê o
+        final do log mesmo sem mudança publicada. Chamado com o lock.
+        """
+        if self._data is not None:
+            state = self._read_state()
+            if state == self._state and not force:
+                return
+            if state[:8] == self._state[:8]:
+                ops, offset = self._read_wal(self._wal_offset)
+                # A geração só muda depois do truncate do log, e ninguém anexa ao log
+                # antes disso: com a mesma geração, o lido continua o que já foi aplicado
+                if self._read_state()[:8] == state[:8]:
+                    for op in ops:
+                        self._apply(op)
+                    self._state = state
+                    self._wal_offset = offset
+                    self._reapply_local()
+                    return
+        self._reload()
+
+    def _reload(self):
+        """
+        Carrega o snapshot, reaplica o log e monta as chaves ordenadas e os índices.
+        Se outro processo compactar no meio da leitura, a próxima `_sync` vê a geração nova
+        e recarrega de novo. Chamado com o lock.
+        """
+        while True:
+            state = self._read_state()
+            data = {}
+            if os.path.exists(self.path_db):
+                with open(self.path_db, 'r') as f:
+                    content = f.read()
+                if content.strip():
+                    data = json.loads(content)
+            ops, offset = self._read_wal(0)
+            if self._read_state()[:8] == state[:8]:
+                break
+        for op in ops:
+            if op[0] == 'put':
+                data[op[1]] = op[2]
+            else:
+                data.pop(op[1], None)
+        self._data = data
+        self._state = state
+        self._wal_offset = offset
+        self._keys = sorted(data)
+        self._indexes = {}
+        for field in self.index_fields:
+            self._build_index(field)
+        self._reapply_local()
+
+    def _reapply_local(self):
+        """
+        Reaplica por cima do disco as escritas deste processo que ainda não estão no log
+        (ou que estão sendo gravadas), para que continuem valendo sobre as dos outros.
+        """
+        for op in self._inflight:
+            self._apply(op)
+        for op in self._pending:
+            self._apply(op)
+
+    def _read_wal(self, offset: int) -> Tuple[list, int]:
+        """
+        Registros do log a partir de `offset`, e o offset do fim do último registro válido.
+        Para numa linha incompleta (outro processo escrevendo, ou uma queda no meio da
+        escrita): ela é relida da próxima vez, ou descartada por `_repair_wal`.
+        """
+        ops = []
+        if not os.path.exists(self.path_wal):
+            return ops, 0
+        with open(self.path_wal, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                ops.append(tuple(record))
+                offset += len(line)
+        return ops, offset
+
+    def _repair_wal(self):
+        """
+        Descarta o que houver no log depois do último registro válido: a última linha
+        cortada por uma queda no meio da escrita, para que os próximos registros não sejam
+        anexados a ela. Chamado com o lock do log e com `_data` sincronizado.
+        """
+        if os.fstat(self._wal_file.fileno()).st_size > self._wal_offset:
+            self._wal_file.truncate(self._wal_offset)
+
+    def _lock_file(self) -> int:
+        """
+        Descritor do arquivo de lock deste processo: um descritor herdado do pai
+        compartilharia o flock com ele.
+        """
+        if self._lock_fd_pid != os.getpid():
+            self._lock_fd = os.open(self.path_lock, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_fd_pid = os.getpid()
+        return self._lock_fd
+
+    def _read_state(self) -> bytes:
+        """
+        Estado do disco publicado no arquivo de lock: geração e tamanho do log, 8 bytes
+        cada. Muda a cada lote anexado e a cada compactação, de qualquer processo.
+        """
+        if fcntl is None:
+            return b''
+        return os.pread(self._lock_file(), 16, 0)
+
+    def _publish_state(self, generation: int, wal_size: int):
+        """
+        Publica o estado do disco. Chamado com o lock do log e com o lock do shard.
+        """
+        if fcntl is None:
+            return
+        state = generation.to_bytes(8, 'little') + wal_size.to_bytes(8, 'little')
+        os.pwrite(self._lock_file(), state, 0)
+        self._state = state
+
+    def _lock_wal(self):
+        """
+        Lock exclusivo do log entre processos. Só a thread de escrita (ou o `close`, depois
+        dela) o usa, então nunca é pedido duas vezes no mesmo processo.
+        """
+        if self._wal_file is None:
+            self._wal_file = open(self.path_wal, 'ab')
+        if fcntl:
+            fcntl.flock(self._lock_file(), fcntl.LOCK_EX)
+
+    def _unlock_wal(self):
+        if fcntl:
+            fcntl.flock(self._lock_file(), fcntl.LOCK_UN)
+
+    def _ensure_committer(self):
+        """
+        Sobe a thread de escrita neste processo (threads não sobrevivem a um fork). Chamado com o lock.
+        """
+        if self._committer_pid == os.getpid() and self._committer is not None:
+            return
+        self._committer_pid = os.getpid()
+        self._wal_file = None
+        self._committer = threading.Thread(target=self._commit_loop, name='database-committer', daemon=True)
+        self._committer.start()
+
+    def _commit_loop(self):
+        with self._lock:
+            while True:
+                if not self._pending and not self._compact_requested and not self._closing:
+                    self._commit_cond.wait(timeout=self.flush_interval)
+
+                if self._pending:
+                    batch = self._inflight = self._pending
+                    self._pending = []
+                    last_seq = self._next_seq
+                    # O fsync acontece fora do lock para novas escritas formarem o próximo lote
+                    self._lock.release()
+                    try:
+                        self._append_wal(batch)
+                        self._commit_error = None
+                    except OSError as e:
+                        self._commit_error = e
+                    finally:
+                        self._lock.acquire()
+                    self._inflight = []
+                    self._committed_seq = last_seq
+                    self._commit_cond.notify_all()
+
+                interval_elapsed = time.monotonic() - self._last_compaction >= self.flush_interval
+                if self._compact_requested or self._wal_offset >= self.compact_bytes or (self._wal_offset and interval_elapsed):
+                    self._compact()
+                    self._compact_requested = False
+                    self._commit_cond.notify_all()
+
+                if self._closing and not self._pending:
+                    return
+
+    def _append_wal(self, batch: list):
+        """
+        Anexa um lote ao log, com o lock do log: antes, aplica os registros que outros
+        processos anexaram, para que `_wal_offset` continue apontando para o fim do que
+        já está em `_data`. Chamado sem o lock do shard.
+        """
+        payload = b''.join(json.dumps(op).encode('utf-8') + b'\n' for op in batch)
+        self._lock_wal()
+        try:
+            with self._lock:
+                self._sync(force=True)
+                self._repair_wal()
+                start = self._wal_offset
+            self._wal_file.write(payload)
+            self._wal_file.flush()
+            os.fsync(self._wal_file.fileno())
+            with self._lock:
+                self._wal_offset = start + len(payload)
+                self._publish_state(int.from_bytes(self._state[:8], 'little'), self._wal_offset)
+        finally:
+            self._unlock_wal()
+
+    def _compact(self):
+        """
+        Reescreve o snapshot de forma atômica, trunca o log e incrementa a geração.
+        Chamado com o lock, pela thread de escrita (ou pelo close, depois dela). Com o lock
+        do log, sincroniza `_data` com o disco antes: o snapshot inclui os registros dos
+        outros processos. Se outro processo acabou de compactar, o log está vazio e não há
+        o que fazer.
+        """
+        # A espera pelo lock do log, a serialização e o fsync acontecem fora do lock;
+        # escritas feitas nesse meio tempo ficam em `_pending` e só vão para o log depois
+        # do truncate
+        self._lock.release()
+        try:
+            self._lock_wal()
+            try:
+                with self._lock:
+                    self._sync(force=True)
+                    snapshot = dict(self._data) if self._wal_offset else None
+                if snapshot is not None:
+                    _write_json_atomic(self.path_db, snapshot)
+                    self._wal_file.truncate(0)
+                    self._wal_file.flush()
+                    os.fsync(self._wal_file.fileno())
+                    with self._lock:
+                        self._wal_offset = 0
+                        self._publish_state(int.from_bytes(self._state[:8], 'little') + 1, 0)
+            finally:
+                self._unlock_wal()
+        finally:
+            self._lock.acquire()
+        self._last_compaction = time.monotonic()
+
+
 class Database:
     """
-    Conexão a um banco de dados local para manipulação de dados
+    Conexão a um banco de dados local para manipulação de dados.
+    Os registros (chave -> valor JSON) são distribuídos por hash da chave entre `shards`
+    shards, cada um com seu snapshot, seu write-ahead log e seu lock: uma escrita só toca
+    o shard da sua chave, e escritas em shards diferentes não esperam umas pelas outras.
+    Leitura, escrita e remoção de uma chave são O(1); o scan por faixa de chaves usa as
+    chaves ordenadas de cada shard; consultas por campo usam os índices secundários de
+    `indexes`, sem percorrer os registros. Veja DatabaseShard.
+    Os shards ficam em `models/<nome>.shards/`. Na primeira utilização, se esse diretório
+    não existe, os dados de `models/<path_db>` (e do seu log) são distribuídos entre os
+    shards; o arquivo antigo não é mais alterado. A migração segura um flock, então
+    processos que sobem juntos não a fazem em paralelo; com vários workers, o supervisor a
+    faz antes do fork (`open`).
+    :param path_db: Nome do arquivo dentro de models/
+    :param flush_interval: Segundos entre compactações do log no snapshot
+    :param compact_bytes: Tamanho do log de um shard que dispara a compactação antes do intervalo
+    :param shards: Número de shards de um banco novo (um banco existente mantém o seu)
+    :param indexes: Campos dos registros (objetos JSON) com índice secundário
     """
-    def __init__(self, path_db: str = 'fake_db.json'):
+    META_FILE = 'meta.json'
+
+    def __init__(self, path_db: str = 'fake_db.json', flush_interval: float = 5.0, compact_bytes: int = 1024 * 1024,
+                 shards: int = 8, indexes: Iterable[str] = ()):
         self.path_db = os.path.join(os.getcwd(), 'models', path_db)
+        self.path_wal = self.path_db + '.wal'
+        self.path_shards = os.path.splitext(self.path_db)[0] + '.shards'
+        self.flush_interval = flush_interval
+        self.compact_bytes = compact_bytes
+        self.shard_count = max(1, shards)
+        self.index_fields = set(indexes)
+        self.shards: List[DatabaseShard] = []
+        self._lock = threading.Lock()
+
+    def open(self):
+        """
+        Abre os shards, migrando o arquivo antigo se preciso (sem carregar os dados).
+        Feito na primeira utilização; o supervisor chama antes do fork dos workers.
+        """
+        self._shards()
+
+    def _shards(self) -> List[DatabaseShard]:
+        """
+        Abre os shards na primeira utilização, migrando o arquivo antigo se preciso.
+        """
+        if self.shards:
+            return self.shards
+        with self._lock:
+            if not self.shards:
+                meta_path = os.path.join(self.path_shards, self.META_FILE)
+                if not os.path.exists(meta_path):
+                    self._migrate_once(meta_path)
+                with open(meta_path, 'r') as f:
+                    self.shard_count = json.load(f)['shards']
+                self.shards = [
+                    DatabaseShard(os.path.join(self.path_shards, f'{i:02d}.json'), self.flush_interval,
+                                  self.compact_bytes, self.index_fields)
+                    for i in range(self.shard_count)
+                ]
+        return self.shards
+
+    def _migrate_once(self, meta_path: str):
+        """
+        Migra com o lock da migração; quem esperava o lock encontra o meta.json e não
+        migra de novo.
+        """
+        os.makedirs(self.path_shards, exist_ok=True)
+        lock_fd = os.open(os.path.join(self.path_shards, 'migrate.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            if not os.path.exists(meta_path):
+                self._migrate(meta_path)
+        finally:
+            os.close(lock_fd)
+
+    def _migrate(self, meta_path: str):
+        """
+        Distribui o snapshot antigo (e o seu log) entre os shards. O meta.json é escrito
+        por último: se o processo cair no meio, a migração é refeita.
+        """
+        data = {}
+        if os.path.exists(self.path_db):
+            with open(self.path_db, 'r') as f:
+                content = f.read()
+            if content.strip():
+                data = json.loads(content)
+        if os.path.exists(self.path_wal):
+            with open(self.path_wal, 'rb') as f:
+                for line in f:
+                    try:
+                        data.update(json.loads(line))
+                    except ValueError:
+                        break
+        parts = [{} for _ in range(self.shard_count)]
+        for key, value in data.items():
+            parts[self._shard_index(key)][key] = value
+        os.makedirs(self.path_shards, exist_ok=True)
+        for i, part in enumerate(parts):
+            _write_json_atomic(os.path.join(self.path_shards, f'{i:02d}.json'), part)
+            wal_path = os.path.join(self.path_shards, f'{i:02d}.json.wal')
+            if os.path.exists(wal_path):
+                os.remove(wal_path)
+        _write_json_atomic(meta_path, {'shards': self.shard_count})
+
+    def _shard_index(self, key: str) -> int:
+        # crc32 e não hash(): o hash de str muda a cada processo
+        return zlib.crc32(key.encode('utf-8')) % self.shard_count
+
+    def _shard(self, key: str) -> DatabaseShard:
+        shards = self._shards()
+        return shards[self._shard_index(key)]
+
+    def get(self, key: str):
+        """
+        Valor de uma chave, ou None.
+        """
+        return self._shard(key).get(key)
+
+    def put(self, key: str, value):
+        """
+        Grava uma chave. Retorna depois que a escrita estiver no log em disco (fsync).
+        """
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]):
+        """
+        Grava várias chaves; cada shard envolvido recebe um único lote, e os fsyncs dos
+        shards acontecem em paralelo.
+        """
+        by_shard: Dict[int, list] = {}
+        for key, value in items:
+            by_shard.setdefault(self._shard_index(key), []).append((key, value))
+        shards = self._shards()
+        pending = [(shards[i], shards[i].write(puts=puts)[0]) for i, puts in by_shard.items()]
+        for shard, seq in pending:
+            shard.wait(seq)
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove uma chave. Retorna False se ela não existia.
+        """
+        shard = self._shard(key)
+        seq, removed = shard.write(deletes=[key])
+        shard.wait(seq)
+        return bool(removed)
+
+    def scan(self, start: Optional[str] = None, end: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """
+        Registros com `start <= chave < end` (limites opcionais), em ordem de chave, no
+        máximo `limit`. Junta as faixas já ordenadas de cada shard.
+        """
+        parts = [shard.scan(start, end, limit) for shard in self._shards()]
+        merged = heapq.merge(*parts, key=itemgetter(0))
+        return list(merged if limit is None else islice(merged, limit))
+
+    def find(self, field: str, value: str) -> Dict[str, Any]:
+        """
+        Registros cujo campo `field` vale `value` (texto da query string; `30` casa com o
+        número 30 e com o texto "30"). Usa o índice secundário do campo.
+
+        :raises ValueError: o campo não tem índice
+        """
+        if field not in self.index_fields:
+            raise ValueError(f"Campo sem índice: {field}")
+        value_keys = _query_keys(value)
+        found = {}
+        for shard in self._shards():
+            found.update(shard.find(field, value_keys))
+        return found
+
+    def version(self) -> bytes:
+        """
+        Versão dos dados, a mesma em todos os processos que usam o banco: muda depois de
+        cada escrita confirmada (e de cada compactação), em qualquer worker. Serve para
+        validar respostas em cache (veja HttpRouter.add_route). Custa um pread por shard.
+        """
+        return b''.join(shard.version() for shard in self._shards())
+
+    def add_index(self, field: str):
+        """
+        Cria um índice secundário para `field` (montado a partir dos dados já carregados).
+        """
+        self.index_fields.add(field)
+        for shard in self.shards:
+            shard.add_index(field)
 
-    
     def get_data(self) -> dict:
         """
-        Retorna os dados de um arquivo JSON
+        Retorna os dados (cópia rasa de todos os shards)
         """
-        with open(self.path_db, 'r') as f:
-            data = json.load(f)
+        data = {}
+        for shard in self._shards():
+            data.update(shard.items())
         return data
-    
+
     def save_data(self, data: dict):
         """
-        Atualiza os dados em um arquivo JSON
+        Atualiza os dados a partir de um objeto JSON (cada chave vira um registro).
+        Retorna depois que a escrita estiver no log em disco (fsync).
         """
-        current_data = self.get_data()
-        
         data = json.loads(data)
-        for key, value in data.items():
-            current_data[key] = value
-        
-        with open(self.path_db, 'w') as f:
-            json.dump(current_data, f)
-        
\ No newline at end of file
+        self.put_many(data.items())
+
+    def flush(self):
+        """
+        Força a compactação do log de cada shard no snapshot e espera terminar.
+        """
+        for shard in self.shards:
+            shard.flush()
+
+    def close(self):
+        """
+        Grava o que estiver pendente nos snapshots e encerra as threads de escrita.
+        """
+        for shard in self.shards:
+            shard.close()
+
+
+def _write_json_atomic(path: str, data):
+    """
+    Grava um JSON de forma atômica: arquivo temporário + fsync + rename + fsync do diretório.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,95 @@
+import collections
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from controllers.accessLog import AccessLog
+from controllers.httpRequest import HttpRequest, HttpResponse
+
+
+class RequestDispatcher:
+    """
+    Executa handlers em um pool de threads limitado, fora do loop de eventos.
+    O número de requisições em andamento é limitado a `pool_size + queue_depth`; acima disso
+    `submit` recusa a requisição e o servidor responde 503 na hora, em vez de deixar a fila
+    crescer sem limite. As respostas prontas voltam ao loop por uma fila e um socketpair
+    que acorda o selector.
+    :param handler: Função que transforma a requisição em resposta (ex.: HttpRouter.route)
+    :param pool_size: Número de threads do pool
+    :param queue_depth: Quantas requisições podem esperar por uma thread livre
+    :param log: Log onde são registrados os erros dos handlers
+    """
+    def __init__(self, handler: Callable[[HttpRequest], HttpResponse], pool_size: int = 8, queue_depth: int = 64,
+                 log: Optional[AccessLog] = None):
+        self.handler = handler
+        self.log = log or AccessLog(None)
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='http-worker')
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self._done = collections.deque()
+        self.wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+
+    def submit(self, conn, request: HttpRequest) -> bool:
+        """
+        Enfileira a requisição no pool. Retorna False se o pool e a fila estão cheios.
+        Deve ser chamado apenas pela thread do loop de eventos.
+        """
+        if self.in_flight >= self.pool_size + self.queue_depth:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self.executor.submit(self._run, conn, request)
+        return True
+
+    def _run(self, conn, request: HttpRequest):
+        try:
+            response = self.handler(request)
+        except Exception as e:
+            self.log.error("Erro ao processar pedido", remote=conn.addr[0], error=repr(e))
+            response = HttpResponse.error_response(500)
+        self._done.append((conn, request, response))
+        try:
+            self._wakeup_writer.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            # O buffer do socketpair cheio já garante que o loop vai acordar
+            pass
+
+    def completed_requests(self) -> list:
+        """
+        Retorna as requisições concluídas desde a última chamada como (conn, request, response).
+        Deve ser chamado apenas pela thread do loop de eventos.
+        """
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        done = []
+        while self._done:
+            done.append(self._done.popleft())
+        self.in_flight -= len(done)
+        self.completed += len(done)
+        return done
+
+    def stats(self) -> dict:
+        """
+        Contadores para dimensionar o pool.
+        """
+        return {
+            'pool_size': self.pool_size,
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'queued': max(0, self.in_flight - self.pool_size),
+            'rejected': self.rejected,
+            'completed': self.completed,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.wakeup_reader.close()
+        self._wakeup_writer.close()
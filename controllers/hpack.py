@@ -0,0 +1,427 @@
+from typing import Dict, List, Optional, Tuple
+
+# Tabela estática do HPACK (RFC 7541, apêndice A); o índice 1 é a primeira entrada
+STATIC_TABLE = (
+    (':authority', ''),
+    (':method', 'GET'),
+    (':method', 'POST'),
+    (':path', '/'),
+    (':path', '/index.html'),
+    (':scheme', 'http'),
+    (':scheme', 'https'),
+    (':status', '200'),
+    (':status', '204'),
+    (':status', '206'),
+    (':status', '304'),
+    (':status', '400'),
+    (':status', '404'),
+    (':status', '500'),
+    ('accept-charset', ''),
+    ('accept-encoding', 'gzip, deflate'),
+    ('accept-language', ''),
+    ('accept-ranges', ''),
+    ('accept', ''),
+    ('access-control-allow-origin', ''),
+    ('age', ''),
+    ('allow', ''),
+    ('authorization', ''),
+    ('cache-control', ''),
+    ('content-disposition', ''),
+    ('content-encoding', ''),
+    ('content-language', ''),
+    ('content-length', ''),
+    ('content-location', ''),
+    ('content-range', ''),
+    ('content-type', ''),
+    ('cookie', ''),
+    ('date', ''),
+    ('etag', ''),
+    ('expect', ''),
+    ('expires', ''),
+    ('from', ''),
+    ('host', ''),
+    ('if-match', ''),
+    ('if-modified-since', ''),
+    ('if-none-match', ''),
+    ('if-range', ''),
+    ('if-unmodified-since', ''),
+    ('last-modified', ''),
+    ('link', ''),
+    ('location', ''),
+    ('max-forwards', ''),
+    ('proxy-authenticate', ''),
+    ('proxy-authorization', ''),
+    ('range', ''),
+    ('referer', ''),
+    ('refresh', ''),
+    ('retry-after', ''),
+    ('server', ''),
+    ('set-cookie', ''),
+    ('strict-transport-security', ''),
+    ('transfer-encoding', ''),
+    ('user-agent', ''),
+    ('vary', ''),
+    ('via', ''),
+    ('www-authenticate', ''),
+)
+STATIC_FIELDS: Dict[Tuple[str, str], int] = {}
+STATIC_NAMES: Dict[str, int] = {}
+for _index, (_name, _value) in enumerate(STATIC_TABLE, 1):
+    STATIC_FIELDS.setdefault((_name, _value), _index)
+    STATIC_NAMES.setdefault(_name, _index)
+
+# Tamanho em bits do código Huffman de cada byte (RFC 7541, apêndice B); o 257º é o EOS.
+# O código é canônico: os códigos saem em ordem de (tamanho, símbolo), então os tamanhos
+# bastam para reconstruir a tabela
+HUFFMAN_CODE_LENGTHS = (
+    13, 23, 28, 28, 28, 28, 28, 28, 28, 24, 30, 28, 28, 30, 28, 28,
+    28, 28, 28, 28, 28, 28, 30, 28, 28, 28, 28, 28, 28, 28, 28, 28,
+    6, 10, 10, 12, 13, 6, 8, 11, 10, 10, 8, 11, 8, 6, 6, 6,
+    5, 5, 5, 6, 6, 6, 6, 6, 6, 6, 7, 8, 15, 6, 12, 10,
+    13, 6, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7,
+    7, 7, 7, 7, 7, 7, 7, 7, 8, 7, 8, 13, 19, 13, 14, 6,
+    15, 5, 6, 5, 6, 5, 6, 6, 6, 5, 7, 7, 6, 6, 6, 5,
+    6, 7, 6, 5, 5, 6, 7, 7, 7, 7, 7, 15, 11, 14, 13, 28,
+    20, 22, 20, 20, 22, 22, 22, 23, 22, 23, 23, 23, 23, 23, 24, 23,
+    24, 24, 22, 23, 24, 23, 23, 23, 23, 21, 22, 23, 22, 23, 23, 24,
+    22, 21, 20, 22, 22, 23, 23, 21, 23, 22, 22, 24, 21, 22, 23, 23,
+    21, 21, 22, 21, 23, 22, 23, 23, 20, 22, 22, 22, 23, 22, 22, 23,
+    26, 26, 20, 19, 22, 23, 22, 25, 26, 26, 26, 27, 27, 26, 24, 25,
+    19, 21, 26, 27, 27, 26, 27, 24, 21, 21, 26, 26, 28, 27, 27, 27,
+    20, 24, 20, 21, 22, 21, 21, 23, 22, 22, 25, 25, 24, 24, 26, 23,
+    26, 27, 26, 26, 27, 27, 27, 27, 27, 28, 27, 27, 27, 27, 27, 26,
+    30,
+)
+EOS = 256
+
+
+def _build_huffman():
+    """
+    Monta os códigos canônicos a partir dos tamanhos: por tamanho, o primeiro código, o
+    número de códigos e a posição do primeiro símbolo na lista ordenada.
+    """
+    symbols = sorted(range(len(HUFFMAN_CODE_LENGTHS)), key=lambda symbol: (HUFFMAN_CODE_LENGTHS[symbol], symbol))
+    codes = [None] * len(symbols)
+    first, count, offset = {}, {}, {}
+    code = 0
+    previous_length = HUFFMAN_CODE_LENGTHS[symbols[0]]
+    for position, symbol in enumerate(symbols):
+        length = HUFFMAN_CODE_LENGTHS[symbol]
+        code <<= length - previous_length
+        previous_length = length
+        if length not in first:
+            first[length], count[length], offset[length] = code, 0, position
+        count[length] += 1
+        codes[symbol] = (code, length)
+        code += 1
+    # (tamanho, primeiro código, número de códigos, posição) para todos os tamanhos possíveis
+    steps = []
+    for length in range(min(first), max(first) + 1):
+        if length in first:
+            steps.append((length, first[length], count[length], offset[length]))
+    return codes, symbols, steps
+
+
+HUFFMAN_CODES, _HUFFMAN_SYMBOLS, _HUFFMAN_STEPS = _build_huffman()
+
+
+class HpackError(Exception):
+    """
+    Bloco de headers mal formado; no HTTP/2 é um erro de compressão que derruba a conexão.
+    """
+
+
+def huffman_encoded_length(data: bytes) -> int:
+    return (sum(HUFFMAN_CODES[byte][1] for byte in data) + 7) // 8
+
+
+def huffman_encode(data: bytes) -> bytes:
+    out = bytearray()
+    acc = 0
+    bits = 0
+    for byte in data:
+        code, length = HUFFMAN_CODES[byte]
+        acc = (acc << length) | code
+        bits += length
+        while bits >= 8:
+            bits -= 8
+            out.append((acc >> bits) & 0xff)
+        acc &= (1 << bits) - 1
+    if bits:
+        # Completa o último byte com o início do EOS (só bits 1)
+        out.append(((acc << (8 - bits)) | ((1 << (8 - bits)) - 1)) & 0xff)
+    return bytes(out)
+
+
+def huffman_decode(data: bytes) -> bytes:
+    """
+    Decodifica uma string Huffman do HPACK. Para cada símbolo, testa os tamanhos de código
+    do menor para o maior: num código canônico, os códigos de um tamanho são consecutivos.
+    """
+    out = bytearray()
+    acc = 0
+    bits = 0
+    for byte in data:
+        acc = (acc << 8) | byte
+        bits += 8
+        while bits >= 5:
+            symbol = None
+            for length, first, count, offset in _HUFFMAN_STEPS:
+                if length > bits:
+                    break
+                index = (acc >> (bits - length)) - first
+                if index < count:
+                    symbol = _HUFFMAN_SYMBOLS[offset + index]
+                    bits -= length
+                    acc &= (1 << bits) - 1
+                    break
+            if symbol is None:
+                break
+            if symbol == EOS:
+                raise HpackError("EOS dentro de uma string Huffman")
+            out.append(symbol)
+    # O que sobra precisa ser o preenchimento: menos de um byte, só bits 1
+    if bits > 7 or acc != (1 << bits) - 1:
+        raise HpackError("Preenchimento Huffman inválido")
+    return bytes(out)
+
+
+def encode_integer(value: int, prefix_bits: int, flags: int = 0) -> bytes:
+    """
+    Inteiro com prefixo de `prefix_bits` bits; `flags` ocupa os bits altos do primeiro byte.
+    """
+    limit = (1 << prefix_bits) - 1
+    if value < limit:
+        return bytes((flags | value,))
+    out = bytearray((flags | limit,))
+    value -= limit
+    while value >= 128:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_integer(data: bytes, pos: int, prefix_bits: int) -> Tuple[int, int]:
+    """
+    Lê um inteiro com prefixo a partir de `pos`. Retorna (valor, próxima posição).
+    """
+    limit = (1 << prefix_bits) - 1
+    value = data[pos] & limit
+    pos += 1
+    if value < limit:
+        return value, pos
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise HpackError("Inteiro truncado")
+        byte = data[pos]
+        pos += 1
+        value += (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+        if shift > 28:
+            raise HpackError("Inteiro grande demais")
+
+
+def _entry_size(name: str, value: str) -> int:
+    # Tamanho de uma entrada na tabela dinâmica: bytes do nome e do valor + 32
+    return len(name.encode('utf-8')) + len(value.encode('utf-8')) + 32
+
+
+class HpackDecoder:
+    """
+    Decodificador de blocos de headers HPACK (RFC 7541), com a tabela dinâmica da conexão.
+    Os blocos precisam ser decodificados na ordem em que chegaram, inclusive os de streams
+    recusados, para a tabela continuar igual à do cliente.
+    :param max_table_size: Tamanho máximo da tabela dinâmica anunciado ao cliente
+    """
+    def __init__(self, max_table_size: int = 4096):
+        self.max_table_size = max_table_size
+        self.table_size_limit = max_table_size
+        self.dynamic: List[Tuple[str, str]] = []
+        self.table_size = 0
+
+    def decode(self, block: bytes, max_list_size: Optional[int] = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        Lista de (nome, valor) do bloco. Retorna None se a lista passa de `max_list_size`
+        (contado como no SETTINGS_MAX_HEADER_LIST_SIZE); o bloco é processado até o fim
+        mesmo assim, para manter a tabela dinâmica.
+
+        :raises HpackError: bloco mal formado
+        """
+        headers = []
+        list_size = 0
+        pos = 0
+        size_update_allowed = True
+        try:
+            while pos < len(block):
+                byte = block[pos]
+                if byte & 0x80:
+                    # Campo indexado
+                    index, pos = decode_integer(block, pos, 7)
+                    name, value = self._lookup(index)
+                elif byte & 0x40:
+                    # Literal com indexação incremental
+                    name, value, pos = self._literal(block, pos, 6)
+                    self._add(name, value)
+                elif byte & 0x20:
+                    # Atualização do tamanho da tabela dinâmica: só no início do bloco
+                    if not size_update_allowed:
+                        raise HpackError("Atualização do tamanho da tabela fora do início do bloco")
+                    size, pos = decode_integer(block, pos, 5)
+                    if size > self.max_table_size:
+                        raise HpackError("Tabela dinâmica acima do anunciado")
+                    self.table_size_limit = size
+                    self._evict(0)
+                    continue
+                else:
+                    # Literal sem indexação (0000) ou nunca indexado (0001)
+                    name, value, pos = self._literal(block, pos, 4)
+                size_update_allowed = False
+                list_size += len(name) + len(value) + 32
+                if max_list_size is None or list_size <= max_list_size:
+                    headers.append((name, value))
+        except IndexError:
+            raise HpackError("Bloco de headers truncado")
+        if max_list_size is not None and list_size > max_list_size:
+            return None
+        return headers
+
+    def _literal(self, block: bytes, pos: int, prefix_bits: int) -> Tuple[str, str, int]:
+        index, pos = decode_integer(block, pos, prefix_bits)
+        if index:
+            name = self._lookup(index)[0]
+        else:
+            name, pos = self._string(block, pos)
+        value, pos = self._string(block, pos)
+        return name, value, pos
+
+    @staticmethod
+    def _string(block: bytes, pos: int) -> Tuple[str, int]:
+        huffman = block[pos] & 0x80
+        length, pos = decode_integer(block, pos, 7)
+        end = pos + length
+        if end > len(block):
+            raise HpackError("String truncada")
+        raw = block[pos:end]
+        if huffman:
+            raw = huffman_decode(raw)
+        return raw.decode('utf-8', errors='ignore'), end
+
+    def _lookup(self, index: int) -> Tuple[str, str]:
+        if 0 < index <= len(STATIC_TABLE):
+            return STATIC_TABLE[index - 1]
+        position = index - len(STATIC_TABLE) - 1
+        if 0 <= position < len(self.dynamic):
+            return self.dynamic[position]
+        raise HpackError(f"Índice {index} fora da tabela")
+
+    def _add(self, name: str, value: str):
+        size = _entry_size(name, value)
+        self._evict(size)
+        if size <= self.table_size_limit:
+            # A entrada mais nova tem o menor índice
+            self.dynamic.insert(0, (name, value))
+            self.table_size += size
+
+    def _evict(self, incoming: int):
+        while self.dynamic and self.table_size + incoming > self.table_size_limit:
+            name, value = self.dynamic.pop()
+            self.table_size -= _entry_size(name, value)
+
+
+class HpackEncoder:
+    """
+    Codificador de blocos de headers HPACK. Campos repetidos entre respostas (ex.:
+    `content-type`, `vary`) entram na tabela dinâmica e depois saem como um índice de um ou
+    dois bytes. Valores que mudam a cada resposta não são indexados, para não expulsar os
+    úteis, e os sensíveis vão como "nunca indexado". Strings usam Huffman quando fica menor.
+    :param max_table_size: Tamanho máximo da tabela dinâmica (o do cliente, se for menor)
+    """
+    # Valores que quase nunca se repetem: não vale a pena guardá-los na tabela
+    NO_INDEX = frozenset(('content-length', 'etag', 'last-modified', 'date', 'content-range', 'age', 'expires', 'location'))
+    # Valores que não podem ser indexados por nenhum intermediário
+    NEVER_INDEX = frozenset(('authorization', 'proxy-authorization', 'cookie', 'set-cookie'))
+
+    def __init__(self, max_table_size: int = 4096):
+        self.max_table_size = max_table_size
+        self.table_size = 0
+        # Entradas (nome, valor, sequência), da mais antiga para a mais nova
+        self.dynamic: List[Tuple[str, str, int]] = []
+        self._fields: Dict[Tuple[str, str], int] = {}
+        self._names: Dict[str, int] = {}
+        self._inserted = 0
+        self._size_update: Optional[int] = None
+
+    def set_max_table_size(self, size: int):
+        """
+        Aplica o SETTINGS_HEADER_TABLE_SIZE do cliente; a mudança é avisada no próximo bloco.
+        """
+        size = min(size, 4096)
+        if size != self.max_table_size:
+            self.max_table_size = size
+            self._size_update = size if self._size_update is None else min(self._size_update, size)
+            self._evict(0)
+
+    def encode(self, headers: List[Tuple[str, str]]) -> bytes:
+        out = bytearray()
+        if self._size_update is not None:
+            out += encode_integer(self._size_update, 5, 0x20)
+            if self._size_update != self.max_table_size:
+                out += encode_integer(self.max_table_size, 5, 0x20)
+            self._size_update = None
+        for name, value in headers:
+            field = (name, value)
+            index = STATIC_FIELDS.get(field) or self._dynamic_index(self._fields.get(field))
+            if index:
+                out += encode_integer(index, 7, 0x80)
+                continue
+            name_index = STATIC_NAMES.get(name) or self._dynamic_index(self._names.get(name))
+            if name in self.NEVER_INDEX:
+                flags, prefix_bits = 0x10, 4
+            elif name in self.NO_INDEX:
+                flags, prefix_bits = 0x00, 4
+            else:
+                flags, prefix_bits = 0x40, 6
+            out += encode_integer(name_index or 0, prefix_bits, flags)
+            if not name_index:
+                out += self._string(name)
+            out += self._string(value)
+            if flags == 0x40:
+                self._add(name, value)
+        return bytes(out)
+
+    @staticmethod
+    def _string(text: str) -> bytes:
+        raw = text.encode('utf-8')
+        huffman_length = huffman_encoded_length(raw)
+        if huffman_length < len(raw):
+            return encode_integer(huffman_length, 7, 0x80) + huffman_encode(raw)
+        return encode_integer(len(raw), 7) + raw
+
+    def _dynamic_index(self, sequence: Optional[int]) -> int:
+        if sequence is None:
+            return 0
+        return len(STATIC_TABLE) + 1 + self._inserted - sequence
+
+    def _add(self, name: str, value: str):
+        size = _entry_size(name, value)
+        self._evict(size)
+        if size > self.max_table_size:
+            return
+        self._inserted += 1
+        self.dynamic.append((name, value, self._inserted))
+        self._fields[(name, value)] = self._inserted
+        self._names[name] = self._inserted
+        self.table_size += size
+
+    def _evict(self, incoming: int):
+        while self.dynamic and self.table_size + incoming > self.max_table_size:
+            name, value, sequence = self.dynamic.pop(0)
+            self.table_size -= _entry_size(name, value)
+            if self._fields.get((name, value)) == sequence:
+                del self._fields[(name, value)]
+            if self._names.get(name) == sequence:
+                del self._names[name]
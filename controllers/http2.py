@@ -0,0 +1,635 @@
+import collections
+import struct
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from controllers.hpack import HpackDecoder, HpackEncoder, HpackError
+from controllers.httpRequest import HttpRequest, HttpResponse
+from models.httpMethods import HttpStatus
+
+# Prefácio que o cliente envia ao abrir uma conexão HTTP/2 com conhecimento prévio (h2c)
+PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+# Tipos de frame
+DATA = 0x0
+HEADERS = 0x1
+PRIORITY = 0x2
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PUSH_PROMISE = 0x5
+PING = 0x6
+GOAWAY = 0x7
+WINDOW_UPDATE = 0x8
+CONTINUATION = 0x9
+
+# Flags
+FLAG_END_STREAM = 0x1
+FLAG_ACK = 0x1
+FLAG_END_HEADERS = 0x4
+FLAG_PADDED = 0x8
+FLAG_PRIORITY = 0x20
+
+# Códigos de erro
+NO_ERROR = 0x0
+PROTOCOL_ERROR = 0x1
+INTERNAL_ERROR = 0x2
+FLOW_CONTROL_ERROR = 0x3
+STREAM_CLOSED = 0x5
+FRAME_SIZE_ERROR = 0x6
+REFUSED_STREAM = 0x7
+CANCEL = 0x8
+COMPRESSION_ERROR = 0x9
+
+# Parâmetros do SETTINGS
+SETTINGS_HEADER_TABLE_SIZE = 0x1
+SETTINGS_ENABLE_PUSH = 0x2
+SETTINGS_MAX_CONCURRENT_STREAMS = 0x3
+SETTINGS_INITIAL_WINDOW_SIZE = 0x4
+SETTINGS_MAX_FRAME_SIZE = 0x5
+SETTINGS_MAX_HEADER_LIST_SIZE = 0x6
+
+DEFAULT_WINDOW_SIZE = 65535
+MAX_WINDOW_SIZE = 2 ** 31 - 1
+DEFAULT_MAX_FRAME_SIZE = 16384
+
+# Headers de conexão do HTTP/1.x, proibidos no HTTP/2
+CONNECTION_HEADERS = frozenset(('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'))
+
+_FRAME_HEADER = struct.Struct('>HBBBL')
+
+
+def is_preface(buffer: bytes) -> Optional[bool]:
+    """
+    Indica se os primeiros bytes de uma conexão são o prefácio do HTTP/2 (None se ainda
+    não dá para saber: os bytes recebidos são um começo do prefácio).
+    """
+    if len(buffer) >= len(PREFACE):
+        return buffer[:len(PREFACE)] == PREFACE
+    return None if PREFACE.startswith(bytes(buffer)) else False
+
+
+def frame(frame_type: int, flags: int, stream_id: int, payload: bytes = b'') -> bytes:
+    length = len(payload)
+    return _FRAME_HEADER.pack(length >> 8, length & 0xff, frame_type, flags, stream_id) + payload
+
+
+class Http2Error(Exception):
+    """
+    Erro de conexão do HTTP/2: a conexão termina com um GOAWAY com este código.
+    """
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Http2Stream:
+    """
+    Estado de um stream: a requisição sendo recebida e a resposta sendo enviada.
+    """
+    def __init__(self, stream_id: int, send_window: int, recv_window: int):
+        self.stream_id = stream_id
+        self.send_window = send_window
+        self.recv_window = recv_window
+        self.headers: Optional[Dict[str, str]] = None
+        self.body = bytearray()
+        # O cliente terminou de enviar (END_STREAM)
+        self.remote_closed = False
+        # A requisição foi entregue ao servidor e a resposta ainda não saiu
+        self.awaiting_response = False
+        # Body da resposta: iterador de chunks e o chunk atual (None antes de começar)
+        self.chunks: Optional[Iterator] = None
+        self.chunk: Optional[memoryview] = None
+        self.local_closed = False
+        # Resposta enviada antes do fim da requisição (ex.: 413): manda RST_STREAM(NO_ERROR)
+        # no fim, para o cliente parar de enviar o body
+        self.reset_after_response = False
+        # Bytes recebidos e ainda não devolvidos em WINDOW_UPDATE
+        self.unacked = 0
+
+
+class Http2Connection:
+    """
+    Lado servidor de uma conexão HTTP/2 sem TLS (h2c, com conhecimento prévio), sem I/O:
+    recebe os bytes do socket (`feed`/`receive`) e produz os bytes a enviar (`data_to_send`),
+    então pode ser usado por qualquer backend do servidor, como o RequestReader.
+    Cada stream vira um HttpRequest (com `stream_id`) que passa pelo mesmo roteador do
+    HTTP/1.x, e a resposta (HttpResponse) volta por `send_response`, em qualquer ordem:
+    uma resposta lenta não segura as outras. Os bodies das respostas são divididos em
+    frames DATA intercalados entre os streams (round robin), respeitando as janelas de
+    controle de fluxo do cliente; o que não cabe fica esperando um WINDOW_UPDATE.
+    Não há server push nem prioridades (o frame PRIORITY é ignorado).
+    :param max_header_size: Tamanho máximo da lista de headers de uma requisição (431 se exceder)
+    :param max_body_size: Tamanho máximo do body de uma requisição (413 se exceder)
+    :param max_concurrent_streams: Streams simultâneos por conexão (acima, REFUSED_STREAM)
+    :param window_size: Janela de recepção anunciada, por stream e da conexão
+    """
+    def __init__(self, max_header_size: int = 16384, max_body_size: int = 10 * 1024 * 1024,
+                 max_concurrent_streams: int = 100, window_size: int = 1024 * 1024):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.max_concurrent_streams = max_concurrent_streams
+        self.window_size = window_size
+        self.buffer = bytearray()
+        self.streams: Dict[int, Http2Stream] = {}
+        self.last_stream_id = 0
+        self.decoder = HpackDecoder()
+        self.encoder = HpackEncoder()
+        self.remote_window_size = DEFAULT_WINDOW_SIZE
+        self.remote_max_frame_size = DEFAULT_MAX_FRAME_SIZE
+        self.send_window = DEFAULT_WINDOW_SIZE
+        self.recv_window = window_size
+        self.goaway_sent = False
+        self.goaway_received = False
+        self.streams_opened = 0
+        self._preface_received = False
+        self._unacked = 0
+        # Bloco de headers dividido em CONTINUATION: (stream, flags do HEADERS, fragmentos)
+        self._header_block: Optional[Tuple[int, int, bytearray]] = None
+        # Streams com body de resposta pronto para enviar, na ordem do round robin
+        self._sending: Deque[Http2Stream] = collections.deque()
+        self._out = bytearray()
+
+        settings = struct.pack('>HLHLHLHL',
+                               SETTINGS_MAX_CONCURRENT_STREAMS, max_concurrent_streams,
+                               SETTINGS_INITIAL_WINDOW_SIZE, window_size,
+                               SETTINGS_MAX_HEADER_LIST_SIZE, max_header_size,
+                               SETTINGS_ENABLE_PUSH, 0)
+        self._out += frame(SETTINGS, 0, 0, settings)
+        if window_size > DEFAULT_WINDOW_SIZE:
+            # A janela da conexão só cresce com WINDOW_UPDATE
+            self._out += frame(WINDOW_UPDATE, 0, 0, struct.pack('>L', window_size - DEFAULT_WINDOW_SIZE))
+
+    def feed(self, data: bytes):
+        """
+        Acrescenta bytes recebidos do cliente.
+        """
+        self.buffer += data
+
+    def receive(self) -> List[HttpRequest]:
+        """
+        Processa os frames completos do buffer e retorna as requisições que terminaram de
+        chegar (o `stream_id` de cada uma identifica a resposta em `send_response`).
+
+        :raises Http2Error: erro de conexão; o GOAWAY deve ser enviado com `close(e.code)`
+        """
+        if not self._preface_received:
+            preface = is_preface(self.buffer)
+            if preface is None:
+                return []
+            if not preface:
+                raise Http2Error(PROTOCOL_ERROR, "Prefácio inválido")
+            del self.buffer[:len(PREFACE)]
+            self._preface_received = True
+
+        requests = []
+        buffer = self.buffer
+        offset = 0
+        try:
+            while len(buffer) - offset >= 9:
+                length_high, length_low, frame_type, flags, stream_id = _FRAME_HEADER.unpack_from(buffer, offset)
+                length = (length_high << 8) | length_low
+                stream_id &= 0x7fffffff
+                if length > DEFAULT_MAX_FRAME_SIZE:
+                    raise Http2Error(FRAME_SIZE_ERROR, "Frame maior que SETTINGS_MAX_FRAME_SIZE")
+                if len(buffer) - offset < 9 + length:
+                    break
+                payload = bytes(buffer[offset + 9:offset + 9 + length])
+                offset += 9 + length
+                if self._header_block is not None and (frame_type != CONTINUATION or stream_id != self._header_block[0]):
+                    raise Http2Error(PROTOCOL_ERROR, "Esperava CONTINUATION")
+                request = self._handle_frame(frame_type, flags, stream_id, payload)
+                if request is not None:
+                    requests.append(request)
+        finally:
+            del buffer[:offset]
+        return requests
+
+    def _handle_frame(self, frame_type: int, flags: int, stream_id: int, payload: bytes) -> Optional[HttpRequest]:
+        if frame_type == DATA:
+            return self._on_data(flags, stream_id, payload)
+        if frame_type == HEADERS:
+            return self._on_headers(flags, stream_id, payload)
+        if frame_type == CONTINUATION:
+            return self._on_continuation(flags, stream_id, payload)
+        if frame_type == SETTINGS:
+            self._on_settings(flags, stream_id, payload)
+        elif frame_type == WINDOW_UPDATE:
+            self._on_window_update(stream_id, payload)
+        elif frame_type == PING:
+            if stream_id or len(payload) != 8:
+                raise Http2Error(FRAME_SIZE_ERROR if stream_id == 0 else PROTOCOL_ERROR, "PING inválido")
+            if not flags & FLAG_ACK:
+                self._out += frame(PING, FLAG_ACK, 0, payload)
+        elif frame_type == RST_STREAM:
+            if stream_id == 0 or len(payload) != 4:
+                raise Http2Error(PROTOCOL_ERROR, "RST_STREAM inválido")
+            if stream_id > self.last_stream_id:
+                raise Http2Error(PROTOCOL_ERROR, "RST_STREAM em stream ocioso")
+            # O cliente cancelou: a resposta, se ainda vier, é descartada
+            self._drop_stream(stream_id)
+        elif frame_type == PRIORITY:
+            if stream_id == 0 or len(payload) != 5:
+                raise Http2Error(PROTOCOL_ERROR, "PRIORITY inválido")
+        elif frame_type == GOAWAY:
+            self.goaway_received = True
+        elif frame_type == PUSH_PROMISE:
+            raise Http2Error(PROTOCOL_ERROR, "Cliente não pode enviar PUSH_PROMISE")
+        # Tipos desconhecidos são ignorados
+        return None
+
+    def _on_headers(self, flags: int, stream_id: int, payload: bytes) -> Optional[HttpRequest]:
+        if stream_id == 0 or stream_id % 2 == 0:
+            raise Http2Error(PROTOCOL_ERROR, "HEADERS em stream inválido")
+        payload = self._strip_padding(flags, payload)
+        if flags & FLAG_PRIORITY:
+            payload = payload[5:]
+        if not flags & FLAG_END_HEADERS:
+            self._header_block = (stream_id, flags, bytearray(payload))
+            return None
+        return self._on_header_block(stream_id, flags, payload)
+
+    def _on_continuation(self, flags: int, stream_id: int, payload: bytes) -> Optional[HttpRequest]:
+        if self._header_block is None:
+            raise Http2Error(PROTOCOL_ERROR, "CONTINUATION inesperado")
+        block = self._header_block[2]
+        block += payload
+        if len(block) > 2 * self.max_header_size:
+            raise Http2Error(PROTOCOL_ERROR, "Bloco de headers grande demais")
+        if not flags & FLAG_END_HEADERS:
+            return None
+        stream_id, flags, _ = self._header_block
+        self._header_block = None
+        return self._on_header_block(stream_id, flags, bytes(block))
+
+    def _on_header_block(self, stream_id: int, flags: int, block: bytes) -> Optional[HttpRequest]:
+        # O bloco é decodificado mesmo se o stream for recusado: a tabela dinâmica é da conexão
+        try:
+            fields = self.decoder.decode(block, self.max_header_size)
+        except HpackError as e:
+            raise Http2Error(COMPRESSION_ERROR, str(e))
+        end_stream = bool(flags & FLAG_END_STREAM)
+
+        stream = self.streams.get(stream_id)
+        if stream is not None:
+            # Trailers: ignorados, mas precisam fechar o stream
+            if stream.remote_closed or not end_stream:
+                raise Http2Error(PROTOCOL_ERROR, "HEADERS inesperado no stream")
+            return self._end_of_request(stream)
+        if stream_id <= self.last_stream_id:
+            raise Http2Error(STREAM_CLOSED, "HEADERS em stream fechado")
+        self.last_stream_id = stream_id
+        if self.goaway_sent:
+            # Depois do GOAWAY streams novos são ignorados; o cliente tenta em outra conexão
+            return None
+        if len(self.streams) >= self.max_concurrent_streams:
+            self._reset(stream_id, REFUSED_STREAM)
+            return None
+
+        stream = Http2Stream(stream_id, self.remote_window_size, self.window_size)
+        self.streams[stream_id] = stream
+        self.streams_opened += 1
+        if fields is None:
+            stream.remote_closed = end_stream
+            self._reject(stream, HttpStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            return None
+        headers = self._request_headers(fields)
+        if headers is None:
+            self._drop_stream(stream_id)
+            self._reset(stream_id, PROTOCOL_ERROR)
+            return None
+        stream.headers = headers
+        content_length = headers.get('content-length')
+        if content_length is not None and int(content_length) > self.max_body_size:
+            stream.remote_closed = end_stream
+            self._reject(stream, HttpStatus.PAYLOAD_TOO_LARGE)
+            return None
+        if end_stream:
+            return self._end_of_request(stream)
+        return None
+
+    @staticmethod
+    def _request_headers(fields: List[Tuple[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Headers da requisição, com os pseudo-headers (`:method`, `:path`...) no começo.
+        None se a requisição é mal formada (stream resetado com PROTOCOL_ERROR).
+        """
+        headers: Dict[str, str] = {}
+        cookies = []
+        regular = False
+        for name, value in fields:
+            if name != name.lower() or name in CONNECTION_HEADERS:
+                return None
+            if name.startswith(':'):
+                if regular or name not in (':method', ':path', ':scheme', ':authority') or name in headers:
+                    return None
+                headers[name] = value
+                continue
+            regular = True
+            if name == 'te' and value != 'trailers':
+                return None
+            if name == 'cookie':
+                # No HTTP/2 o cookie pode vir dividido em vários campos
+                cookies.append(value)
+                continue
+            headers[name] = value
+        if cookies:
+            headers['cookie'] = '; '.join(cookies)
+        if not headers.get(':method') or not headers.get(':path') or not headers.get(':scheme'):
+            return None
+        content_length = headers.get('content-length')
+        # Só dígitos ASCII: isdigit() sozinho aceita '²', que o int() recusa (RFC 9113 §8.1.1)
+        if content_length is not None and not (content_length.isascii() and content_length.isdigit()):
+            return None
+        return headers
+
+    def _on_data(self, flags: int, stream_id: int, payload: bytes) -> Optional[HttpRequest]:
+        if stream_id == 0:
+            raise Http2Error(PROTOCOL_ERROR, "DATA no stream 0")
+        # Todo DATA conta na janela da conexão, mesmo de um stream já resetado
+        length = len(payload)
+        if length > self.recv_window:
+            raise Http2Error(FLOW_CONTROL_ERROR, "Janela da conexão excedida")
+        self.recv_window -= length
+        self._unacked += length
+        if self._unacked >= self.window_size // 2:
+            self._out += frame(WINDOW_UPDATE, 0, 0, struct.pack('>L', self._unacked))
+            self.recv_window += self._unacked
+            self._unacked = 0
+
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            if stream_id > self.last_stream_id:
+                raise Http2Error(PROTOCOL_ERROR, "DATA em stream ocioso")
+            # Stream resetado ou já respondido: os frames em trânsito são descartados
+            return None
+        if stream.remote_closed:
+            self._drop_stream(stream_id)
+            self._reset(stream_id, STREAM_CLOSED)
+            return None
+        if length > stream.recv_window:
+            self._drop_stream(stream_id)
+            self._reset(stream_id, FLOW_CONTROL_ERROR)
+            return None
+        stream.recv_window -= length
+        data = self._strip_padding(flags, payload)
+        end_stream = bool(flags & FLAG_END_STREAM)
+        if stream.headers is not None:
+            if len(stream.body) + len(data) > self.max_body_size:
+                stream.remote_closed = end_stream
+                self._reject(stream, HttpStatus.PAYLOAD_TOO_LARGE)
+                return None
+            stream.body += data
+        if end_stream:
+            return self._end_of_request(stream)
+        stream.unacked += length
+        if stream.unacked >= self.window_size // 2:
+            self._out += frame(WINDOW_UPDATE, 0, stream_id, struct.pack('>L', stream.unacked))
+            stream.recv_window += stream.unacked
+            stream.unacked = 0
+        return None
+
+    def _end_of_request(self, stream: Http2Stream) -> Optional[HttpRequest]:
+        stream.remote_closed = True
+        if stream.headers is None:
+            # Requisição já rejeitada: só faltava o fim do body
+            self._finish_stream(stream)
+            return None
+        headers = stream.headers
+        authority = headers.pop(':authority', None)
+        if authority and 'host' not in headers:
+            headers['host'] = authority
+        method, path = headers.pop(':method'), headers.pop(':path')
+        headers.pop(':scheme', None)
+        request = HttpRequest.from_fields(method, path, 'HTTP/2.0', headers, bytes(stream.body))
+        request.stream_id = stream.stream_id
+        stream.headers = None
+        stream.body = bytearray()
+        stream.awaiting_response = True
+        return request
+
+    def _on_settings(self, flags: int, stream_id: int, payload: bytes):
+        if stream_id != 0:
+            raise Http2Error(PROTOCOL_ERROR, "SETTINGS fora do stream 0")
+        if flags & FLAG_ACK:
+            if payload:
+                raise Http2Error(FRAME_SIZE_ERROR, "SETTINGS ACK com conteúdo")
+            return
+        if len(payload) % 6:
+            raise Http2Error(FRAME_SIZE_ERROR, "SETTINGS com tamanho inválido")
+        for offset in range(0, len(payload), 6):
+            setting, value = struct.unpack_from('>HL', payload, offset)
+            if setting == SETTINGS_HEADER_TABLE_SIZE:
+                self.encoder.set_max_table_size(value)
+            elif setting == SETTINGS_INITIAL_WINDOW_SIZE:
+                if value > MAX_WINDOW_SIZE:
+                    raise Http2Error(FLOW_CONTROL_ERROR, "SETTINGS_INITIAL_WINDOW_SIZE inválido")
+                delta = value - self.remote_window_size
+                self.remote_window_size = value
+                for stream in self.streams.values():
+                    stream.send_window += delta
+                    if delta > 0 and stream.chunks is not None and not stream.local_closed and stream not in self._sending:
+                        self._sending.append(stream)
+            elif setting == SETTINGS_MAX_FRAME_SIZE:
+                if not DEFAULT_MAX_FRAME_SIZE <= value <= 16777215:
+                    raise Http2Error(PROTOCOL_ERROR, "SETTINGS_MAX_FRAME_SIZE inválido")
+                self.remote_max_frame_size = value
+            elif setting == SETTINGS_ENABLE_PUSH and value > 1:
+                raise Http2Error(PROTOCOL_ERROR, "SETTINGS_ENABLE_PUSH inválido")
+        self._out += frame(SETTINGS, FLAG_ACK, 0)
+
+    def _on_window_update(self, stream_id: int, payload: bytes):
+        if len(payload) != 4:
+            raise Http2Error(FRAME_SIZE_ERROR, "WINDOW_UPDATE inválido")
+        increment = struct.unpack('>L', payload)[0] & 0x7fffffff
+        if stream_id == 0:
+            if increment == 0:
+                raise Http2Error(PROTOCOL_ERROR, "WINDOW_UPDATE com incremento 0")
+            self.send_window += increment
+            if self.send_window > MAX_WINDOW_SIZE:
+                raise Http2Error(FLOW_CONTROL_ERROR, "Janela da conexão acima do máximo")
+            return
+        stream = self.streams.get(stream_id)
+        if stream is None:
+            return
+        if increment == 0:
+            self._drop_stream(stream_id)
+            self._reset(stream_id, PROTOCOL_ERROR)
+            return
+        stream.send_window += increment
+        if stream.send_window > MAX_WINDOW_SIZE:
+            self._drop_stream(stream_id)
+            self._reset(stream_id, FLOW_CONTROL_ERROR)
+            return
+        if stream.chunks is not None and not stream.local_closed and stream not in self._sending:
+            self._sending.append(stream)
+
+    @staticmethod
+    def _strip_padding(flags: int, payload: bytes) -> bytes:
+        if not flags & FLAG_PADDED:
+            return payload
+        if not payload or payload[0] >= len(payload):
+            raise Http2Error(PROTOCOL_ERROR, "Padding maior que o frame")
+        return payload[1:len(payload) - payload[0]]
+
+    def _reject(self, stream: Http2Stream, status: HttpStatus):
+        """
+        Responde um erro antes do fim da requisição; o resto do body é descartado.
+        """
+        stream.headers = None
+        stream.body = bytearray()
+        stream.reset_after_response = not stream.remote_closed
+        stream.awaiting_response = True
+        self.send_response(stream.stream_id, HttpResponse.error_response(status.value))
+
+    def _reset(self, stream_id: int, code: int):
+        self._out += frame(RST_STREAM, 0, stream_id, struct.pack('>L', code))
+
+    def _drop_stream(self, stream_id: int):
+        stream = self.streams.pop(stream_id, None)
+        if stream is not None:
+            stream.local_closed = True
+            stream.remote_closed = True
+
+    def _finish_stream(self, stream: Http2Stream):
+        """
+        Remove o stream quando os dois lados terminaram.
+        """
+        if stream.local_closed and stream.remote_closed:
+            self.streams.pop(stream.stream_id, None)
+
+    def send_response(self, stream_id: int, response: HttpResponse) -> bool:
+        """
+        Enfileira a resposta de um stream: os headers saem na próxima chamada de
+        `data_to_send` e o body conforme as janelas de controle de fluxo.
+        Retorna False se o stream não existe mais (o cliente o cancelou).
+        """
+        stream = self.streams.get(stream_id)
+        if stream is None or not stream.awaiting_response:
+            return False
+        stream.awaiting_response = False
+        fields = [(':status', str(response.status_code))]
+        for name, value in response.header_items():
+            name = name.lower()
+            if name not in CONNECTION_HEADERS:
+                fields.append((name, str(value)))
+        block = self.encoder.encode(fields)
+        body_length = response.body_length()
+        end_stream = body_length == 0
+        max_size = self.remote_max_frame_size
+        first, block = block[:max_size], block[max_size:]
+        flags = (FLAG_END_STREAM if end_stream else 0) | (0 if block else FLAG_END_HEADERS)
+        self._out += frame(HEADERS, flags, stream_id, first)
+        while block:
+            fragment, block = block[:max_size], block[max_size:]
+            self._out += frame(CONTINUATION, 0 if block else FLAG_END_HEADERS, stream_id, fragment)
+        if end_stream:
+            self._end_response(stream)
+        else:
+            stream.chunks = iter(response.iter_body())
+            self._sending.append(stream)
+        return True
+
+    def _end_response(self, stream: Http2Stream):
+        stream.local_closed = True
+        stream.chunks = None
+        stream.chunk = None
+        if stream.reset_after_response:
+            self._reset(stream.stream_id, NO_ERROR)
+            stream.remote_closed = True
+        self._finish_stream(stream)
+
+    def wants_write(self) -> bool:
+        """
+        Indica se `data_to_send` tem algo para enviar agora.
+        """
+        return bool(self._out) or (self.send_window > 0 and bool(self._sending))
+
+    def data_to_send(self, budget: int = 65536) -> bytes:
+        """
+        Frames prontos para enviar: os de controle (SETTINGS, PING, WINDOW_UPDATE, headers
+        das respostas) e até `budget` bytes de DATA, um frame por stream por vez. Chamar de
+        novo depois que o socket esvaziar mantém os bodies grandes fora da memória.
+        """
+        out = self._out
+        self._out = bytearray()
+        sending = self._sending
+        while sending and budget > 0 and self.send_window > 0:
+            stream = sending.popleft()
+            if stream.local_closed:
+                continue
+            if stream.chunk is None:
+                stream.chunk = self._next_chunk(stream)
+            if stream.send_window <= 0:
+                # Volta à fila quando o cliente mandar WINDOW_UPDATE para o stream
+                continue
+            chunk = stream.chunk
+            size = min(len(chunk), stream.send_window, self.send_window, self.remote_max_frame_size, budget)
+            remaining = chunk[size:]
+            if not remaining:
+                remaining = self._next_chunk(stream)
+            end_stream = remaining is None
+            out += frame(DATA, FLAG_END_STREAM if end_stream else 0, stream.stream_id, chunk[:size])
+            stream.send_window -= size
+            self.send_window -= size
+            budget -= size
+            stream.chunk = remaining
+            if end_stream:
+                self._end_response(stream)
+            else:
+                sending.append(stream)
+        return bytes(out)
+
+    @staticmethod
+    def _next_chunk(stream: Http2Stream) -> Optional[memoryview]:
+        """
+        Próximo chunk não vazio do body, ou None no fim. Um body vazio vira um DATA vazio
+        com END_STREAM.
+        """
+        for chunk in stream.chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                return memoryview(chunk).cast('B')
+        return None if stream.chunk is not None else memoryview(b'')
+
+    def pending_responses(self) -> int:
+        """
+        Streams cuja requisição já foi entregue e cuja resposta ainda não saiu.
+        """
+        return sum(1 for stream in self.streams.values() if stream.awaiting_response)
+
+    def phase(self) -> Optional[str]:
+        """
+        Em que a conexão está esperando (como httpServer._connection_phase): `write` se há
+        body de resposta parado no controle de fluxo, None com handlers em andamento,
+        `body` com requisição incompleta e `idle` sem streams abertos.
+        """
+        if self._sending:
+            return 'write'
+        if any(stream.awaiting_response for stream in self.streams.values()):
+            return None
+        if self._header_block is not None or any(not stream.remote_closed for stream in self.streams.values()):
+            return 'body'
+        if any(not stream.local_closed for stream in self.streams.values()):
+            # Respostas paradas esperando WINDOW_UPDATE de stream
+            return 'write'
+        return 'idle'
+
+    def close(self, code: int = NO_ERROR):
+        """
+        Envia o GOAWAY: nenhum stream novo é aceito. Com NO_ERROR os streams em andamento
+        terminam normalmente; com um erro são descartados.
+        """
+        if not self.goaway_sent:
+            self.goaway_sent = True
+            self._out += frame(GOAWAY, 0, 0, struct.pack('>LL', self.last_stream_id, code))
+        if code != NO_ERROR:
+            for stream_id in list(self.streams):
+                self._drop_stream(stream_id)
+            self._sending.clear()
+
+    def finished(self) -> bool:
+        """
+        Indica se a conexão pode ser fechada: GOAWAY enviado ou recebido, sem streams em
+        andamento e nada mais para enviar.
+        """
+        return (self.goaway_sent or self.goaway_received) and not self.streams and not self.wants_write()
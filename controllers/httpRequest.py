@@ -1,68 +1,143 @@
-from typing import Dict, Optional
+import json
+import time
+from urllib.parse import unquote_plus
+from typing import Dict, Iterable, Optional, Union
 from models.httpMethods import HttpMethod, HttpStatus, get_status_message
 
 class HttpRequest:
+    """
+    Requisição HTTP parseada diretamente sobre os bytes recebidos.
+    A linha de requisição é lida na criação; headers, query parameters e body só são
+    decodificados quando acessados. O body é uma fatia (memoryview) dos bytes originais.
+    """
 
     def __init__(self, raw_request: bytes):
-        self.raw_request = raw_request.decode('utf-8', errors='ignore')
+        self.raw_request = raw_request
         self.method: Optional[HttpMethod] = None
         self.path: str = ""
         self.version: str = ""
-        self.headers: Dict[str, str] = {}
-        self.body: str = ""
-        self.query_params: Dict[str, str] = {}
+        self.path_params: Dict[str, str] = {}
+        # Padrão da rota que atendeu a requisição (ex: "/api/data/{id}"), preenchido pelo roteador
+        self.route_pattern: Optional[str] = None
+        # Instante (perf_counter) em que a requisição terminou de chegar, para medir a duração
+        self.received_at = time.perf_counter()
+        # Stream da requisição numa conexão HTTP/2 (None no HTTP/1.x)
+        self.stream_id: Optional[int] = None
+        self.query_string: str = ""
+        self._headers: Optional[Dict[str, str]] = None
+        self._query_params: Optional[Dict[str, str]] = None
+        # Offsets dos headers e do body dentro de raw_request
+        self._head_start = 0
+        self._head_end = 0
+        self._body_bytes: Optional[memoryview] = None
+        self._body: Optional[str] = None
         
         self._parse_request()
+
+    @classmethod
+    def from_fields(cls, method: str, target: str, version: str, headers: Dict[str, str], body: bytes = b"") -> 'HttpRequest':
+        """
+        Cria uma requisição a partir de campos já separados (ex.: um stream HTTP/2), sem
+        montar nem parsear o texto do HTTP/1.x.
+        :param headers: Headers com nomes em minúsculas
+        """
+        request = cls(b"")
+        try:
+            request.method = HttpMethod(method)
+        except ValueError:
+            request.method = None
+        request.path, _, request.query_string = target.partition('?')
+        request.version = version
+        request._headers = headers
+        request.set_body(body)
+        return request
     
     def _parse_request(self):
         """
-        Faz o parsing da requisição HTTP bruta.
+        Faz o parsing da requisição HTTP bruta: localiza o fim da linha de requisição
+        e dos headers com `find`, sem dividir a requisição inteira em linhas.
         """
-        lines = self.raw_request.split('\r\n')
-        
-        if not lines:
-            return
+        raw = self.raw_request
+        line_end = raw.find(b'\r\n')
+        if line_end == -1:
+            line_end = len(raw)
         
         # Parse da primeira linha (método, path, versão)
-        first_line = lines[0].split()
+        first_line = raw[:line_end].decode('utf-8', errors='ignore').split()
         if len(first_line) >= 3:
             try:
                 self.method = HttpMethod(first_line[0])
             except ValueError:
                 self.method = None
             
-            full_path = first_line[1]
             # Separar path dos query parameters
-            if '?' in full_path:
-                self.path, query_string = full_path.split('?', 1)
-                self._parse_query_params(query_string)
-            else:
-                self.path = full_path
-            
+            self.path, _, self.query_string = first_line[1].partition('?')
             self.version = first_line[2]
         
-        # Parse dos headers
-        header_end = 0
-        for i, line in enumerate(lines[1:], 1):
-            if line == '':
-                header_end = i + 1
-                break
-            if ':' in line:
-                key, value = line.split(':', 1)
-                self.headers[key.strip().lower()] = value.strip()
-        
-        # Parse do body (se existir)
-        if header_end < len(lines):
-            self.body = '\r\n'.join(lines[header_end:])
-    
+        # Headers e body ficam como offsets nos bytes originais
+        header_end = raw.find(b'\r\n\r\n', line_end)
+        self._head_start = line_end + 2
+        self._head_end = len(raw) if header_end == -1 else header_end
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """
+        Headers da requisição com nomes em minúsculas (parseados no primeiro acesso).
+        """
+        if self._headers is None:
+            self._headers = {}
+            head = self.raw_request[self._head_start:self._head_end]
+            for line in head.decode('utf-8', errors='ignore').split('\r\n'):
+                key, sep, value = line.partition(':')
+                if sep:
+                    self._headers[key.strip().lower()] = value.strip()
+        return self._headers
+
+    @property
+    def query_params(self) -> Dict[str, str]:
+        """
+        Query parameters da URL (parseados no primeiro acesso).
+        """
+        if self._query_params is None:
+            self._query_params = {}
+            if self.query_string:
+                self._parse_query_params(self.query_string)
+        return self._query_params
+
+    @property
+    def body_bytes(self) -> memoryview:
+        """
+        Body da requisição sem cópia nem decodificação.
+        """
+        if self._body_bytes is None:
+            self._body_bytes = memoryview(self.raw_request)[self._head_end + 4:]
+        return self._body_bytes
+
+    @property
+    def body(self) -> str:
+        """
+        Body da requisição decodificado como UTF-8 (decodificado uma única vez, no primeiro acesso).
+        """
+        if self._body is None:
+            self._body = str(self.body_bytes, 'utf-8', errors='ignore')
+        return self._body
+
+    def set_body(self, body: bytes):
+        """
+        Define o body da requisição a partir dos bytes lidos do socket.
+        Usado quando o body chega separado dos headers (ex.: `RequestReader`).
+        """
+        self._body_bytes = memoryview(body)
+        self._body = None
+
     def _parse_query_params(self, query_string: str):
         """
-        Faz o parsing dos query parameters.
+        Faz o parsing dos query parameters, decodificando `%XX` e `+`.
         """
         for param in query_string.split('&'):
             if '=' in param:
                 key, value = param.split('=', 1)
-                self.query_params[key] = value
+                self._query_params[unquote_plus(key)] = unquote_plus(value)
     
     def get_header(self, name: str) -> Optional[str]:
         """
@@ -70,12 +145,29 @@ class HttpRequest:
         """
         return self.headers.get(name.lower())
     
+    def get_path_param(self, name: str) -> Optional[str]:
+        """
+        Retorna o valor de um parâmetro do path (ex: `id` em `/api/data/{id}`).
+        """
+        return self.path_params.get(name)
+
     def get_query_param(self, name: str) -> Optional[str]:
         """
         Retorna o valor de um query parameter específico.
         """
         return self.query_params.get(name)
     
+    def is_keep_alive(self) -> bool:
+        """
+        Indica se o cliente quer manter a conexão aberta após a resposta.
+        No HTTP/1.1 a conexão é persistente por padrão, a menos que venha `Connection: close`;
+        no HTTP/1.0 só é persistente com `Connection: keep-alive`.
+        """
+        tokens = [token.strip().lower() for token in self.headers.get('connection', '').split(',')]
+        if self.version == 'HTTP/1.1':
+            return 'close' not in tokens
+        return 'keep-alive' in tokens
+
     def is_valid(self) -> bool:
         """
         Verifica se a requisição é válida.
@@ -85,16 +177,53 @@ class HttpRequest:
 class HttpResponse:
     """
     Classe para representar uma resposta HTTP.
+    O body pode ser `str` (codificado uma única vez, aqui), `bytes`/`memoryview` (usados sem
+    cópia) ou um iterador de chunks (`bytes` ou `str`) de tamanho desconhecido, enviado com
+    `Transfer-Encoding: chunked`.
     """
-    def __init__(self, status_code: int = 200, body: str = "", content_type: str = "text/html"):
+    # Indentação do JSON de json_response; None gera JSON compacto, sem espaços
+    json_indent: Optional[int] = 2
+
+    def __init__(self, status_code: int = 200, body: Union[str, bytes, memoryview, Iterable] = "", content_type: str = "text/html"):
         self.status_code = status_code
-        self.body = body
         self.content_type = content_type
         self.headers: Dict[str, str] = {}
         
         # Headers padrão
         self.headers['Content-Type'] = content_type
-        self.headers['Content-Length'] = str(len(body.encode('utf-8')))
+        self.body = body
+
+    @property
+    def body(self) -> str:
+        """
+        Body decodificado como texto (vazio para bodies em streaming).
+        """
+        if self.body_stream is not None:
+            return ""
+        return str(self.body_data, 'utf-8', errors='ignore')
+
+    @body.setter
+    def body(self, body: Union[str, bytes, memoryview, Iterable]):
+        self.body_stream: Optional[Iterable] = None
+        if isinstance(body, str):
+            self.body_data = body.encode('utf-8')
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            self.body_data = body
+        else:
+            self.body_data = b""
+            self.body_stream = body
+        if self.body_stream is None:
+            self.headers['Content-Length'] = str(memoryview(self.body_data).nbytes)
+            self.headers.pop('Transfer-Encoding', None)
+        else:
+            self.headers.pop('Content-Length', None)
+            self.headers['Transfer-Encoding'] = 'chunked'
+
+    def is_streaming(self) -> bool:
+        """
+        Indica se o body é um iterador de tamanho desconhecido.
+        """
+        return self.body_stream is not None and self.has_body()
     
     def add_header(self, name: str, value: str):
         """
@@ -102,10 +231,50 @@ class HttpResponse:
         """
         self.headers[name] = value
     
-    def to_bytes(self) -> bytes:
+    def set_keep_alive(self, keep_alive: bool, timeout: float = 0, max_requests: int = 0):
         """
-        Converte a resposta HTTP para bytes.
+        Define os headers `Connection` e `Keep-Alive` da resposta.
+        """
+        if keep_alive:
+            self.headers['Connection'] = 'keep-alive'
+            self.headers['Keep-Alive'] = f"timeout={int(timeout)}, max={max_requests}"
+        else:
+            self.headers['Connection'] = 'close'
+            self.headers.pop('Keep-Alive', None)
+
+    def header_items(self) -> list:
         """
+        Headers da resposta como (nome, valor), para protocolos que não usam o texto do
+        HTTP/1.x (ex.: HTTP/2).
+        """
+        if not self.has_body():
+            self.headers.pop('Content-Length', None)
+        return list(self.headers.items())
+
+    def iter_body(self):
+        """
+        Body da resposta em chunks de bytes, sem enquadramento (vazio para status que não
+        podem ter corpo). Bodies em streaming são consumidos aos poucos.
+        """
+        if not self.has_body():
+            return iter(())
+        if self.body_stream is not None:
+            return self._iter_chunks(chunked=False)
+        return iter((self.body_data,))
+
+    def has_body(self) -> bool:
+        """
+        Respostas 1xx, 204 e 304 não podem ter corpo; numa conexão persistente
+        esses bytes seriam lidos como o início da próxima resposta.
+        """
+        return not (100 <= self.status_code < 200 or self.status_code in (204, 304))
+
+    def head_bytes(self) -> bytes:
+        """
+        Linha de status e headers, cada linha terminada em \r\n (sem a linha em branco final).
+        """
+        if not self.has_body():
+            self.headers.pop('Content-Length', None)
         status_message = get_status_message(self.status_code)
         
         response_lines = [
@@ -115,15 +284,68 @@ class HttpResponse:
         # Adicionar headers
         for name, value in self.headers.items():
             response_lines.append(f"{name}: {value}")
-        
-        # Linha em branco antes do body
         response_lines.append("")
         
-        # Adicionar body
-        if self.body:
-            response_lines.append(self.body)
-        
         return '\r\n'.join(response_lines).encode('utf-8')
+
+    def body_bytes(self) -> bytes:
+        """
+        Body da resposta em bytes (vazio para status que não podem ter corpo).
+        Bodies em streaming são consumidos e juntados.
+        """
+        if not self.has_body():
+            return b""
+        if self.body_stream is not None:
+            return b"".join(self._iter_chunks(chunked=False))
+        return self.body_data
+
+    def body_length(self) -> Optional[int]:
+        """
+        Tamanho do body em bytes, sem serializá-lo (None para bodies em streaming).
+        """
+        if not self.has_body():
+            return 0
+        if self.body_stream is not None:
+            return None
+        return memoryview(self.body_data).nbytes
+
+    def to_buffers(self, chunked: bool = True) -> list:
+        """
+        Partes da resposta para uma escrita vetorizada (sendmsg), sem concatenar headers e body.
+        Para bodies em streaming o último item é um gerador que produz os chunks já
+        enquadrados; com `chunked=False` (clientes HTTP/1.0) os bytes saem crus e a conexão
+        precisa ser fechada ao final.
+        """
+        if self.is_streaming():
+            if not chunked:
+                self.headers.pop('Transfer-Encoding', None)
+            return [self.head_bytes(), b"\r\n", self._iter_chunks(chunked)]
+        return [self.head_bytes(), b"\r\n", self.body_bytes()]
+
+    def _iter_chunks(self, chunked: bool):
+        for chunk in self.body_stream:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            if chunked:
+                yield b"%x\r\n" % len(chunk)
+                yield chunk
+                yield b"\r\n"
+            else:
+                yield chunk
+        if chunked:
+            yield b"0\r\n\r\n"
+
+    def to_bytes(self) -> bytes:
+        """
+        Converte a resposta HTTP para bytes.
+        """
+        # Linha em branco antes do body (o bloco de headers sempre termina em \r\n\r\n)
+        parts = self.to_buffers()
+        if self.is_streaming():
+            parts = parts[:-1] + list(parts[-1])
+        return b"".join(parts)
     
     @classmethod
     def error_response(cls, status_code: int, message: str = "") -> 'HttpResponse':
@@ -151,7 +373,34 @@ class HttpResponse:
         """
         Cria uma resposta JSON.
         """
-        import json
-        json_data = json.dumps(data, indent=2)
+        json_data = cls._json_encoder().encode(data).encode('utf-8')
         response = cls(status_code, json_data, "application/json")
         return response
+
+    @classmethod
+    def json_stream_response(cls, data, status_code: int = 200, chunk_size: int = 65536) -> 'HttpResponse':
+        """
+        Cria uma resposta JSON em streaming: o documento é serializado aos poucos
+        (`iterencode`) e enviado em chunks de até `chunk_size` caracteres, sem montar o
+        JSON inteiro em memória.
+        """
+        def chunks():
+            pending = []
+            size = 0
+            for fragment in cls._json_encoder().iterencode(data):
+                pending.append(fragment)
+                size += len(fragment)
+                if size >= chunk_size:
+                    yield ''.join(pending)
+                    pending = []
+                    size = 0
+            if pending:
+                yield ''.join(pending)
+
+        return cls(status_code, chunks(), "application/json")
+
+    @classmethod
+    def _json_encoder(cls) -> json.JSONEncoder:
+        if cls.json_indent is None:
+            return json.JSONEncoder(separators=(',', ':'))
+        return json.JSONEncoder(indent=cls.json_indent)
@@ -1,14 +1,58 @@
-from typing import Dict, Callable, Optional
+import functools
+import time
+from typing import Callable, Iterable, List, Optional, Set, Tuple, Union
+from controllers.accessLog import AccessLog
+from controllers.compression import Compressor
 from controllers.database import Database
+from controllers.metrics import Metrics
+from controllers.middleware import Middleware, compose, is_awaitable
+from controllers.routeTree import Route, RouteTree
+from controllers.responseCache import CachedResponse, ResponseCache
+from controllers.staticFiles import StaticFiles
 from models.httpMethods import HttpMethod, HttpStatus
 from controllers.httpRequest import HttpRequest, HttpResponse
 
+@functools.lru_cache(maxsize=None)
+def _server_info() -> dict:
+    """
+    Parte fixa de GET /info, calculada uma vez, na primeira requisição: `platform.platform()`
+    lê arquivos do sistema e chama o uname, e o resultado não muda enquanto o processo vive.
+    """
+    import platform
+    import sys
+    return {
+        "server": "Python HTTP Server",
+        "version": "1.0.0",
+        "python_version": sys.version,
+        "platform": platform.platform(),
+        "supported_methods": [method.value for method in HttpMethod],
+    }
+
+
 class HttpRouter:
     """
     Sistema de roteamento HTTP baseado em método e path.
+    Os paths podem ter parâmetros (`/api/data/{id}`) e curingas (`/files/{path*}`); veja RouteTree.
+    As respostas são comprimidas conforme o `Accept-Encoding` do cliente; veja Compressor.
+    :param cache_size: Número máximo de respostas no cache de rotas estáticas/com TTL
+    :param compression: Compressor das respostas (padrão: gzip/deflate a partir de 1 KiB)
+    :param metrics: Métricas das requisições, exportadas em /metrics (padrão: ligadas)
+    :param log: Log onde são registrados os erros dos handlers (padrão: stdout)
+    :param database: Banco das rotas /api/data (padrão: models/fake_db.json, sem índices)
     """
-    def __init__(self):
-        self.routes: Dict[str, Dict[str, Callable]] = {}
+    # Query parameters de GET /api/data que não são filtros por campo
+    SCAN_PARAMS = ('_from', '_to', '_limit')
+
+    def __init__(self, cache_size: int = 256, compression: Optional[Compressor] = None, metrics: Optional[Metrics] = None,
+                 log: Optional[AccessLog] = None, database: Optional[Database] = None):
+        self.routes = RouteTree()
+        self.cache = ResponseCache(cache_size)
+        self.compression = compression or Compressor()
+        self.metrics = metrics or Metrics()
+        self.log = log or AccessLog()
+        # (prefixo, métodos ou None, middleware), na ordem de registro
+        self.middleware: List[Tuple[str, Optional[Set[str]], Middleware]] = []
+        self.database = database or Database()
         self._setup_default_routes()
     
     def _setup_default_routes(self):
@@ -16,39 +60,139 @@ class HttpRouter:
         Configura rotas padrão do servidor.
         """
         # Rota padrão para GET /
-        self.add_route(HttpMethod.GET, "/", self._default_get_handler)
+        self.add_route(HttpMethod.GET, "/", self._default_get_handler, static=True)
         
         # Rota para informações do servidor
         self.add_route(HttpMethod.GET, "/info", self._server_info_handler)
 
         # Rotas para api/data
-        self.add_route(HttpMethod.POST, "/api/data", self._api_data_post_handler)
-        self.add_route(HttpMethod.GET, "/api/data", self._api_data_get_handler)
+        self.add_route(HttpMethod.POST, "/api/data", self._api_data_post_handler, blocking=True)
+        # Em cache até a versão do banco mudar: a escrita pode ter sido feita por outro worker
+        self.add_route(HttpMethod.GET, "/api/data", self._api_data_get_handler, static=True, cache_version=self.database.version)
         self.add_route(HttpMethod.DELETE, "/api/data", self._api_data_delete_handler)
         self.add_route(HttpMethod.PATCH, "/api/data", self._api_data_patch_handler)
-        self.add_route(HttpMethod.GET, "/health", self._health_handler)
+        self.add_route(HttpMethod.GET, "/api/data/export", self._api_data_export_handler)
+        self.add_route(HttpMethod.GET, "/api/data/{id}", self._api_data_item_handler)
+        self.add_route(HttpMethod.DELETE, "/api/data/{id}", self._api_data_item_delete_handler, blocking=True)
+        self.add_route(HttpMethod.GET, "/health", self._health_handler, static=True)
+        if self.metrics.enabled:
+            self.add_route(HttpMethod.GET, "/metrics", self._metrics_handler)
         
     
-    def add_route(self, method: HttpMethod, path: str, handler: Callable[[HttpRequest], HttpResponse]):
+    def add_route(self, method: Union[HttpMethod, Iterable[HttpMethod]], path: str, handler: Callable[[HttpRequest], HttpResponse], blocking: bool = False,
+                  static: bool = False, cache_ttl: Optional[float] = None, middleware: Iterable[Middleware] = (),
+                  cache_version: Optional[Callable[[], object]] = None):
         """
         Adiciona uma nova rota ao roteador, podendo definir qual será o método http dela.
+        O handler pode ser uma função comum ou `async def`. Os parâmetros do path ficam
+        disponíveis em `request.path_params`.
         
         Args:
-            method: Método HTTP (GET, POST, etc.)
-            path: Caminho da rota (ex: "/api/users")
+            method: Método HTTP (GET, POST, etc.) ou uma lista de métodos
+            path: Caminho da rota (ex: "/api/users" ou "/api/users/{id}")
             handler: Função que processa a requisição
+            blocking: Handler síncrono que faz I/O bloqueante; no backend asyncio ele roda
+                em uma thread do executor em vez de travar o loop de eventos
+            static: A resposta do GET é sempre a mesma; é serializada uma vez e reenviada
+                como bytes prontos até `invalidate_cache`
+            cache_ttl: A resposta do GET pode ser reaproveitada por esse número de segundos
+            cache_version: Com `static` ou `cache_ttl`, função que devolve a versão dos dados da
+                resposta (ex: `Database.version`); a resposta em cache só é reaproveitada
+                enquanto a versão não mudar, mesmo que a mudança venha de outro processo
+            middleware: Middlewares só desta rota, executados depois dos registrados com `use`
+        """
+        methods = [method] if isinstance(method, HttpMethod) else list(method)
+        cacheable = static or cache_ttl is not None
+        for http_method in methods:
+            route = Route(http_method.value, path, handler, blocking, cacheable, None if static else cache_ttl, tuple(middleware),
+                          cache_version)
+            self._compose(route)
+            self.routes.insert(route)
+
+    def use(self, middleware: Middleware, path: str = "/", methods: Optional[Iterable[HttpMethod]] = None):
+        """
+        Registra um middleware para as rotas sob o prefixo `path` (todas, por padrão) e,
+        opcionalmente, só para alguns métodos. Veja controllers/middleware.py.
+        A cadeia de cada rota é remontada aqui, uma vez; por requisição só rodam os
+        middlewares que se aplicam àquela rota, sem percorrer a lista.
+        Os middlewares rodam antes do cache de respostas, então um curto-circuito (ex.:
+        autenticação) vale também para rotas em cache.
+        
+        Args:
+            middleware: Função `middleware(request, call_next)`; veja `before`/`after` para hooks simples
+            path: Prefixo dos padrões de rota afetados (ex: "/api")
+            methods: Métodos HTTP afetados (padrão: todos)
         """
+        method_values = None if methods is None else {http_method.value for http_method in methods}
+        self.middleware.append((path, method_values, middleware))
+        for route in self.routes:
+            self._compose(route)
 
-        method_key = method.value
-        if method_key not in self.routes:
-            self.routes[method_key] = {}
+    def _compose(self, route: Route):
+        """
+        Monta a cadeia da rota: middlewares globais que se aplicam a ela, depois os da
+        própria rota e por fim o cache + handler.
+        """
+        chain = []
+        for prefix, method_values, middleware in self.middleware:
+            path_prefix = prefix.rstrip('/')
+            if path_prefix and route.pattern != path_prefix and not route.pattern.startswith(path_prefix + '/'):
+                continue
+            if method_values is not None and route.method not in method_values:
+                continue
+            chain.append(middleware)
+        chain.extend(route.middleware)
+        route.pipeline = compose(chain, functools.partial(self._handle, route))
+
+    def add_static(self, prefix: str, directory: str, **options) -> StaticFiles:
+        """
+        Serve os arquivos de `directory` sob o prefixo de URL `prefix` (ex: "/assets").
+        Os arquivos saem com sendfile, com suporte a Range e GET condicional; veja StaticFiles.
         
-        self.routes[method_key][path] = handler
+        Args:
+            prefix: Prefixo da URL
+            directory: Diretório com os arquivos
+            options: Parâmetros repassados ao StaticFiles (max_open_files, revalidate, index)
+        """
+        static_files = StaticFiles(directory, **options)
+        self.add_route(HttpMethod.GET, prefix.rstrip('/') + '/{path*}', static_files.handle)
+        return static_files
+
+    def invalidate_cache(self, path: Optional[str] = None):
+        """
+        Descarta as respostas em cache de um path, ou de todos se `path` for None.
+        """
+        self.cache.invalidate(path)
     
     def route(self, request: HttpRequest) -> HttpResponse:
         
         """
         Roteia uma requisição para o handler apropriado.
+        Handlers `async def` chamados por aqui (fora de um loop asyncio) são executados até o fim.
+        
+        Args:
+            request: Objeto HttpRequest
+            
+        Returns:
+            HttpResponse: Resposta HTTP
+        """
+        if not self.metrics.enabled:
+            return self._route(request)
+        start = time.perf_counter()
+        response = self._route(request)
+        self._observe(request, response, start)
+        return response
+
+    def _route(self, request: HttpRequest) -> HttpResponse:
+        route, error = self._find_route(request)
+        if error:
+            return error
+        return self._call_handler(route.pipeline, request)
+
+    async def route_async(self, request: HttpRequest) -> HttpResponse:
+        """
+        Versão de `route` para o backend asyncio: handlers `async def` são aguardados no
+        loop corrente, e rotas bloqueantes rodam no executor padrão.
         
         Args:
             request: Objeto HttpRequest
@@ -56,27 +200,163 @@ class HttpRouter:
         Returns:
             HttpResponse: Resposta HTTP
         """
+        if not self.metrics.enabled:
+            return await self._route_async(request)
+        start = time.perf_counter()
+        response = await self._route_async(request)
+        self._observe(request, response, start)
+        return response
+
+    async def _route_async(self, request: HttpRequest) -> HttpResponse:
+        route, error = self._find_route(request)
+        if error:
+            return error
+        if route.blocking:
+            import asyncio
+            return await asyncio.get_running_loop().run_in_executor(None, self._call_handler, route.pipeline, request)
+
+        try:
+            response = route.pipeline(request)
+            if is_awaitable(response):
+                response = await response
+        except Exception as e:
+            return self._handler_error(request, e)
+        return response
+
+    def _handle(self, route: Route, request: HttpRequest):
+        """
+        Fim da cadeia de uma rota: resposta do cache ou chamada ao handler, cuja resposta é
+        guardada no cache/comprimida. Para handlers `async def` devolve um awaitable.
+        """
+        # Lida antes do handler: uma escrita durante a execução dele torna a entrada velha
+        version = route.cache_version() if route.cache_version and request.method == HttpMethod.GET else None
+        cached = self._cached_response(route, request, version)
+        if cached:
+            return cached
+        try:
+            response = route.handler(request)
+        except Exception as e:
+            return self._handler_error(request, e)
+        if is_awaitable(response):
+            return self._store_async(route, request, response, version)
+        return self._store_response(route, request, response, version)
+
+    async def _store_async(self, route: Route, request: HttpRequest, awaitable, version=None) -> HttpResponse:
+        try:
+            response = await awaitable
+        except Exception as e:
+            return self._handler_error(request, e)
+        return self._store_response(route, request, response, version)
+
+    def _observe(self, request: HttpRequest, response: HttpResponse, start: float):
+        method = request.method.value if request.method else 'INVALID'
+        bytes_out = response.body_length()
+        if bytes_out is None:
+            # Streaming: o tamanho só é conhecido quando a conexão termina de consumir o body
+            response.body_stream = self._count_stream(response.body_stream, method, request.route_pattern)
+            bytes_out = 0
+        self.metrics.observe_request(method, request.route_pattern, response.status_code,
+                                     time.perf_counter() - start, len(request.body_bytes), bytes_out)
+
+    def _count_stream(self, stream, method: str, route: Optional[str]):
+        count = 0
+        try:
+            for chunk in stream:
+                count += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                yield chunk
+        finally:
+            self.metrics.add_route_bytes_out(method, route, count)
+
+    def _cached_response(self, route: Route, request: HttpRequest, version=None) -> Optional[HttpResponse]:
+        """
+        Resposta do cache para um GET em rota cacheável, sem chamar o handler: 304 se o
+        `If-None-Match` do cliente bate com o ETag, senão os bytes em cache.
+        """
+        if not route.cacheable or request.method != HttpMethod.GET:
+            return None
+        entry = self.cache.get(ResponseCache.key(request), version)
+        if entry is None:
+            return None
+        return self._conditional_response(entry, request)
+
+    def _store_response(self, route: Route, request: HttpRequest, response: HttpResponse, version=None) -> HttpResponse:
+        """
+        Guarda a resposta 200 de uma rota cacheável e a devolve já serializada.
+        As demais respostas só passam pela compressão.
+        """
+        if not route.cacheable or request.method != HttpMethod.GET or response.status_code != HttpStatus.OK.value:
+            return self.compression.apply(request, response)
+        compressible = self.compression.is_compressible(response)
+        if compressible:
+            response.add_header('Vary', 'Accept-Encoding')
+        entry = self.cache.put(ResponseCache.key(request), response, route.cache_ttl, compressible, version)
+        return self._conditional_response(entry, request)
+
+    def _conditional_response(self, entry, request: HttpRequest) -> HttpResponse:
+        """
+        304 se o `If-None-Match` do cliente bate com o ETag da variante negociada, senão os
+        bytes em cache dessa variante (comprimida uma única vez por entrada).
+        """
+        encoding = self.compression.negotiate(request) if entry.compressible else None
+        variant = entry.variant(encoding, self.compression)
+        etag = variant[0]
+        if entry.matches(etag, request.get_header('if-none-match')):
+            response = HttpResponse(HttpStatus.NOT_MODIFIED.value)
+            response.headers.pop('Content-Type', None)
+            response.add_header('ETag', etag)
+            if entry.compressible:
+                response.add_header('Vary', 'Accept-Encoding')
+            return response
+        return CachedResponse(entry, variant)
+
+    def _find_route(self, request: HttpRequest) -> Tuple[Optional[Route], Optional[HttpResponse]]:
+        """
+        Localiza a rota da requisição e preenche `request.path_params`.
+        Retorna (rota, None) ou (None, resposta de erro): 404 se nenhum padrão casa com o
+        path, 405 com o header `Allow` se o path existe só para outros métodos.
+        """
         if not request.is_valid():
-            return HttpResponse.error_response(HttpStatus.BAD_REQUEST.value, "Invalid HTTP request")
+            return None, HttpResponse.error_response(HttpStatus.BAD_REQUEST.value, "Invalid HTTP request")
         
         method_key = request.method.value
         path = request.path
         
-        # Verificar se existe rota específica para o path
-        if method_key in self.routes and path in self.routes[method_key]:
-            try:
-                return self.routes[method_key][path](request)
-            except Exception as e:
-                print(f"Erro ao processar requisição {method_key} {path}: {e}")
-                return HttpResponse.error_response(HttpStatus.INTERNAL_SERVER_ERROR.value)
-        
+        routes, params = self.routes.lookup(path)
+        if routes is None:
+            return None, HttpResponse.error_response(HttpStatus.NOT_FOUND.value, f"Route {path} not found")
         
-        # Verificar se o método é suportado mas não há rota específica
-        if method_key in self.routes:
-            return HttpResponse.error_response(HttpStatus.NOT_FOUND.value, f"Route {path} not found")
+        route = routes.get(method_key)
+        if route is None:
+            # O path existe, mas não para este método
+            response = HttpResponse.error_response(HttpStatus.METHOD_NOT_ALLOWED.value, f"Method {method_key} not allowed")
+            response.add_header('Allow', ', '.join(sorted(routes)))
+            return None, response
         
-        # Método não suportado
-        return HttpResponse.error_response(HttpStatus.METHOD_NOT_ALLOWED.value, f"Method {method_key} not allowed")
+        request.path_params = params
+        request.route_pattern = route.pattern
+        return route, None
+
+    def _call_handler(self, handler: Callable, request: HttpRequest) -> HttpResponse:
+        """
+        Chama um handler (ou a cadeia de uma rota) de forma síncrona, convertendo exceções em 500.
+        """
+        try:
+            response = handler(request)
+            if is_awaitable(response):
+                # Só importado aqui: o backend selectors não carrega o asyncio na partida
+                import asyncio
+                response = asyncio.run(self._await(response))
+            return response
+        except Exception as e:
+            return self._handler_error(request, e)
+
+    @staticmethod
+    async def _await(awaitable):
+        return await awaitable
+
+    def _handler_error(self, request: HttpRequest, error: Exception) -> HttpResponse:
+        self.log.error("Erro ao processar requisição", method=request.method.value, path=request.path, error=repr(error))
+        return HttpResponse.error_response(HttpStatus.INTERNAL_SERVER_ERROR.value)
     
     def _default_get_handler(self, request: HttpRequest) -> HttpResponse:
         """
@@ -108,6 +388,9 @@ class HttpRouter:
         <div class="method">
             <strong>GET /health</strong> - <span class="endpoint">Health check</span>
         </div>
+        <div class="method">
+            <strong>GET /metrics</strong> - <span class="endpoint">Metricas no formato do Prometheus</span>
+        </div>
         
         <h2>Metodos HTTP Suportados</h2>
         <ul>
@@ -135,22 +418,13 @@ curl -X DELETE http://localhost:8080/api/data
         """
         Handler para informações do servidor.
         """
-        import platform
-        import sys
-        
-        info = {
-            "server": "Python HTTP Server",
-            "version": "1.0.0",
-            "python_version": sys.version,
-            "platform": platform.platform(),
-            "supported_methods": [method.value for method in HttpMethod],
-            "request_info": {
-                "method": request.method.value if request.method else "Unknown",
-                "path": request.path,
-                "version": request.version,
-                "headers_count": len(request.headers),
-                "query_params": request.query_params
-            }
+        info = dict(_server_info())
+        info["request_info"] = {
+            "method": request.method.value if request.method else "Unknown",
+            "path": request.path,
+            "version": request.version,
+            "headers_count": len(request.headers),
+            "query_params": request.query_params
         }
         
         return HttpResponse.json_response(info)
@@ -158,20 +432,78 @@ curl -X DELETE http://localhost:8080/api/data
     def _api_data_get_handler(self, req: HttpRequest) -> HttpResponse:
         """
         Handler para requisições GET para /api/data.
-        Simula a recuperação de um recurso.
+        Sem query parameters, simula a recuperação de um recurso. Com `campo=valor`, retorna
+        os registros do banco cujo campo tem o valor, pelo índice secundário do campo (vários
+        filtros são combinados com E). `_from`, `_to` e `_limit` retornam os registros com
+        chave na faixa `[_from, _to)`, em ordem de chave, e também limitam os filtros.
         """
-        data = {"id": 123, "name": "Exemplo de Recurso", "status": "active"}
-        return HttpResponse.json_response(data)
+        params = req.query_params
+        if not params:
+            data = {"id": 123, "name": "Exemplo de Recurso", "status": "active"}
+            return HttpResponse.json_response(data)
+
+        limit = params.get('_limit')
+        if limit is not None:
+            if not limit.isdigit():
+                return HttpResponse.error_response(HttpStatus.BAD_REQUEST.value, "_limit must be a non-negative integer")
+            limit = int(limit)
+        start, end = params.get('_from'), params.get('_to')
+        filters = {field: value for field, value in params.items() if field not in self.SCAN_PARAMS}
+        if not filters:
+            return HttpResponse.json_response(dict(self.database.scan(start, end, limit)))
+
+        unindexed = [field for field in filters if field not in self.database.index_fields]
+        if unindexed:
+            return HttpResponse.error_response(HttpStatus.BAD_REQUEST.value, f"Field {unindexed[0]} is not indexed")
+        results = None
+        for field, value in filters.items():
+            found = self.database.find(field, value)
+            results = found if results is None else {key: results[key] for key in results.keys() & found.keys()}
+            if not results:
+                break
+        keys = sorted(key for key in results if (start is None or key >= start) and (end is None or key < end))
+        if limit is not None:
+            keys = keys[:limit]
+        return HttpResponse.json_response({key: results[key] for key in keys})
+
+    def _api_data_export_handler(self, req: HttpRequest) -> HttpResponse:
+        """
+        Handler para requisições GET para /api/data/export.
+        Exporta o banco inteiro como JSON em streaming (chunked), sem montar o documento em memória.
+        """
+        return HttpResponse.json_stream_response(self.database.get_data())
 
-    def _api_data_post_handler(self, req: HttpRequest, database: Database = Database()) -> HttpResponse:
+    def _api_data_item_handler(self, req: HttpRequest) -> HttpResponse:
+        """
+        Handler para requisições GET para /api/data/{id}.
+        Retorna um registro do banco pela chave.
+        """
+        key = req.get_path_param("id")
+        value = self.database.get(key)
+        if value is None:
+            return HttpResponse.error_response(HttpStatus.NOT_FOUND.value, f"Resource {key} not found")
+        return HttpResponse.json_response({key: value})
+
+    def _api_data_item_delete_handler(self, req: HttpRequest) -> HttpResponse:
+        """
+        Handler para requisições DELETE para /api/data/{id}.
+        Remove um registro do banco pela chave.
+        """
+        key = req.get_path_param("id")
+        if not self.database.delete(key):
+            return HttpResponse.error_response(HttpStatus.NOT_FOUND.value, f"Resource {key} not found")
+        self.invalidate_cache("/api/data")
+        return HttpResponse.json_response({"message": "Recurso deletado com sucesso."})
+
+    def _api_data_post_handler(self, req: HttpRequest) -> HttpResponse:
             """
             Handler para requisições POST para /api/data.
             Simula a criação de um recurso.
             """
             # Você pode processar o body aqui, por exemplo, req.body
-            if database:
-                print(req.body)
-                database.save_data(req.body)
+            if self.database:
+                self.database.save_data(req.body)
+                self.invalidate_cache("/api/data")
             
             return HttpResponse.json_response({"message": "Recurso criado com sucesso!", "data_received": req.body}, status_code=HttpStatus.CREATED.value)
 
@@ -193,5 +525,11 @@ curl -X DELETE http://localhost:8080/api/data
         data = {"status": "ok", "message": "Servidor em funcionamento"}
         return HttpResponse.json_response(data)
 
+    def _metrics_handler(self, request: HttpRequest) -> HttpResponse:
+        """
+        Handler para GET /metrics, no formato texto do Prometheus.
+        """
+        return HttpResponse(200, self.metrics.render_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+
 
         
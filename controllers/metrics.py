@@ -0,0 +1,204 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Limites superiores (segundos) dos buckets do histograma de latência
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Label das requisições que não casaram com nenhuma rota (404/405/400), para não criar
+# uma série por path desconhecido
+UNMATCHED_ROUTE = 'unmatched'
+
+
+class RouteStats:
+    """
+    Contadores de uma rota (método + padrão do path) em um shard.
+    `buckets` guarda a contagem de cada bucket (não acumulada); a soma acumulada que o
+    formato do Prometheus pede é feita só na exportação.
+    """
+    __slots__ = ('count', 'total_seconds', 'buckets', 'statuses', 'bytes_in', 'bytes_out')
+
+    def __init__(self, bucket_count: int):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (bucket_count + 1)
+        self.statuses: Dict[int, int] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class MetricsShard:
+    """
+    Contadores de uma thread. Só a thread dona escreve aqui, então o caminho quente não
+    usa lock; a exportação apenas lê e soma os shards.
+    """
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.connections_opened = 0
+
+
+class Metrics:
+    """
+    Instrumentação do servidor: requisições por rota e status, histograma de latência por
+    rota, bytes recebidos/enviados e conexões, exportados no formato texto do Prometheus.
+    Cada thread tem seus próprios contadores (MetricsShard), somados só na exportação.
+    Com `enabled=False` todos os métodos de registro retornam na hora.
+    :param enabled: Liga a coleta
+    :param buckets: Limites superiores dos buckets de latência, em segundos
+    """
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: List[MetricsShard] = []
+        self._shards_lock = threading.Lock()
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def _shard(self) -> MetricsShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = MetricsShard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _route_stats(self, method: str, route: Optional[str]) -> RouteStats:
+        routes = self._shard().routes
+        key = (method, route or UNMATCHED_ROUTE)
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = RouteStats(len(self.buckets))
+        return stats
+
+    def observe_request(self, method: str, route: Optional[str], status_code: int, seconds: float,
+                        bytes_in: int = 0, bytes_out: int = 0):
+        """
+        Registra uma requisição atendida e o tempo até a resposta ficar pronta.
+        :param bytes_in: Bytes do body da requisição
+        :param bytes_out: Bytes do body da resposta (já comprimido, se for o caso)
+        """
+        if not self.enabled:
+            return
+        stats = self._route_stats(method, route)
+        stats.count += 1
+        stats.total_seconds += seconds
+        stats.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+        stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+        stats.bytes_in += bytes_in
+        stats.bytes_out += bytes_out
+
+    def add_route_bytes_out(self, method: str, route: Optional[str], count: int):
+        """
+        Soma bytes de resposta a uma rota depois de `observe_request`, para bodies em
+        streaming, cujo tamanho só se sabe ao fim do envio.
+        """
+        if self.enabled and count:
+            self._route_stats(method, route).bytes_out += count
+
+    def add_bytes_received(self, count: int):
+        if self.enabled and count:
+            self._shard().bytes_received += count
+
+    def add_bytes_sent(self, count: int):
+        if self.enabled and count:
+            self._shard().bytes_sent += count
+
+    def connection_opened(self):
+        if self.enabled:
+            self._shard().connections_opened += 1
+
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """
+        Registra um valor lido na hora da exportação (ex.: conexões abertas).
+        """
+        self._gauges[name] = (help_text, read)
+
+    def snapshot(self) -> dict:
+        """
+        Soma os shards de todas as threads.
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        routes: Dict[Tuple[str, str], RouteStats] = {}
+        totals = {'bytes_received': 0, 'bytes_sent': 0, 'connections_opened': 0}
+        for shard in shards:
+            totals['bytes_received'] += shard.bytes_received
+            totals['bytes_sent'] += shard.bytes_sent
+            totals['connections_opened'] += shard.connections_opened
+            # list() copia o dict de uma vez, mesmo que a thread dona crie uma rota agora
+            for key, stats in list(shard.routes.items()):
+                merged = routes.get(key)
+                if merged is None:
+                    merged = routes[key] = RouteStats(len(self.buckets))
+                merged.count += stats.count
+                merged.total_seconds += stats.total_seconds
+                merged.bytes_in += stats.bytes_in
+                merged.bytes_out += stats.bytes_out
+                for i, value in enumerate(list(stats.buckets)):
+                    merged.buckets[i] += value
+                for status_code, value in list(stats.statuses.items()):
+                    merged.statuses[status_code] = merged.statuses.get(status_code, 0) + value
+        totals['routes'] = routes
+        return totals
+
+    def render_prometheus(self) -> str:
+        """
+        Exporta as métricas no formato texto do Prometheus (versão 0.0.4).
+        """
+        snapshot = self.snapshot()
+        routes = sorted(snapshot['routes'].items())
+        lines = [
+            '# HELP http_requests_total Requisições atendidas, por rota e status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (method, route), stats in routes:
+            for status_code, value in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {value}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Tempo até a resposta ficar pronta, por rota.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (method, route), stats in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, value in zip(self.buckets, stats.buckets):
+                cumulative += value
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {stats.total_seconds}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+        lines += [
+            '# HELP http_request_body_bytes_total Bytes de body recebidos, por rota.',
+            '# TYPE http_request_body_bytes_total counter',
+        ]
+        for (method, route), stats in routes:
+            lines.append(f'http_request_body_bytes_total{{method="{method}",route="{_escape(route)}"}} {stats.bytes_in}')
+
+        lines += [
+            '# HELP http_response_body_bytes_total Bytes de body enviados, por rota.',
+            '# TYPE http_response_body_bytes_total counter',
+        ]
+        for (method, route), stats in routes:
+            lines.append(f'http_response_body_bytes_total{{method="{method}",route="{_escape(route)}"}} {stats.bytes_out}')
+
+        lines += [
+            '# HELP http_received_bytes_total Bytes lidos dos sockets dos clientes.',
+            '# TYPE http_received_bytes_total counter',
+            f'http_received_bytes_total {snapshot["bytes_received"]}',
+            '# HELP http_sent_bytes_total Bytes enviados aos clientes.',
+            '# TYPE http_sent_bytes_total counter',
+            f'http_sent_bytes_total {snapshot["bytes_sent"]}',
+            '# HELP http_connections_total Conexões aceitas.',
+            '# TYPE http_connections_total counter',
+            f'http_connections_total {snapshot["connections_opened"]}',
+        ]
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {read()}']
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
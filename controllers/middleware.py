@@ -0,0 +1,107 @@
+import collections.abc
+import hmac
+import time
+from typing import Callable, Iterable, Optional
+
+from controllers.httpRequest import HttpRequest, HttpResponse
+from models.httpMethods import HttpStatus
+
+# Um middleware recebe a requisição e `call_next`, que executa o resto da cadeia (os
+# próximos middlewares e o handler). Pode devolver a própria resposta sem chamar
+# `call_next` (curto-circuito), ou alterar a resposta que ele devolve. Para handlers
+# `async def`, `call_next` devolve um awaitable; use `then` para tratar os dois casos.
+Middleware = Callable[[HttpRequest, Callable], HttpResponse]
+
+
+def is_awaitable(value) -> bool:
+    """
+    Se o retorno de um handler precisa ser aguardado. Faz o mesmo que `inspect.isawaitable`
+    para o que um handler devolve, sem importar o inspect (que carrega ast e dis) na partida.
+    """
+    return isinstance(value, collections.abc.Awaitable)
+
+
+def then(result, callback: Callable[[HttpResponse], HttpResponse]):
+    """
+    Aplica `callback` à resposta de `call_next`, esperando por ela se for um awaitable.
+    """
+    if is_awaitable(result):
+        return _then_async(result, callback)
+    return callback(result)
+
+
+async def _then_async(awaitable, callback: Callable[[HttpResponse], HttpResponse]) -> HttpResponse:
+    return callback(await awaitable)
+
+
+def before(hook: Callable[[HttpRequest], Optional[HttpResponse]]) -> Middleware:
+    """
+    Middleware que chama `hook(request)` antes do handler. Se o hook devolver uma resposta,
+    ela é enviada e o handler não é chamado.
+    """
+    def middleware(request: HttpRequest, call_next: Callable) -> HttpResponse:
+        response = hook(request)
+        if response is not None:
+            return response
+        return call_next(request)
+    return middleware
+
+
+def after(hook: Callable[[HttpRequest, HttpResponse], Optional[HttpResponse]]) -> Middleware:
+    """
+    Middleware que chama `hook(request, response)` depois do handler. O hook pode alterar a
+    resposta ou devolver outra no lugar.
+    """
+    def middleware(request: HttpRequest, call_next: Callable) -> HttpResponse:
+        def apply(response: HttpResponse) -> HttpResponse:
+            replaced = hook(request, response)
+            return response if replaced is None else replaced
+        return then(call_next(request), apply)
+    return middleware
+
+
+def compose(middlewares: Iterable[Middleware], handler: Callable) -> Callable:
+    """
+    Monta a cadeia uma única vez: o primeiro middleware fica por fora e o handler no fim.
+    Sem middlewares, devolve o próprio handler.
+    """
+    call = handler
+    for middleware in reversed(list(middlewares)):
+        call = _bind(middleware, call)
+    return call
+
+
+def _bind(middleware: Middleware, call_next: Callable) -> Callable:
+    def call(request: HttpRequest):
+        return middleware(request, call_next)
+    return call
+
+
+def timing(name: str = 'app') -> Middleware:
+    """
+    Adiciona o header `Server-Timing` com o tempo gasto pelo resto da cadeia.
+    """
+    def middleware(request: HttpRequest, call_next: Callable) -> HttpResponse:
+        start = time.perf_counter()
+
+        def add_header(response: HttpResponse) -> HttpResponse:
+            response.add_header('Server-Timing', f"{name};dur={(time.perf_counter() - start) * 1000:.3f}")
+            return response
+        return then(call_next(request), add_header)
+    return middleware
+
+
+def bearer_auth(token: str, realm: str = 'api') -> Middleware:
+    """
+    Exige o header `Authorization: Bearer <token>`; sem ele responde 401.
+    """
+    expected = f"Bearer {token}".encode('utf-8')
+
+    def check(request: HttpRequest) -> Optional[HttpResponse]:
+        provided = (request.get_header('authorization') or '').encode('utf-8')
+        if hmac.compare_digest(provided, expected):
+            return None
+        response = HttpResponse.error_response(HttpStatus.UNAUTHORIZED.value)
+        response.add_header('WWW-Authenticate', f'Bearer realm="{realm}"')
+        return response
+    return before(check)
@@ -0,0 +1,115 @@
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def client_key(addr, ipv6_prefix: int = 64) -> str:
+    """
+    Chave do cliente para os limites: o IPv4, ou a rede IPv6 com `ipv6_prefix` bits (um
+    único cliente IPv6 costuma ter um /64 inteiro, então limitar por endereço não adianta).
+    Endereços IPv4 mapeados em IPv6 (::ffff:a.b.c.d) contam como o IPv4.
+    :param addr: Endereço do socket (tupla host, porta, ...)
+    """
+    host = addr[0] if isinstance(addr, tuple) else str(addr)
+    try:
+        ip = ipaddress.ip_address(host.split('%', 1)[0])
+    except ValueError:
+        return host
+    if ip.version == 6:
+        if ip.ipv4_mapped is not None:
+            return str(ip.ipv4_mapped)
+        return str(ipaddress.IPv6Network((ip, ipv6_prefix), strict=False))
+    return str(ip)
+
+
+class TokenBucketLimiter:
+    """
+    Limite de requisições por cliente com token bucket: cada cliente ganha `rate` tokens
+    por segundo, até `burst`, e cada requisição gasta um.
+    Os buckets ficam em um LRU com no máximo `max_keys` clientes. Um bucket parado há
+    tempo suficiente para encher de novo é igual a um bucket novo, então pode ser
+    descartado sem mudar o comportamento: `sweep` remove esses do início do LRU, e acima de
+    `max_keys` o menos recente sai. Assim a memória não cresce com o número de IPs distintos.
+    Não é thread-safe: é usado pela thread do loop de eventos.
+    :param rate: Requisições por segundo por cliente
+    :param burst: Requisições seguidas permitidas (tamanho do bucket)
+    :param max_keys: Número máximo de clientes acompanhados
+    """
+    def __init__(self, rate: float, burst: Optional[int] = None, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst if burst else max(1, math.ceil(rate))
+        self.max_keys = max_keys
+        # chave -> [tokens, instante da última atualização]
+        self.buckets: 'OrderedDict[str, list]' = OrderedDict()
+        self.rejected = 0
+        self._refill_time = self.burst / rate
+
+    def allow(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Gasta um token do cliente. Retorna (permitido, segundos até o próximo token).
+        """
+        if now is None:
+            now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(self.burst), now]
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self.buckets.move_to_end(key)
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return True, 0.0
+        self.rejected += 1
+        return False, (1.0 - bucket[0]) / self.rate
+
+    def sweep(self, now: Optional[float] = None):
+        """
+        Descarta os buckets que já encheram de novo (parados há `burst / rate` segundos).
+        Como o LRU está em ordem de uso, para no primeiro bucket ainda ativo.
+        """
+        if now is None:
+            now = time.monotonic()
+        buckets = self.buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < self._refill_time:
+                break
+            del buckets[key]
+
+    def stats(self) -> dict:
+        return {'clients': len(self.buckets), 'rejected': self.rejected}
+
+
+class ConnectionLimiter:
+    """
+    Limite de conexões simultâneas por cliente. Só guarda clientes com conexões abertas,
+    então a memória é proporcional às conexões.
+    :param max_per_client: Conexões abertas permitidas por cliente
+    """
+    def __init__(self, max_per_client: int):
+        self.max_per_client = max_per_client
+        self.counts: Dict[str, int] = {}
+        self.rejected = 0
+
+    def acquire(self, key: str) -> bool:
+        count = self.counts.get(key, 0)
+        if count >= self.max_per_client:
+            self.rejected += 1
+            return False
+        self.counts[key] = count + 1
+        return True
+
+    def release(self, key: str):
+        count = self.counts.get(key, 0) - 1
+        if count > 0:
+            self.counts[key] = count
+        else:
+            self.counts.pop(key, None)
+
+    def stats(self) -> dict:
+        return {'clients': len(self.counts), 'rejected': self.rejected}
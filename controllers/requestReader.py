@@ -0,0 +1,179 @@
+from typing import Optional
+from models.httpMethods import HttpStatus
+from controllers.httpRequest import HttpRequest
+
+HEX_DIGITS = frozenset(b'0123456789abcdefABCDEF')
+
+
+class RequestReaderError(Exception):
+    """
+    Erro de enquadramento da requisição. Carrega o status HTTP que deve ser respondido
+    antes de fechar a conexão.
+    """
+    def __init__(self, status: HttpStatus, message: str = ""):
+        super().__init__(message or status.name)
+        self.status = status
+        self.message = message
+
+
+class RequestReader:
+    """
+    Leitor incremental de requisições HTTP/1.x.
+    Recebe bytes na ordem em que chegam do socket (`feed`) e devolve requisições completas
+    (`next_request`): acumula até o fim dos headers (`\\r\\n\\r\\n`) e então lê exatamente
+    `Content-Length` bytes ou decodifica `Transfer-Encoding: chunked`.
+    Não faz I/O, então pode ser usado por qualquer backend do servidor.
+    :param max_header_size: Tamanho máximo da linha de requisição + headers (431 se exceder)
+    :param max_body_size: Tamanho máximo do body (413 se exceder)
+    """
+    MAX_CHUNK_LINE = 1024
+
+    def __init__(self, max_header_size: int = 16384, max_body_size: int = 10 * 1024 * 1024):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.buffer = bytearray()
+        self._continue_pending = False
+        self._reset()
+
+    def _reset(self):
+        self._request: Optional[HttpRequest] = None
+        self._body = bytearray()
+        self._remaining = 0
+        self._chunked = False
+        self._in_trailers = False
+
+    def feed(self, data: bytes):
+        """
+        Acrescenta bytes recebidos do cliente.
+        """
+        self.buffer += data
+
+    def has_partial_request(self) -> bool:
+        """
+        Indica se há uma requisição começada e ainda incompleta.
+        """
+        return self._request is not None or bool(self.buffer)
+
+    def reading_body(self) -> bool:
+        """
+        Indica se os headers da requisição atual já chegaram e falta o body.
+        """
+        return self._request is not None
+
+    def pop_continue(self) -> bool:
+        """
+        Retorna True (uma única vez) quando o cliente enviou `Expect: 100-continue`
+        e está esperando o `100 Continue` para mandar o body.
+        """
+        pending = self._continue_pending
+        self._continue_pending = False
+        return pending
+
+    def next_request(self) -> Optional[HttpRequest]:
+        """
+        Retira do buffer a próxima requisição completa, ou None se ainda faltam bytes.
+        Requisições em pipeline são devolvidas uma por chamada.
+
+        :raises RequestReaderError: headers ou body acima do limite, ou enquadramento inválido
+        """
+        if self._request is None and not self._read_headers():
+            return None
+
+        if self._chunked:
+            done = self._read_chunks()
+        else:
+            done = self._read_fixed_body()
+        if not done:
+            return None
+
+        request = self._request
+        request.set_body(self._body)
+        self._reset()
+        return request
+
+    def _read_headers(self) -> bool:
+        header_end = self.buffer.find(b'\r\n\r\n', 0, self.max_header_size + 4)
+        if header_end == -1:
+            if len(self.buffer) > self.max_header_size:
+                raise RequestReaderError(HttpStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            return False
+        header_end += 4
+
+        request = HttpRequest(bytes(self.buffer[:header_end]))
+        del self.buffer[:header_end]
+
+        transfer_encoding = request.get_header('transfer-encoding')
+        content_length = request.get_header('content-length')
+        if transfer_encoding is not None:
+            codings = [coding.strip().lower() for coding in transfer_encoding.split(',')]
+            if codings[-1] != 'chunked':
+                raise RequestReaderError(HttpStatus.NOT_IMPLEMENTED, f"Transfer-Encoding {transfer_encoding} not supported")
+            self._chunked = True
+        elif content_length is not None:
+            content_length = content_length.strip()
+            # Só dígitos ASCII: isdigit() sozinho aceita '²', que o int() recusa
+            if not (content_length.isascii() and content_length.isdigit()):
+                raise RequestReaderError(HttpStatus.BAD_REQUEST, "Invalid Content-Length")
+            self._remaining = int(content_length)
+            if self._remaining > self.max_body_size:
+                raise RequestReaderError(HttpStatus.PAYLOAD_TOO_LARGE)
+
+        expect = request.get_header('expect')
+        if expect and expect.lower() == '100-continue' and (self._chunked or self._remaining):
+            self._continue_pending = True
+
+        self._request = request
+        return True
+
+    def _read_fixed_body(self) -> bool:
+        if len(self.buffer) < self._remaining:
+            return False
+        with memoryview(self.buffer) as view:
+            self._body = bytes(view[:self._remaining])
+        del self.buffer[:self._remaining]
+        self._remaining = 0
+        return True
+
+    def _read_chunks(self) -> bool:
+        while True:
+            if self._in_trailers:
+                # Trailers são ignorados; a seção termina com uma linha vazia
+                line_end = self.buffer.find(b'\r\n')
+                if line_end == -1:
+                    if len(self.buffer) > self.max_header_size:
+                        raise RequestReaderError(HttpStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                    return False
+                del self.buffer[:line_end + 2]
+                if line_end == 0:
+                    return True
+                continue
+
+            if self._remaining:
+                # Dados do chunk atual seguidos de \r\n
+                if len(self.buffer) < self._remaining + 2:
+                    return False
+                if self.buffer[self._remaining:self._remaining + 2] != b'\r\n':
+                    raise RequestReaderError(HttpStatus.BAD_REQUEST, "Invalid chunk terminator")
+                self._body += self.buffer[:self._remaining]
+                del self.buffer[:self._remaining + 2]
+                self._remaining = 0
+                continue
+
+            line_end = self.buffer.find(b'\r\n', 0, self.MAX_CHUNK_LINE)
+            if line_end == -1:
+                if len(self.buffer) > self.MAX_CHUNK_LINE:
+                    raise RequestReaderError(HttpStatus.BAD_REQUEST, "Chunk size line too long")
+                return False
+            size_field = bytes(self.buffer[:line_end]).split(b';', 1)[0].strip()
+            # Só dígitos hexadecimais: int(size_field, 16) também aceitaria '-1', '0x10' e '1_0'
+            if not size_field or not HEX_DIGITS.issuperset(size_field):
+                raise RequestReaderError(HttpStatus.BAD_REQUEST, "Invalid chunk size")
+            size = int(size_field, 16)
+            del self.buffer[:line_end + 2]
+
+            if size == 0:
+                self._in_trailers = True
+                continue
+            if len(self._body) + size > self.max_body_size:
+                raise RequestReaderError(HttpStatus.PAYLOAD_TOO_LARGE)
+            self._remaining = size
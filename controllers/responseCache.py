@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from controllers.compression import Compressor
+from controllers.httpRequest import HttpRequest, HttpResponse
+
+
+class CacheEntry:
+    """
+    Resposta já serializada: linha de status + headers e body em bytes, com o ETag calculado
+    uma única vez. As variantes comprimidas (gzip, deflate) são geradas na primeira
+    requisição que as pede e guardadas junto, para não comprimir de novo a cada requisição.
+    :param response: Resposta gerada pelo handler
+    :param ttl: Segundos de validade (None para nunca expirar)
+    :param compressible: A resposta tem variantes comprimidas (ver Compressor.is_compressible)
+    :param version: Versão dos dados de que a resposta foi gerada (ver Route.cache_version)
+    """
+    def __init__(self, response: HttpResponse, ttl: Optional[float] = None, compressible: bool = False, version=None):
+        body = bytes(response.body_bytes())
+        if response.body_stream is not None:
+            # Body em streaming já foi lido inteiro: passa a ter Content-Length
+            response.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        response.add_header('ETag', self.etag)
+        self.status_code = response.status_code
+        self.content_type = response.content_type
+        self.headers = dict(response.headers)
+        self.head = response.head_bytes()
+        self.body = body
+        self.expires_at = time.monotonic() + ttl if ttl is not None else None
+        self.compressible = compressible
+        self.version = version
+        # Content-Encoding -> (etag, head, body)
+        self.variants: Dict[str, Tuple[str, bytes, bytes]] = {}
+
+    def is_fresh(self, now: float) -> bool:
+        return self.expires_at is None or now < self.expires_at
+
+    def variant(self, encoding: Optional[str], compressor: Compressor) -> Tuple[str, bytes, bytes]:
+        """
+        (etag, head, body) da resposta na codificação pedida (None para sem compressão).
+        """
+        if encoding is None or not self.compressible:
+            return self.etag, self.head, self.body
+        variant = self.variants.get(encoding)
+        if variant is None:
+            body = compressor.compress(self.body, encoding)
+            etag = f'{self.etag[:-1]}-{encoding}"'
+            response = HttpResponse(self.status_code, body, self.content_type)
+            response.headers = {**self.headers, 'Content-Length': str(len(body)), 'Content-Encoding': encoding, 'ETag': etag}
+            variant = (etag, response.head_bytes(), body)
+            self.variants[encoding] = variant
+        return variant
+
+    @staticmethod
+    def matches(etag: str, if_none_match: Optional[str]) -> bool:
+        """
+        Indica se o header If-None-Match do cliente já tem esta versão.
+        """
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or ('W/' + etag) in tags
+
+
+class CachedResponse(HttpResponse):
+    """
+    Resposta servida a partir de um CacheEntry: os bytes pré-serializados (de uma das
+    variantes) são enviados como estão. `headers` guarda só os headers desta requisição
+    (ex.: Connection), escritos depois dos headers em cache.
+    :param entry: Resposta em cache
+    :param variant: (etag, head, body) a enviar (veja CacheEntry.variant)
+    """
+    def __init__(self, entry: CacheEntry, variant: Optional[Tuple[str, bytes, bytes]] = None):
+        self.status_code = entry.status_code
+        self.content_type = entry.content_type
+        self.headers = {}
+        self.body_stream = None
+        self.entry = entry
+        _, self.cached_head, self.cached_body = variant or (entry.etag, entry.head, entry.body)
+
+    @property
+    def body(self) -> str:
+        return self.entry.body.decode('utf-8', errors='ignore')
+
+    def head_bytes(self) -> bytes:
+        if not self.headers:
+            return self.cached_head
+        extra = ''.join(f"{name}: {value}\r\n" for name, value in self.headers.items())
+        return self.cached_head + extra.encode('utf-8')
+
+    def body_bytes(self) -> bytes:
+        return self.cached_body
+
+    def header_items(self) -> list:
+        # Os headers em cache estão serializados como HTTP/1.1: a linha de status é pulada
+        items = []
+        for line in self.cached_head.decode('utf-8', errors='ignore').split('\r\n')[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                items.append((name, value.strip()))
+        items.extend(self.headers.items())
+        return items
+
+    def iter_body(self):
+        return iter((self.cached_body,))
+
+    def body_length(self) -> int:
+        return len(self.cached_body)
+
+    def to_buffers(self, chunked: bool = True) -> list:
+        return [self.head_bytes(), b"\r\n", self.cached_body]
+
+
+class ResponseCache:
+    """
+    Cache LRU de respostas serializadas, com TTL por entrada e invalidação explícita.
+    As chaves são (método, path, query string). Seguro para uso a partir do pool de threads.
+    :param max_entries: Número máximo de respostas guardadas
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Tuple[str, str, str], CacheEntry]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: HttpRequest) -> Tuple[str, str, str]:
+        return (request.method.value, request.path, request.query_string)
+
+    def get(self, key: Tuple[str, str, str], version=None) -> Optional[CacheEntry]:
+        """
+        Resposta em cache ainda válida: dentro do TTL e gerada da mesma `version` dos dados.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not entry.is_fresh(time.monotonic()) or entry.version != version:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, str, str], response: HttpResponse, ttl: Optional[float] = None, compressible: bool = False,
+            version=None) -> CacheEntry:
+        entry = CacheEntry(response, ttl, compressible, version)
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        Remove as respostas de um path (todas as query strings e métodos), ou todo o cache.
+        """
+        with self._lock:
+            if path is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if key[1] == path]:
+                del self.entries[key]
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
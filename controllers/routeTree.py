@@ -0,0 +1,141 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+
+class Route:
+    """
+    Rota registrada no roteador: o handler de um método em um padrão de path.
+    :param method: Valor do método HTTP (ex: "GET")
+    :param pattern: Padrão do path (ex: "/api/data/{id}")
+    :param handler: Função que processa a requisição
+    :param blocking: Handler síncrono que faz I/O bloqueante
+    :param cacheable: Respostas 200 podem ser guardadas no cache de respostas
+    :param cache_ttl: Validade das respostas em cache em segundos (None para nunca expirar)
+    :param cache_version: Função que devolve a versão dos dados das respostas; a resposta em
+        cache só vale enquanto a versão for a mesma
+    :param middleware: Middlewares só desta rota (ficam por dentro dos globais)
+    """
+    def __init__(self, method: str, pattern: str, handler: Callable, blocking: bool = False,
+                 cacheable: bool = False, cache_ttl: Optional[float] = None, middleware: Tuple[Callable, ...] = (),
+                 cache_version: Optional[Callable[[], object]] = None):
+        self.method = method
+        self.pattern = pattern
+        self.handler = handler
+        self.blocking = blocking
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        self.cache_version = cache_version
+        self.middleware = middleware
+        # Cadeia de middlewares + cache + handler, montada pelo roteador (HttpRouter._compose)
+        self.pipeline: Optional[Callable] = None
+
+
+class RouteNode:
+    """
+    Nó da árvore de rotas. Cada nó corresponde a um segmento do path.
+    """
+    def __init__(self):
+        self.static: Dict[str, 'RouteNode'] = {}
+        self.param: Optional['RouteNode'] = None
+        self.param_name: str = ""
+        self.wildcard_name: str = ""
+        self.wildcard_routes: Dict[str, Route] = {}
+        self.routes: Dict[str, Route] = {}
+
+
+class RouteTree:
+    """
+    Árvore de prefixos (trie por segmento) com parâmetros de path.
+    Segmentos aceitos nos padrões:
+        /api/data       segmento fixo
+        /api/data/{id}  parâmetro: casa exatamente um segmento não vazio
+        /files/{path*}  curinga: casa o resto do path (só no último segmento; `*` sozinho também vale)
+    A busca percorre o path uma vez, segmento a segmento, com um lookup em dict por nível
+    (sem regex). Segmentos fixos têm prioridade sobre parâmetros, e parâmetros sobre curingas.
+    Paths sem parâmetros também ficam em um dict à parte para o caminho mais comum ser O(1).
+    """
+    def __init__(self):
+        self.root = RouteNode()
+        self.static_routes: Dict[str, Dict[str, Route]] = {}
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        return path[1:].split('/') if path.startswith('/') else path.split('/')
+
+    def insert(self, route: Route):
+        """
+        Registra uma rota. Registrar o mesmo método e padrão de novo substitui o handler.
+        """
+        segments = self._split(route.pattern)
+        node = self.root
+        for i, segment in enumerate(segments):
+            if segment == '*' or (segment.startswith('{') and segment.endswith('*}')):
+                if i != len(segments) - 1:
+                    raise ValueError(f"Curinga precisa ser o último segmento: {route.pattern}")
+                node.wildcard_name = segment[1:-2] if segment != '*' else '*'
+                node.wildcard_routes[route.method] = route
+                return
+            if segment.startswith('{') and segment.endswith('}'):
+                name = segment[1:-1]
+                if node.param is None:
+                    node.param = RouteNode()
+                    node.param_name = name
+                elif node.param_name != name:
+                    raise ValueError(f"Parâmetro {{{name}}} conflita com {{{node.param_name}}} em {route.pattern}")
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, RouteNode())
+        node.routes[route.method] = route
+        if '{' not in route.pattern and '*' not in route.pattern:
+            self.static_routes.setdefault(route.pattern, {})[route.method] = route
+
+    def lookup(self, path: str) -> Tuple[Optional[Dict[str, Route]], Dict[str, str]]:
+        """
+        Procura as rotas do path. Retorna ({método: Route}, parâmetros extraídos) ou (None, {})
+        se nenhum padrão casa com o path.
+        """
+        routes = self.static_routes.get(path)
+        if routes is not None:
+            return routes, {}
+        params: Dict[str, str] = {}
+        routes = self._match(self.root, self._split(path), 0, params)
+        return (routes, params) if routes else (None, {})
+
+    def _match(self, node: RouteNode, segments: List[str], index: int, params: Dict[str, str]) -> Optional[Dict[str, Route]]:
+        if index == len(segments):
+            if node.routes:
+                return node.routes
+            if node.wildcard_routes:
+                params[node.wildcard_name] = ""
+                return node.wildcard_routes
+            return None
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            routes = self._match(child, segments, index + 1, params)
+            if routes:
+                return routes
+        if node.param is not None and segment:
+            routes = self._match(node.param, segments, index + 1, params)
+            if routes:
+                params[node.param_name] = unquote(segment) if '%' in segment else segment
+                return routes
+        if node.wildcard_routes:
+            rest = '/'.join(segments[index:])
+            params[node.wildcard_name] = unquote(rest) if '%' in rest else rest
+            return node.wildcard_routes
+        return None
+
+    def __iter__(self):
+        """
+        Percorre todas as rotas registradas.
+        """
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            yield from node.routes.values()
+            yield from node.wildcard_routes.values()
+            stack.extend(node.static.values())
+            if node.param is not None:
+                stack.append(node.param)
@@ -1,9 +1,32 @@
+import math
+import signal
 import socket
-import select
+import selectors
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+from controllers.accessLog import AccessLog
+from controllers.compression import Compressor
+from controllers.connection import Connection
 from controllers.database import Database
+from controllers.http2 import Http2Connection, Http2Error, is_preface
+from controllers.dispatcher import RequestDispatcher
+from controllers.requestReader import RequestReader, RequestReaderError
 from models.serverTypes import serverTypes
 from controllers.httpRequest import HttpRequest, HttpResponse
 from controllers.httpRouter import HttpRouter
+from controllers.metrics import Metrics
+from controllers.rateLimit import ConnectionLimiter, TokenBucketLimiter, client_key
+from controllers.socketHandoff import inherited_sockets, notify_ready, spawn_replacement
+from controllers.startupProfile import StartupProfile
+from controllers.timerWheel import TimerWheel
+from models.httpMethods import HttpMethod, HttpStatus
+
+if TYPE_CHECKING:
+    import ssl
+
+# Bytes de DATA do HTTP/2 gerados por vez; mais só depois que o socket esvaziar
+H2_WRITE_BUDGET = 256 * 1024
 
 class httpServer:
     """
@@ -11,31 +34,132 @@ class httpServer:
     :param adress: Endereço do servidor
     :param port: Porta do servidor
     :param type: Tipo de servidor (Dual, IPv4, IPv6)
+    :param backlog: Tamanho da fila de conexões pendentes de cada socket de escuta
+    :param keepalive_timeout: Segundos que uma conexão persistente pode ficar ociosa entre requisições
+    :param header_timeout: Segundos para receber a linha de requisição e todos os headers, contados
+        do primeiro byte (ou da conexão, na primeira requisição); mandar os headers aos poucos
+        não renova o prazo. Vencido, responde 408
+    :param body_timeout: Segundos sem receber nenhum byte do body (408 se vencer)
+    :param write_timeout: Segundos sem conseguir enviar nenhum byte da resposta (o cliente parou de ler)
+    :param max_keepalive_requests: Número máximo de requisições servidas por conexão
+    :param max_header_size: Tamanho máximo dos headers de uma requisição (431 se exceder)
+    :param max_body_size: Tamanho máximo do body de uma requisição (413 se exceder)
+    :param reuse_port: Ativa SO_REUSEPORT para vários processos escutarem na mesma porta
+    :param pool_size: Threads que executam os handlers (0 executa no próprio loop de eventos)
+    :param queue_depth: Requisições que podem esperar por uma thread antes de responder 503
+    :param static_dirs: Diretórios servidos como arquivos estáticos, {prefixo da URL: diretório}
+    :param compression: Comprime as respostas com gzip/deflate conforme o Accept-Encoding
+    :param compress_min_size: Tamanho mínimo do body para comprimir
+    :param compact_json: Gera JSON sem indentação em HttpResponse.json_response
+    :param metrics: Coleta métricas das requisições e as exporta em GET /metrics
+    :param access_log: Log de acesso e de erros (padrão: Common Log Format no stdout)
+    :param rate_limit: Requisições por segundo permitidas por cliente (0 desliga; acima, 429)
+    :param rate_burst: Requisições seguidas permitidas por cliente (padrão: `rate_limit` arredondado para cima)
+    :param max_connections_per_ip: Conexões simultâneas por cliente (0 desliga)
+    :param ipv6_prefix: Bits do prefixo IPv6 que identificam um cliente nos limites
+    :param drain_timeout: Segundos que o encerramento gracioso espera as conexões em andamento
+    :param db_shards: Número de shards do banco de /api/data, se ele ainda não existe
+    :param db_indexes: Campos dos registros do banco com índice secundário (filtros de GET /api/data)
+    :param h2c: Aceita HTTP/2 sem TLS com conhecimento prévio: a conexão que começa com o
+        prefácio do HTTP/2 passa a ser atendida por Http2Connection, com vários streams
+    :param tls_context: Contexto TLS (tls.create_tls_context) dos sockets de escuta; None serve
+        HTTP sem TLS. O handshake não bloqueia o loop, tem o prazo de `header_timeout`, e o
+        ALPN escolhe entre HTTP/1.1 e HTTP/2
+    :param startup_profile: Relatório do tempo de cada fase da partida, até o primeiro accept
     """
-    def __init__(self, adress: str = '0.0.0.0', port: int = 8080, ipv6_adress: str = '::', type: serverTypes = serverTypes.DUAL):
+    def __init__(self, adress: str = '0.0.0.0', port: int = 8080, ipv6_adress: str = '::', type: serverTypes = serverTypes.DUAL, backlog: int = 1024,
+                 keepalive_timeout: float = 5.0, max_keepalive_requests: int = 100,
+                 header_timeout: float = 10.0, body_timeout: float = 30.0, write_timeout: float = 30.0,
+                 max_header_size: int = 16384, max_body_size: int = 10 * 1024 * 1024,
+                 reuse_port: bool = False, pool_size: int = 8, queue_depth: int = 64,
+                 static_dirs: Optional[Dict[str, str]] = None, compression: bool = True, compress_min_size: int = 1024,
+                 compact_json: bool = False, metrics: bool = True, access_log: Optional[AccessLog] = None,
+                 rate_limit: float = 0, rate_burst: int = 0, max_connections_per_ip: int = 0, ipv6_prefix: int = 64,
+                 drain_timeout: float = 10.0, db_shards: int = 8, db_indexes: Iterable[str] = (), h2c: bool = True,
+                 tls_context: Optional['ssl.SSLContext'] = None, startup_profile: Optional[StartupProfile] = None):
         
         self.adress = adress
         self.port = port
         self.IPV6_ADRESS = ipv6_adress
         self.type = type
-        self.router = HttpRouter() # Aqui iniciamo os roteadores HTTP
+        self.backlog = backlog
+        self.keepalive_timeout = keepalive_timeout
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.write_timeout = write_timeout
+        self.timeouts = {'handshake': 0, 'header': 0, 'body': 0, 'write': 0, 'idle': 0}
+        self.drain_timeout = drain_timeout
+        self.max_keepalive_requests = max_keepalive_requests
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.reuse_port = reuse_port
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self.ipv6_prefix = ipv6_prefix
+        self.h2c = h2c
+        self.h2c_connections = 0
+        self.startup = startup_profile or StartupProfile(enabled=False)
+        self.tls_context = tls_context
+        self.tls_stats = None
+        self._connection_class = Connection
+        if tls_context:
+            # Importado só aqui: sem TLS o servidor não carrega o módulo ssl na partida
+            from controllers.tls import TlsConnection, TlsStats
+            self.tls_stats = TlsStats()
+            self._connection_class = TlsConnection
+        self.rate_limiter = TokenBucketLimiter(rate_limit, rate_burst or None) if rate_limit > 0 else None
+        self.connection_limiter = ConnectionLimiter(max_connections_per_ip) if max_connections_per_ip > 0 else None
+        self.log = access_log or AccessLog()
+        database = Database(shards=db_shards, indexes=db_indexes)
+        self.startup.mark('database')
+        self.router = HttpRouter(compression=Compressor(compress_min_size, enabled=compression),
+                                 metrics=Metrics(enabled=metrics), log=self.log,
+                                 database=database) # Aqui iniciamo os roteadores HTTP
+        self.metrics = self.router.metrics
+        self.metrics.register_gauge('http_connections_active', 'Conexões abertas.', self.active_connections)
+        self.metrics.register_gauge('http_requests_in_flight', 'Requisições no pool de threads (executando ou na fila).',
+                                    lambda: self.dispatcher.in_flight if self.dispatcher else 0)
+        if compact_json:
+            HttpResponse.json_indent = None
+        self.router.add_route(HttpMethod.GET, "/stats", self._stats_handler)
+        for prefix, directory in (static_dirs or {}).items():
+            self.router.add_static(prefix, directory)
         
         self.server_socketIPV4 = None
         self.server_socketIPV6 = None
+        self.selector = None
+        self.dispatcher = None
+        self.timers = None
+        self.connections = set()
+        self._running = False
+        self._draining = False
+        self._shutdown_requested = False
+        self._reloading = False
+        self._inherited = set()
+        self.startup.mark('router')
         self.configure()
+        self.startup.mark('sockets')
         self.listen()
+        self.startup.mark('listen')
 
     def configure(self):
         """
-        Seta os valores do socket
+        Seta os valores do socket.
+        Em um reload, usa os sockets de escuta herdados do processo anterior (já com bind).
         """
+        inherited = inherited_sockets()
+        self._inherited = set(inherited.values())
         if self.type != serverTypes.IPV6.value:
-            self.server_socketIPV4 = self.configureServerIP(is_ipv6=False)
+            self.server_socketIPV4 = inherited.pop(socket.AF_INET, None) or self.configureServerIP(is_ipv6=False)
         
         if self.type != serverTypes.IPV4.value:
             print(f"Servidor type {self.type } {serverTypes.IPV4.value}")
-            self.server_socketIPV6 = self.configureServerIP(is_ipv6=True)
+            self.server_socketIPV6 = inherited.pop(socket.AF_INET6, None) or self.configureServerIP(is_ipv6=True)
             self.server_socketIPV6.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1) 
+        for sock in inherited.values():
+            # Herdado de um processo com outro tipo de servidor (ex.: Dual -> IPv4)
+            self._inherited.discard(sock)
+            sock.close()
             
         
     def configureServerIP(self, is_ipv6: bool = False ):
@@ -46,53 +170,583 @@ class httpServer:
             socket_family = socket.AF_INET6
         else:
             socket_family = socket.AF_INET
-        return socket.socket(socket_family, socket.SOCK_STREAM)
+        server_socket = socket.socket(socket_family, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        return server_socket
     
     
 
 
     def start(self):
         """
-        Inicia o servidor
+        Inicia o servidor.
+        Loop de eventos baseado em selectors (epoll no Linux): os sockets de escuta e os
+        sockets dos clientes são registrados como não bloqueantes, e cada conexão mantém
+        seus próprios buffers de leitura e escrita. Assim um cliente lento não trava os demais.
+        Com `pool_size` > 0 os handlers rodam em um pool de threads limitado (RequestDispatcher).
+        Os timeouts de cada conexão (headers, body, escrita e keep-alive) ficam em uma roda
+        de timers (TimerWheel), avançada a cada volta do loop.
+        Retorna depois de `stop`, ou quando o encerramento gracioso (`shutdown`) terminar.
+        """
+        self.selector = selectors.DefaultSelector()
+        self.timers = TimerWheel()
+        for server_socket in self._create_server_list():
+            server_socket.setblocking(False)
+            self.selector.register(server_socket, selectors.EVENT_READ, data=None)
+        if self.pool_size > 0:
+            # O pool é criado aqui, e não no __init__, para sobreviver ao fork dos workers
+            self.dispatcher = RequestDispatcher(self.router.route, self.pool_size, self.queue_depth, self.log)
+            self.selector.register(self.dispatcher.wakeup_reader, selectors.EVENT_READ, data=self.dispatcher)
+
+        next_sweep = time.monotonic() + 1.0
+        drain_deadline = None
+        self._running = True
+        self.startup.mark('event loop')
+        notify_ready()
+        while self._running:
+            events = self.selector.select(timeout=self.timers.tick if self.timers else 1.0)
+            for key, mask in events:
+                if key.data is None:
+                    self._accept(key.fileobj)
+                    continue
+                if key.data is self.dispatcher:
+                    self._on_requests_completed()
+                    continue
+                conn = key.data
+                try:
+                    if conn.handshaking:
+                        self._handshake(conn)
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(conn)
+                    if mask & selectors.EVENT_WRITE and not conn.closed:
+                        self._on_writable(conn)
+                except Exception as e:
+                    # Um erro inesperado ao tratar uma conexão fecha só essa conexão, não o loop
+                    self.log.error("Erro inesperado na conexão", remote=conn.addr[0], error=repr(e))
+                    self._close_connection(conn)
+
+            now = time.monotonic()
+            self.timers.advance(now)
+            if now >= next_sweep:
+                if self.rate_limiter:
+                    self.rate_limiter.sweep(now)
+                next_sweep = now + 1.0
+
+            if self._shutdown_requested and drain_deadline is None:
+                drain_deadline = now + self.drain_timeout
+                self._begin_drain()
+            if drain_deadline is not None and (not self.connections or now >= drain_deadline):
+                if self.connections:
+                    self.log.warning("Prazo do encerramento esgotado", connections=len(self.connections))
+                break
+
+    def stop(self):
+        """
+        Pede o fim do loop de eventos; `start` retorna na próxima volta do loop.
+        Pode ser chamado de um signal handler.
+        """
+        self._running = False
+
+    def shutdown(self):
+        """
+        Encerramento gracioso: para de aceitar conexões, termina as requisições em andamento
+        respondendo com `Connection: close`, e então `start` retorna, no máximo
+        `drain_timeout` segundos depois. Chamado de novo durante a espera, encerra na hora.
+        Pode ser chamado de um signal handler.
+        """
+        if self._shutdown_requested:
+            self.stop()
+        self._shutdown_requested = True
+
+    def reload(self):
+        """
+        Reload sem perder conexões: inicia um novo processo com os mesmos argumentos, que
+        herda os sockets de escuta, e quando ele avisar que está aceitando conexões este
+        processo faz o encerramento gracioso. Se o novo processo falhar, este continua
+        atendendo. Pode ser chamado de um signal handler.
+        """
+        if self._reloading or self._shutdown_requested:
+            return
+        self._reloading = True
+        threading.Thread(target=self._reload, name='reload', daemon=True).start()
+
+    def _reload(self):
+        try:
+            proc = spawn_replacement(self._create_server_list())
+        except OSError as e:
+            proc = None
+            self.log.error("Falha ao iniciar o novo processo", error=repr(e))
+        if proc is None:
+            self.log.error("Reload cancelado: o novo processo não ficou pronto")
+            self._reloading = False
+            return
+        self.log.info("Reload: novo processo pronto, encerrando este", pid=proc.pid)
+        self.shutdown()
+
+    def install_signal_handlers(self):
+        """
+        SIGTERM/SIGINT fazem o encerramento gracioso (o segundo sinal encerra na hora) e
+        SIGHUP/SIGUSR2 fazem o reload. Só pode ser chamado da thread principal.
+        """
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.shutdown())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.shutdown())
+        for name in ('SIGHUP', 'SIGUSR2'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), lambda signum, frame: self.reload())
+
+    def _begin_drain(self):
+        """
+        Início do encerramento gracioso: fecha os sockets de escuta (em um reload o
+        processo novo continua com a sua cópia). Antes, aceita as conexões que já estão na
+        fila do socket: com SO_REUSEPORT cada processo tem a sua fila, e o kernel resetaria
+        as conexões que ficassem nela.
+        As conexões keep-alive ociosas não são fechadas aqui: o cliente pode estar enviando
+        a próxima requisição nesse instante e receberia um RST. Elas atendem mais uma
+        requisição, já com `Connection: close`, ou saem pelo timeout de keep-alive.
+        """
+        self._draining = True
+        for conn in list(self.connections):
+            if conn.h2 is not None:
+                # GOAWAY: os streams em andamento terminam, e nenhum novo é aceito
+                conn.h2.close()
+                self._flush_h2(conn)
+        for server_socket in self._create_server_list():
+            self._accept(server_socket)
+            try:
+                self.selector.unregister(server_socket)
+            except (KeyError, ValueError):
+                pass
+            server_socket.close()
+        self.log.info("Encerrando: aguardando as conexões em andamento", connections=len(self.connections))
+
+    def _accept(self, server_socket: socket.socket):
+        """
+        Aceita todas as conexões pendentes no socket de escuta.
         """
-        server_list = self._create_server_list()
-        database = Database()
-        
         while True:
-            ready, _, _ = select.select(server_list, [], [])
-            for s in ready:
-                conn, addr = s.accept()
+            try:
+                sock, addr = server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            self.startup.finish('first accept')
+            sock.setblocking(False)
+            # Sem Nagle: respostas em pipeline não esperam o ACK da anterior
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.tls_context:
+                # O handshake é feito depois, em `_handshake`, conforme o socket fica pronto
+                sock = self.tls_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+            conn = self._connection_class(sock, addr, RequestReader(self.max_header_size, self.max_body_size))
+            conn.client_key = self._client_key(addr)
+            conn.over_limit = not self._acquire_connection(conn.client_key, addr)
+            self.selector.register(sock, selectors.EVENT_READ, data=conn)
+            self.connections.add(conn)
+            self.metrics.connection_opened()
+            self._update_timer(conn)
+
+    def _handshake(self, conn: Connection):
+        """
+        Avança o handshake TLS sem bloquear: quando o OpenSSL precisa ler ou escrever, a
+        conexão espera esse evento no selector. Concluído o handshake, o protocolo escolhido
+        no ALPN decide entre o leitor HTTP/1.1 e o HTTP/2.
+        """
+        try:
+            events = conn.handshake()
+        except OSError as e:
+            # Cliente que não fala TLS, sem versão ou cifra em comum, ou conexão resetada
+            self.tls_stats.handshake_failed()
+            self.log.debug("Falha no handshake TLS", remote=conn.addr[0], error=repr(e))
+            self._close_connection(conn)
+            return
+        if events:
+            self.selector.modify(conn.sock, events, data=conn)
+            return
+        self.tls_stats.handshake_completed(conn.sock)
+        if conn.sock.selected_alpn_protocol() == 'h2':
+            conn.h2 = Http2Connection(self.max_header_size, self.max_body_size)
+            self._flush_h2(conn)
+        else:
+            self.selector.modify(conn.sock, selectors.EVENT_READ, data=conn)
+            self._update_timer(conn)
+        if not conn.closed and conn.sock.pending():
+            self._on_readable(conn)
+
+    def _client_key(self, addr) -> Optional[str]:
+        """
+        Chave do cliente nos limites por IP (None se nenhum limite está ligado).
+        """
+        if self.rate_limiter is None and self.connection_limiter is None:
+            return None
+        return client_key(addr, self.ipv6_prefix)
+
+    def _acquire_connection(self, key: Optional[str], addr) -> bool:
+        """
+        Reserva uma vaga para a conexão no limite por cliente. Uma conexão acima do limite
+        não é fechada na hora (o cliente receberia um RST no lugar da resposta): a primeira
+        requisição dela é lida e respondida com 429 e `Connection: close`.
+        """
+        if self.connection_limiter is None or self.connection_limiter.acquire(key):
+            return True
+        self.log.warning("Conexão acima do limite por cliente", remote=addr[0])
+        return False
+
+    def _too_many_requests(self, retry_after: float) -> HttpResponse:
+        response = HttpResponse.error_response(HttpStatus.TOO_MANY_REQUESTS.value, "Too many requests, try again later")
+        response.add_header('Retry-After', str(max(1, math.ceil(retry_after))))
+        return response
+
+    def _rate_limited(self, key: Optional[str], over_limit: bool = False) -> Optional[HttpResponse]:
+        """
+        Gasta um token do cliente; devolve a resposta 429 se ele passou do limite de
+        requisições ou se a conexão passou do limite de conexões (`over_limit`).
+        """
+        if over_limit:
+            response = self._too_many_requests(1.0)
+            response.set_keep_alive(False)
+            return response
+        if self.rate_limiter is None:
+            return None
+        allowed, retry_after = self.rate_limiter.allow(key)
+        if allowed:
+            return None
+        return self._too_many_requests(retry_after)
+
+    def _on_readable(self, conn: Connection):
+        """
+        Lê os dados disponíveis e processa todas as requisições completas do buffer.
+        A conexão continua aberta enquanto o cliente pedir keep-alive, até o limite
+        de `max_keepalive_requests` requisições.
+        """
+        try:
+            data = conn.recv()
+        except conn.would_block:
+            return
+        except OSError:
+            self._close_connection(conn)
+            return
+        self.metrics.add_bytes_received(len(data))
+        if not data:
+            if conn.has_pending_output():
+                conn.close_after_write = True
+            else:
+                self._close_connection(conn)
+            return
+
+        self._process_requests(conn)
+
+    def _process_requests(self, conn: Connection):
+        """
+        Processa as requisições completas do buffer da conexão, na ordem em que chegaram.
+        Com o pool de threads, uma requisição por vez fica em andamento por conexão, para
+        que as respostas em pipeline saiam na ordem certa.
+        Uma conexão nova que começa com o prefácio do HTTP/2 passa para `_process_h2`.
+        """
+        if conn.h2 is None and self.h2c and conn.requests_served == 0 and not conn.busy:
+            preface = is_preface(conn.reader.buffer)
+            if preface is None:
+                # Pode ser o começo do prefácio: espera mais bytes
+                self._update_timer(conn)
+                return
+            if preface:
+                conn.h2 = Http2Connection(self.max_header_size, self.max_body_size)
+                conn.h2.feed(conn.reader.buffer)
+                conn.reader.buffer.clear()
+                self.h2c_connections += 1
+        if conn.h2 is not None:
+            self._process_h2(conn)
+            return
+
+        while not conn.close_after_write and not conn.busy:
+            try:
+                request = conn.reader.next_request()
+            except RequestReaderError as e:
+                self.log.warning("Requisição rejeitada", remote=conn.addr[0], status=e.status.value, reason=e.message)
+                response = HttpResponse.error_response(e.status.value, e.message)
+                response.set_keep_alive(False)
+                conn.queue(response.to_bytes())
+                conn.close_after_write = True
+                break
+            if request is None:
+                if conn.reader.pop_continue():
+                    conn.queue(b'HTTP/1.1 100 Continue\r\n\r\n')
+                break
+
+            limited = self._rate_limited(conn.client_key, conn.over_limit)
+            if limited:
+                response = limited
+            elif self.dispatcher:
+                if self.dispatcher.submit(conn, request):
+                    conn.busy = True
+                    break
+                response = HttpResponse.error_response(HttpStatus.SERVICE_UNAVAILABLE.value, "Server busy, try again later")
+                response.add_header('Retry-After', '1')
+            else:
                 try:
-                    request_data = conn.recv(1024)
-                    print(f"Pedido recebido de {addr}")
-                    
                     # Processa requisição e pega resposta do router
-                    request = HttpRequest(request_data)
                     response = self.router.route(request)
-                    
-                    # Envia resposta para o cliente
-                    conn.sendall(response.to_bytes())
                 except Exception as e:
-                    print(f"Erro ao processar pedido de {addr}: {e}")
+                    self.log.error("Erro ao processar pedido", remote=conn.addr[0], error=repr(e))
+                    response = HttpResponse.error_response(500)
+            self._queue_response(conn, request, response)
+
+        self._on_writable(conn)
+
+    def _process_h2(self, conn: Connection):
+        """
+        Processa os frames HTTP/2 recebidos. Cada stream completo é roteado na hora (ou vai
+        para o pool de threads) sem esperar os anteriores: as respostas saem na ordem em que
+        ficam prontas.
+        """
+        try:
+            requests = conn.h2.receive()
+        except Http2Error as e:
+            self.log.warning("Erro de protocolo HTTP/2", remote=conn.addr[0], code=e.code, reason=e.message)
+            conn.h2.close(e.code)
+            requests = []
+        for request in requests:
+            limited = self._rate_limited(conn.client_key, conn.over_limit)
+            if limited:
+                response = limited
+            elif self.dispatcher:
+                if self.dispatcher.submit(conn, request):
+                    continue
+                response = HttpResponse.error_response(HttpStatus.SERVICE_UNAVAILABLE.value, "Server busy, try again later")
+                response.add_header('Retry-After', '1')
+            else:
+                try:
+                    response = self.router.route(request)
+                except Exception as e:
+                    self.log.error("Erro ao processar pedido", remote=conn.addr[0], error=repr(e))
+                    response = HttpResponse.error_response(500)
+            self._queue_response(conn, request, response)
+        self._flush_h2(conn)
+
+    def _flush_h2(self, conn: Connection):
+        """
+        Enfileira os frames HTTP/2 prontos e envia. DATA só é gerado com a fila de escrita
+        vazia; o resto sai em `_on_writable`, conforme o socket aceita.
+        """
+        conn.queue(conn.h2.data_to_send(0 if conn.has_pending_output() else H2_WRITE_BUDGET))
+        self._on_writable(conn)
+
+    def _on_requests_completed(self):
+        """
+        Entrega as respostas prontas do pool de threads às suas conexões.
+        """
+        for conn, request, response in self.dispatcher.completed_requests():
+            conn.busy = False
+            if conn.closed:
+                continue
+            self._queue_response(conn, request, response)
+            self._process_requests(conn)
+
+    def _queue_response(self, conn: Connection, request: HttpRequest, response: HttpResponse):
+        conn.requests_served += 1
+        if conn.h2 is not None:
+            self._queue_h2_response(conn.h2, conn.addr, request, response)
+            return
+        keep_alive = self._apply_keep_alive(request, response, conn.requests_served)
+        self.log.access(conn.addr, request, response, time.perf_counter() - request.received_at)
+        conn.queue_buffers(response.to_buffers(chunked=request.version != 'HTTP/1.0'))
+        conn.close_after_write = not keep_alive
+
+    def _queue_h2_response(self, h2: Http2Connection, addr, request: HttpRequest, response: HttpResponse):
+        """
+        Entrega a resposta ao stream da requisição. Uma resposta com `Connection: close`, ou
+        qualquer uma durante o encerramento gracioso, faz a conexão enviar o GOAWAY e
+        fechar depois dos streams em andamento.
+        """
+        if response.headers.get('Connection') == 'close' or self._draining:
+            h2.close()
+        self.log.access(addr, request, response, time.perf_counter() - request.received_at)
+        h2.send_response(request.stream_id, response)
+
+    def _apply_keep_alive(self, request: HttpRequest, response: HttpResponse, requests_served: int) -> bool:
+        """
+        Decide se a conexão continua aberta depois desta resposta e ajusta os headers
+        `Connection`/`Keep-Alive` de acordo.
+        Uma resposta que já vem com `Connection: close` fecha a conexão, assim como
+        qualquer resposta durante o encerramento gracioso.
+        Cliente HTTP/1.0 não entende chunked: um body em streaming vai cru e o fim da
+        resposta é marcado pelo fechamento da conexão.
+        """
+        keep_alive = request.is_keep_alive() and requests_served < self.max_keepalive_requests
+        if response.headers.get('Connection') == 'close' or self._draining:
+            # A resposta já pediu o fechamento (ex.: 429 por excesso de conexões), ou o
+            # servidor está encerrando
+            keep_alive = False
+        if response.is_streaming() and request.version == 'HTTP/1.0':
+            keep_alive = False
+        response.set_keep_alive(keep_alive, self.keepalive_timeout, self.max_keepalive_requests)
+        return keep_alive
+
+    def _on_writable(self, conn: Connection):
+        """
+        Envia o que estiver pendente na fila de escrita da conexão.
+        """
+        bytes_sent = conn.bytes_sent
+        try:
+            done = conn.flush()
+            while done and conn.h2 is not None and conn.h2.wants_write():
+                conn.queue(conn.h2.data_to_send(H2_WRITE_BUDGET))
+                done = conn.flush()
+            if conn.h2 is not None and conn.h2.finished():
+                conn.close_after_write = True
+        except OSError:
+            self._close_connection(conn)
+            return
+        except Exception as e:
+            # Erro no gerador de um body em streaming: os headers já foram enviados, então
+            # só resta fechar a conexão para o cliente perceber a resposta incompleta
+            self.log.error("Erro ao enviar resposta", remote=conn.addr[0], error=repr(e))
+            self._close_connection(conn)
+            return
+        finally:
+            self.metrics.add_bytes_sent(conn.bytes_sent - bytes_sent)
+        if not done:
+            self.selector.modify(conn.sock, selectors.EVENT_WRITE, data=conn)
+        elif conn.close_after_write:
+            self._close_connection(conn)
+            return
+        else:
+            self.selector.modify(conn.sock, selectors.EVENT_READ, data=conn)
+        self._update_timer(conn)
+
+    def _connection_phase(self, conn: Connection) -> Optional[str]:
+        """
+        Em que a conexão está esperando pelo cliente: `write` (resposta pendente), `body`,
+        `header` (requisição começada, ou nenhuma ainda) ou `idle` (keep-alive entre
+        requisições). None enquanto um handler está executando: aí quem espera é o servidor.
+        Numa conexão TLS, antes de tudo vem o `handshake`.
+        """
+        if conn.handshaking:
+            return 'handshake'
+        if conn.busy:
+            return None
+        if conn.has_pending_output():
+            return 'write'
+        if conn.h2 is not None:
+            return conn.h2.phase()
+        if conn.reader.reading_body():
+            return 'body'
+        if conn.reader.has_partial_request() or conn.requests_served == 0:
+            return 'header'
+        return 'idle'
+
+    def _update_timer(self, conn: Connection):
+        """
+        Reagenda o timeout da conexão depois de uma leitura ou escrita.
+        O prazo dos headers e o de keep-alive só começam na troca de fase; os de body e de
+        escrita são renovados a cada vez que algum byte passa.
+        """
+        phase = self._connection_phase(conn)
+        if phase == conn.phase and phase in ('handshake', 'header', 'idle'):
+            return
+        self.timers.cancel(conn.timer)
+        conn.phase = phase
+        if phase is None:
+            conn.timer = None
+            return
+        timeout = {
+            'handshake': self.header_timeout,
+            'header': self.header_timeout,
+            'body': self.body_timeout,
+            'write': self.write_timeout,
+            'idle': self.keepalive_timeout,
+        }[phase]
+        conn.timer = self.timers.schedule(timeout, self._on_timeout, conn)
+
+    def _on_timeout(self, conn: Connection):
+        """
+        Timeout da conexão. Requisição incompleta recebe 408 antes do fechamento; conexão
+        ociosa, sem nenhum byte recebido ou com o cliente sem ler a resposta é só fechada.
+        """
+        conn.timer = None
+        if conn.closed:
+            return
+        phase = conn.phase
+        self.timeouts[phase] += 1
+        if conn.h2 is not None:
+            # HTTP/2: GOAWAY antes de fechar, para o cliente saber que pode repetir os
+            # streams que não foram processados
+            conn.h2.close()
+            conn.queue(conn.h2.data_to_send(0))
+            conn.close_after_write = True
+            self._on_writable(conn)
+            return
+        if phase == 'body' or (phase == 'header' and conn.reader.has_partial_request()):
+            self.log.warning("Tempo esgotado lendo a requisição", remote=conn.addr[0], phase=phase)
+            response = HttpResponse.error_response(HttpStatus.REQUEST_TIMEOUT.value)
+            response.set_keep_alive(False)
+            conn.queue(response.to_bytes())
+            conn.close_after_write = True
+            self._on_writable(conn)
+            return
+        self._close_connection(conn)
+
+    def _close_connection(self, conn: Connection):
+        """
+        Remove a conexão do selector e fecha o socket.
+        """
+        if conn.closed:
+            return
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        self.connections.discard(conn)
+        if self.timers:
+            self.timers.cancel(conn.timer)
+            conn.timer = None
+        if self.connection_limiter and not conn.over_limit:
+            self.connection_limiter.release(conn.client_key)
+        conn.close()
+
+    def active_connections(self) -> int:
+        """
+        Conexões abertas, para /stats e /metrics. O asyncHttpServer conta as suas.
+        """
+        return len(self.connections)
+
+    def stats(self) -> dict:
+        """
+        Estatísticas do servidor: conexões abertas, timeouts por fase, conexões que passaram
+        para HTTP/2, handshakes TLS (taxa por segundo e de sessões retomadas), uso do pool de
+        threads e limites por cliente.
+        """
+        stats = {'connections': self.active_connections(), 'timeouts': dict(self.timeouts), 'h2c_connections': self.h2c_connections}
+        if self.tls_stats:
+            stats['tls'] = self.tls_stats.stats()
+        if self.dispatcher:
+            stats['dispatcher'] = self.dispatcher.stats()
+        if self.rate_limiter:
+            stats['rate_limiter'] = self.rate_limiter.stats()
+        if self.connection_limiter:
+            stats['connection_limiter'] = self.connection_limiter.stats()
+        return stats
+
+    def _stats_handler(self, request: HttpRequest) -> HttpResponse:
+        return HttpResponse.json_response(self.stats())
 
-                    error_response = HttpResponse.error_response(500)
-                    conn.sendall(error_response.to_bytes())
-                finally:
-                    conn.close()
-               
     def listen(self)-> None:
         """
         Listen para conexões
         """
-        if self.server_socketIPV4:
+        if self.server_socketIPV4 in self._inherited:
+            print(f"Servidor IPV4 herdou o socket de escuta na porta {self.port}")
+        elif self.server_socketIPV4:
             
             self.server_socketIPV4.bind((self.adress, self.port))
-            self.server_socketIPV4.listen(5)  
+            self.server_socketIPV4.listen(self.backlog)  
             print(f"Servidor IPV4 iniciado na porta {self.port} na interface {self.adress}")
-        if self.server_socketIPV6:
+        if self.server_socketIPV6 in self._inherited:
+            print(f"Servidor IPV6 herdou o socket de escuta na porta {self.port}")
+        elif self.server_socketIPV6:
            
             self.server_socketIPV6.bind((self.IPV6_ADRESS, self.port))
-            self.server_socketIPV6.listen(5)
+            self.server_socketIPV6.listen(self.backlog)
             print(f"Servidor IPV6 iniciado na porta {self.port} na interface {self.IPV6_ADRESS}")
     def _create_server_list(self) -> list:
         """
@@ -107,10 +761,19 @@ class httpServer:
         
     def close(self):
         """
-        Fecha o servidor
+        Fecha o servidor: as conexões que sobraram, o pool de threads, o banco (gravando as
+        escritas pendentes no snapshot) e o log.
         """
         if self.server_socketIPV4:
             self.server_socketIPV4.close()
         if self.server_socketIPV6:
             self.server_socketIPV6.close()
+        for conn in list(self.connections):
+            self._close_connection(conn)
+        if self.dispatcher:
+            self.dispatcher.close()
+        self.router.database.close()
+        self.log.close()
+        if self.selector:
+            self.selector.close()
         print('Servidor fechado')
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+import select
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Sockets de escuta herdados do processo anterior: "família:fd" separados por vírgula
+LISTEN_FDS_ENV = 'HTTP_SERVER_LISTEN_FDS'
+# Pipe em que o processo novo avisa que já está aceitando conexões
+READY_FD_ENV = 'HTTP_SERVER_READY_FD'
+# Segundos que o processo antigo espera o novo ficar pronto
+READY_TIMEOUT = 15.0
+
+
+def inherited_sockets() -> Dict[int, socket.socket]:
+    """
+    Sockets de escuta recebidos do processo anterior em um reload, por família
+    (AF_INET/AF_INET6). Já estão com bind e listen. A variável de ambiente é consumida,
+    para que processos criados depois (ex.: workers reiniciados) não usem fds que não herdaram.
+    """
+    value = os.environ.pop(LISTEN_FDS_ENV, '')
+    sockets = {}
+    for item in value.split(','):
+        family, sep, fd = item.partition(':')
+        if sep and family.isdigit() and fd.isdigit():
+            sock = socket.socket(fileno=int(fd))
+            sockets[int(family)] = sock
+    return sockets
+
+
+def notify_ready():
+    """
+    Avisa o processo anterior que este já está aceitando conexões (um byte no pipe).
+    Não faz nada fora de um reload.
+    """
+    fd = os.environ.pop(READY_FD_ENV, '')
+    if not fd.isdigit():
+        return
+    try:
+        os.write(int(fd), b'1')
+    except OSError:
+        pass
+    finally:
+        os.close(int(fd))
+
+
+def take_ready_fd() -> Optional[int]:
+    """
+    Retira o fd do pipe de prontidão do ambiente sem escrever nele (o supervisor repassa
+    o pipe aos workers e depois fecha a sua cópia).
+    """
+    fd = os.environ.pop(READY_FD_ENV, '')
+    return int(fd) if fd.isdigit() else None
+
+
+def spawn_replacement(sockets: List[socket.socket], ready_count: int = 1, timeout: float = READY_TIMEOUT) -> Optional[subprocess.Popen]:
+    """
+    Inicia um novo processo com os mesmos argumentos, entregando a ele os sockets de escuta
+    por herança de fd, e espera `ready_count` avisos de prontidão (um por processo que vai
+    aceitar conexões). Como o socket de escuta é o mesmo, conexões que chegam durante a
+    troca ficam na fila do kernel e são aceitas por um dos dois processos.
+    Retorna o processo novo, ou None se ele não ficou pronto a tempo (e foi encerrado).
+    """
+    read_fd, write_fd = os.pipe()
+    env = dict(os.environ)
+    env[LISTEN_FDS_ENV] = ','.join(f"{int(sock.family)}:{sock.fileno()}" for sock in sockets)
+    env[READY_FD_ENV] = str(write_fd)
+    fds = [sock.fileno() for sock in sockets] + [write_fd]
+    try:
+        # pass_fds mantém os mesmos números de fd no processo novo
+        proc = subprocess.Popen([sys.executable] + sys.argv, env=env, pass_fds=fds)
+    finally:
+        os.close(write_fd)
+
+    received = 0
+    deadline = time.monotonic() + timeout
+    try:
+        while received < ready_count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                break
+            data = os.read(read_fd, 64)
+            if not data:
+                # Todos os processos novos fecharam o pipe sem avisar: falharam ao subir
+                break
+            received += len(data)
+    finally:
+        os.close(read_fd)
+
+    if received < ready_count:
+        proc.terminate()
+        return None
+    return proc
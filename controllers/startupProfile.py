@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+from typing import Optional
+
+
+class StartupProfile:
+    """
+    Tempo de cada fase da partida do servidor, de `main.py` até o primeiro accept, no estilo
+    do `python -X importtime`: uma linha por fase no stderr, com o tempo da fase e o
+    acumulado desde `start`, em microssegundos. Desligado, `mark` e `finish` não fazem nada.
+    As fases são marcadas pelo main.py (argumentos, imports, contexto TLS) e pelo servidor
+    (banco, roteador, sockets, loop de eventos e primeiro accept).
+    :param enabled: Liga o relatório
+    :param start: Instante (time.perf_counter) em que a partida começou (padrão: agora)
+    """
+    def __init__(self, enabled: bool = True, start: Optional[float] = None):
+        self.enabled = enabled
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.finished = False
+        # (fase, segundos)
+        self.phases = []
+        if enabled:
+            self._write(f"startup[{os.getpid()}]: self [us] | cumulative | phase")
+
+    def mark(self, phase: str):
+        """
+        Encerra a fase corrente, registrada com o nome `phase`.
+        """
+        if not self.enabled or self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self._write(f"startup[{os.getpid()}]: {(now - self.last) * 1e6:9.0f} | {(now - self.start) * 1e6:10.0f} | {phase}")
+        self.last = now
+
+    def finish(self, phase: str):
+        """
+        Marca a última fase; as marcações seguintes são ignoradas.
+        """
+        self.mark(phase)
+        self.finished = True
+
+    def _write(self, line: str):
+        sys.stderr.write(line + '\n')
+        sys.stderr.flush()
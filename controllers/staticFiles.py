@@ -0,0 +1,341 @@
+import email.utils
+import mimetypes
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from controllers.compression import accepted_encoding
+from controllers.httpRequest import HttpRequest, HttpResponse
+from models.httpMethods import HttpStatus
+
+# sendfile não existe no Windows; lá o arquivo é lido em blocos e enviado com send
+HAS_SENDFILE = hasattr(os, 'sendfile')
+READ_CHUNK_SIZE = 65536
+
+
+class OpenFile:
+    """
+    Arquivo aberto e o resultado do seu stat, compartilhado entre as respostas que o servem.
+    O descritor só é fechado quando a última referência some (saiu do cache e nenhuma
+    resposta em andamento ainda o usa).
+    :param path: Caminho do arquivo no disco
+    :param file: Arquivo aberto em modo binário, sem buffer
+    :param st: Resultado do fstat do descritor
+    """
+    def __init__(self, path: str, file, st: os.stat_result):
+        self.path = path
+        self.file = file
+        self.size = st.st_size
+        self.identity = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.mtime = int(st.st_mtime)
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+        media_type, file_encoding = mimetypes.guess_type(path)
+        if file_encoding == 'gzip':
+            media_type = 'application/gzip'
+        self.content_type = media_type or 'application/octet-stream'
+        self.checked_at = time.monotonic()
+
+
+class OpenFileCache:
+    """
+    Cache LRU de arquivos abertos e seus stats (como o `open_file_cache` do nginx).
+    Um arquivo em cache só é conferido de novo no disco depois de `revalidate` segundos;
+    se mudou (inode, tamanho ou mtime), é reaberto. Arquivos que não existem também ficam em
+    cache pelo mesmo tempo (ex.: a versão `.gz` de um arquivo que não tem uma).
+    Seguro para uso a partir do pool de threads.
+    :param max_entries: Número máximo de arquivos abertos guardados
+    :param revalidate: Segundos em que o stat em cache é considerado válido
+    """
+    def __init__(self, max_entries: int = 256, revalidate: float = 1.0):
+        self.max_entries = max_entries
+        self.revalidate = revalidate
+        self.entries: 'OrderedDict[str, OpenFile]' = OrderedDict()
+        # path -> instante em que o arquivo não foi encontrado
+        self.missing: 'OrderedDict[str, float]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[OpenFile]:
+        """
+        Retorna o arquivo aberto, ou None se ele não existe ou não é um arquivo regular.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is not None and now - entry.checked_at < self.revalidate:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            missing_at = self.missing.get(path)
+            if missing_at is not None and now - missing_at < self.revalidate:
+                self.hits += 1
+                return None
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if entry is not None and st is not None and (st.st_ino, st.st_size, st.st_mtime_ns) == entry.identity:
+            entry.checked_at = now
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        opened = self._open(path) if st is not None and stat.S_ISREG(st.st_mode) else None
+        with self._lock:
+            self.misses += 1
+            if opened is None:
+                self.entries.pop(path, None)
+                self.missing[path] = now
+                self.missing.move_to_end(path)
+                while len(self.missing) > self.max_entries:
+                    self.missing.popitem(last=False)
+                return None
+            self.missing.pop(path, None)
+            self.entries[path] = opened
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return opened
+
+    @staticmethod
+    def _open(path: str) -> Optional[OpenFile]:
+        try:
+            file = open(path, 'rb', buffering=0)
+        except OSError:
+            return None
+        # O stat vem do descritor aberto, para não misturar dados de duas versões do arquivo
+        st = os.fstat(file.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            file.close()
+            return None
+        return OpenFile(path, file, st)
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class FileRegion:
+    """
+    Trecho de um arquivo a ser enviado ao cliente, de `offset` até `offset + count`.
+    Com sendfile os bytes vão do page cache direto para o socket, sem passar pelo Python.
+    :param file: Arquivo aberto (OpenFile)
+    :param offset: Posição inicial no arquivo
+    :param count: Número de bytes
+    """
+    def __init__(self, file: OpenFile, offset: int, count: int):
+        self.file = file
+        self.offset = offset
+        self.remaining = count
+
+    def send(self, sock) -> int:
+        """
+        Envia o que o socket aceitar sem bloquear e avança a região.
+        Levanta BlockingIOError se o socket não aceita mais nada agora.
+        """
+        sent = os.sendfile(sock.fileno(), self.file.file.fileno(), self.offset, self.remaining)
+        if sent == 0:
+            # O Content-Length já foi enviado: resta fechar a conexão
+            raise EOFError(f"{self.file.path} ficou menor durante o envio")
+        self.offset += sent
+        self.remaining -= sent
+        return sent
+
+    def iter_chunks(self):
+        """
+        Lê a região em blocos, para quando sendfile não está disponível.
+        Cada bloco é lido com uma posição explícita, então o mesmo arquivo pode ser
+        servido a várias conexões ao mesmo tempo.
+        """
+        fd = self.file.file.fileno()
+        while self.remaining > 0:
+            size = min(READ_CHUNK_SIZE, self.remaining)
+            if hasattr(os, 'pread'):
+                chunk = os.pread(fd, size, self.offset)
+            else:
+                self.file.file.seek(self.offset)
+                chunk = self.file.file.read(size)
+            if not chunk:
+                raise EOFError(f"{self.file.path} ficou menor durante o envio")
+            self.offset += len(chunk)
+            self.remaining -= len(chunk)
+            yield chunk
+
+
+class FileResponse(HttpResponse):
+    """
+    Resposta cujo body é um trecho de um arquivo, enviado com sendfile.
+    :param file: Arquivo aberto (OpenFile)
+    :param status_code: 200 para o arquivo inteiro, 206 para um intervalo
+    :param offset: Posição inicial no arquivo
+    :param count: Número de bytes (padrão: até o fim do arquivo)
+    """
+    def __init__(self, file: OpenFile, status_code: int = 200, offset: int = 0, count: Optional[int] = None):
+        super().__init__(status_code, b"", file.content_type)
+        if count is None:
+            count = file.size - offset
+        self.region = FileRegion(file, offset, count)
+        self.count = count
+        self.headers['Content-Length'] = str(count)
+
+    def body_bytes(self) -> bytes:
+        if not self.has_body():
+            return b""
+        region = FileRegion(self.region.file, self.region.offset, self.region.remaining)
+        return b"".join(region.iter_chunks())
+
+    def body_length(self) -> int:
+        return self.count if self.has_body() else 0
+
+    def iter_body(self):
+        if not self.has_body():
+            return iter(())
+        return FileRegion(self.region.file, self.region.offset, self.region.remaining).iter_chunks()
+
+    def to_buffers(self, chunked: bool = True) -> list:
+        if not self.has_body() or not self.region.remaining:
+            return [self.head_bytes(), b"\r\n"]
+        if HAS_SENDFILE:
+            return [self.head_bytes(), b"\r\n", self.region]
+        return [self.head_bytes(), b"\r\n", self.region.iter_chunks()]
+
+    def to_bytes(self) -> bytes:
+        return self.head_bytes() + b"\r\n" + self.body_bytes()
+
+
+class StaticFiles:
+    """
+    Serve os arquivos de um diretório: GET com sendfile, `Range` (um intervalo, 206/416),
+    `If-None-Match`/`If-Modified-Since` (304) e `If-Range`.
+    Paths com `..` ou que saiam do diretório recebem 404.
+    Se existir uma versão pré-comprimida do arquivo (`app.js.gz` ao lado de `app.js`) e o
+    cliente aceitar gzip, ela é servida no lugar, também com sendfile.
+    :param directory: Diretório raiz dos arquivos
+    :param max_open_files: Arquivos abertos mantidos no cache LRU
+    :param revalidate: Segundos até conferir de novo no disco um arquivo em cache
+    :param index: Arquivo servido quando o path é um diretório
+    :param precompressed: Procura as versões `.gz` dos arquivos
+    """
+    def __init__(self, directory: str, max_open_files: int = 256, revalidate: float = 1.0, index: str = 'index.html',
+                 precompressed: bool = True):
+        self.directory = os.path.realpath(directory)
+        self.index = index
+        self.precompressed = precompressed
+        self.files = OpenFileCache(max_open_files, revalidate)
+
+    def handle(self, request: HttpRequest) -> HttpResponse:
+        """
+        Handler da rota `{prefixo}/{path*}`.
+        """
+        file = self._find_file(request.get_path_param('path') or '')
+        if file is None:
+            return HttpResponse.error_response(HttpStatus.NOT_FOUND.value, f"File {request.path} not found")
+        vary = False
+        encoding = None
+        if self.precompressed:
+            compressed = self.files.get(file.path + '.gz')
+            if compressed is not None:
+                vary = True
+                if accepted_encoding(request.get_header('accept-encoding'), ('gzip',)):
+                    content_type = file.content_type
+                    file = compressed
+                    encoding = 'gzip'
+
+        if self._not_modified(file, request):
+            response = HttpResponse(HttpStatus.NOT_MODIFIED.value)
+            response.headers.pop('Content-Type', None)
+            self._add_headers(response, file, encoding, vary)
+            return response
+
+        byte_range = self._requested_range(file, request)
+        if byte_range is None:
+            response = FileResponse(file)
+        elif byte_range[0] >= file.size:
+            response = HttpResponse.error_response(HttpStatus.RANGE_NOT_SATISFIABLE.value)
+            response.add_header('Content-Range', f"bytes */{file.size}")
+            return response
+        else:
+            start, end = byte_range
+            response = FileResponse(file, HttpStatus.PARTIAL_CONTENT.value, start, end - start + 1)
+            response.add_header('Content-Range', f"bytes {start}-{end}/{file.size}")
+        if encoding:
+            response.content_type = response.headers['Content-Type'] = content_type
+        response.add_header('Accept-Ranges', 'bytes')
+        self._add_headers(response, file, encoding, vary)
+        return response
+
+    def _find_file(self, relative_path: str) -> Optional[OpenFile]:
+        """
+        Resolve o path pedido dentro do diretório e abre o arquivo (ou o index do diretório).
+        """
+        segments = [segment for segment in relative_path.replace('\\', '/').split('/') if segment and segment != '.']
+        if any(segment == '..' or '\0' in segment or ':' in segment for segment in segments):
+            return None
+        path = os.path.join(self.directory, *segments)
+        if os.path.commonpath([self.directory, path]) != self.directory:
+            return None
+        file = self.files.get(path)
+        if file is None and self.index and os.path.isdir(path):
+            file = self.files.get(os.path.join(path, self.index))
+        return file
+
+    @staticmethod
+    def _add_headers(response: HttpResponse, file: OpenFile, encoding: Optional[str], vary: bool):
+        response.add_header('ETag', file.etag)
+        response.add_header('Last-Modified', file.last_modified)
+        if encoding:
+            response.add_header('Content-Encoding', encoding)
+        if vary:
+            response.add_header('Vary', 'Accept-Encoding')
+
+    @staticmethod
+    def _not_modified(file: OpenFile, request: HttpRequest) -> bool:
+        """
+        `If-None-Match` tem precedência; `If-Modified-Since` só vale sem ele.
+        """
+        if_none_match = request.get_header('if-none-match')
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or file.etag in tags or ('W/' + file.etag) in tags
+        if_modified_since = request.get_header('if-modified-since')
+        if if_modified_since:
+            try:
+                return file.mtime <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _requested_range(file: OpenFile, request: HttpRequest) -> Optional[Tuple[int, int]]:
+        """
+        Intervalo pedido no header `Range`, como (início, fim) inclusivos e já limitados
+        ao tamanho do arquivo. Retorna None para servir o arquivo inteiro: sem `Range`,
+        `If-Range` desatualizado, sintaxe inválida ou vários intervalos (que o RFC
+        permite ignorar). Um início além do fim do arquivo é devolvido como está (416).
+        """
+        header = request.get_header('range')
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        if_range = request.get_header('if-range')
+        if if_range and if_range not in (file.etag, file.last_modified):
+            return None
+
+        first, sep, last = header[6:].strip().partition('-')
+        if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+            return None
+        if not first:
+            # Sufixo: os últimos N bytes
+            length = int(last)
+            if length == 0:
+                return (file.size, file.size)
+            return (max(file.size - length, 0), file.size - 1)
+        start = int(first)
+        end = min(int(last), file.size - 1) if last else file.size - 1
+        if last and int(last) < start:
+            return None
+        return (start, end)
@@ -0,0 +1,139 @@
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Dict
+
+from controllers.server import httpServer
+from controllers.socketHandoff import spawn_replacement, take_ready_fd
+
+
+class WorkerSupervisor:
+    """
+    Supervisor de processos worker.
+    Faz fork de N workers que rodam o mesmo httpServer. Com SO_REUSEPORT cada worker abre
+    seus próprios sockets de escuta e o kernel distribui as conexões entre eles; sem
+    SO_REUSEPORT os workers herdam os sockets de escuta criados pelo supervisor.
+    Workers que morrem são recriados, e SIGTERM/SIGINT no supervisor são repassados aos
+    workers, que fazem o encerramento gracioso. SIGHUP/SIGUSR2 fazem o reload: um novo
+    supervisor é iniciado (herdando os sockets de escuta compartilhados, se houver) e, quando
+    todos os workers dele estiverem aceitando conexões, os workers atuais são encerrados.
+    :param server_factory: Função que cria (e faz bind de) um httpServer
+    :param workers: Número de processos worker
+    """
+    RESTART_BACKOFF = 1.0
+
+    def __init__(self, server_factory: Callable[..., httpServer], workers: int):
+        self.server_factory = server_factory
+        self.workers = workers
+        self.reuse_port = hasattr(socket, 'SO_REUSEPORT')
+        self.shared_server = None
+        self.children: Dict[int, float] = {}
+        self._stopping = False
+        self._reloading = False
+
+    def run(self):
+        """
+        Inicia os workers e fica supervisionando até receber SIGTERM/SIGINT.
+        """
+        if not self.reuse_port:
+            self.shared_server = self.server_factory()
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for name in ('SIGHUP', 'SIGUSR2'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), self._handle_reload)
+
+        for _ in range(self.workers):
+            self._spawn()
+        # Os workers iniciais avisam o processo anterior (em um reload) quando estiverem
+        # prontos; workers recriados depois não herdam mais o pipe
+        ready_fd = take_ready_fd()
+        if ready_fd is not None:
+            os.close(ready_fd)
+        print(f"Supervisor {os.getpid()} iniciou {self.workers} workers (SO_REUSEPORT={self.reuse_port})")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started_at = self.children.pop(pid, None)
+            if started_at is None or self._stopping:
+                continue
+
+            print(f"Worker {pid} terminou (status {os.waitstatus_to_exitcode(status)}), reiniciando")
+            # Evita reiniciar em loop um worker que morre logo ao subir
+            if time.monotonic() - started_at < self.RESTART_BACKOFF:
+                time.sleep(self.RESTART_BACKOFF)
+            if not self._stopping:
+                self._spawn()
+
+        if self.shared_server:
+            self.shared_server.close()
+        print('Supervisor encerrado')
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.monotonic()
+
+    def _run_worker(self):
+        """
+        Corpo do processo worker. Nunca retorna: termina o processo com os._exit.
+        """
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            for name in ('SIGHUP', 'SIGUSR2'):
+                if hasattr(signal, name):
+                    signal.signal(getattr(signal, name), signal.SIG_IGN)
+            server = self.shared_server or self.server_factory(reuse_port=True)
+            signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+            server.start()
+            server.close()
+        except Exception as e:
+            print(f"Worker {os.getpid()} falhou: {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _handle_reload(self, signum, frame):
+        if self._reloading or self._stopping:
+            return
+        self._reloading = True
+        threading.Thread(target=self._reload, name='reload', daemon=True).start()
+
+    def _reload(self):
+        sockets = self.shared_server._create_server_list() if self.shared_server else []
+        try:
+            proc = spawn_replacement(sockets, ready_count=self.workers)
+        except OSError as e:
+            print(f"Falha ao iniciar o novo supervisor: {e}")
+            proc = None
+        if proc is None:
+            print('Reload cancelado: o novo supervisor não ficou pronto')
+            self._reloading = False
+            return
+        print(f"Reload: novo supervisor {proc.pid} pronto")
+        self._handle_stop(signal.SIGTERM, None)
+
+    def _handle_stop(self, signum, frame):
+        """
+        Repassa o encerramento aos workers; o loop de `run` termina quando todos saírem.
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        print('Encerrando workers...')
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
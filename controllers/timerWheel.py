@@ -0,0 +1,95 @@
+import math
+import time
+from typing import Callable, List, Optional, Set
+
+
+class Timer:
+    """
+    Timer agendado em um TimerWheel. Guarda o slot em que está para ser cancelado em O(1).
+    """
+    __slots__ = ('tick', 'callback', 'args', 'slot')
+
+    def __init__(self, tick: int, callback: Callable, args: tuple):
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.slot: Optional[Set['Timer']] = None
+
+    @property
+    def active(self) -> bool:
+        return self.slot is not None
+
+
+class TimerWheel:
+    """
+    Roda de timers (hashed timing wheel) para os timeouts das conexões.
+    O tempo é dividido em ticks de `tick` segundos e cada timer vai para o slot
+    `tick_do_vencimento % slots`. Agendar e cancelar são O(1), e cada volta do loop de
+    eventos só olha os slots dos ticks que passaram, então o custo não depende do número
+    de conexões abertas (ao contrário de percorrer todas elas procurando as ociosas).
+    Timers mais longos que uma volta da roda (`tick * slots` segundos) ficam no slot
+    até o tick certo chegar. A precisão é de um tick.
+    Não é thread-safe: é usado pela thread do loop de eventos.
+    :param tick: Resolução da roda, em segundos
+    :param slots: Número de slots (uma volta da roda cobre `tick * slots` segundos)
+    """
+    def __init__(self, tick: float = 0.1, slots: int = 512, now: Optional[float] = None):
+        self.tick = tick
+        self.slots: List[Set[Timer]] = [set() for _ in range(slots)]
+        self._current = self._tick_of(time.monotonic() if now is None else now)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick_of(self, when: float) -> int:
+        return int(when // self.tick)
+
+    def schedule(self, delay: float, callback: Callable, *args, now: Optional[float] = None) -> Timer:
+        """
+        Agenda `callback(*args)` para daqui a `delay` segundos (arredondado para o tick seguinte).
+        """
+        if now is None:
+            now = time.monotonic()
+        tick = max(math.ceil((now + delay) / self.tick), self._current + 1)
+        timer = Timer(tick, callback, args)
+        timer.slot = self.slots[tick % len(self.slots)]
+        timer.slot.add(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer: Optional[Timer]):
+        """
+        Cancela um timer; não faz nada se ele já venceu ou já foi cancelado.
+        """
+        if timer is not None and timer.slot is not None:
+            timer.slot.discard(timer)
+            timer.slot = None
+            self._count -= 1
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """
+        Dispara os timers vencidos até `now`. Retorna quantos foram disparados.
+        Se o loop ficou parado mais de uma volta da roda, cada slot é visitado uma vez só.
+        """
+        if now is None:
+            now = time.monotonic()
+        target = self._tick_of(now)
+        steps = min(target - self._current, len(self.slots))
+        fired = 0
+        for step in range(1, steps + 1):
+            slot = self.slots[(self._current + step) % len(self.slots)]
+            if not slot:
+                continue
+            due = [timer for timer in slot if timer.tick <= target]
+            for timer in due:
+                # O callback de um timer pode cancelar outro da mesma lista
+                if timer.slot is None:
+                    continue
+                slot.discard(timer)
+                timer.slot = None
+                self._count -= 1
+                fired += 1
+                timer.callback(*timer.args)
+        self._current = max(self._current, target)
+        return fired
@@ -0,0 +1,149 @@
+import collections
+import selectors
+import ssl
+import time
+from typing import Iterable, Optional
+from controllers.connection import Connection
+from controllers.staticFiles import FileRegion
+
+# Protocolos oferecidos no ALPN, em ordem de preferência
+DEFAULT_ALPN = ('h2', 'http/1.1')
+TLS_VERSIONS = {'1.2': ssl.TLSVersion.TLSv1_2, '1.3': ssl.TLSVersion.TLSv1_3}
+
+
+def create_tls_context(certfile: str, keyfile: Optional[str] = None, min_version: str = '1.2',
+                       ciphers: Optional[str] = None, alpn: Iterable[str] = DEFAULT_ALPN,
+                       session_tickets: int = 2) -> ssl.SSLContext:
+    """
+    Cria o contexto TLS dos sockets de escuta.
+    A retomada de sessão usa session tickets: o estado da sessão vai cifrado para o cliente,
+    que o apresenta na próxima conexão e pula o handshake completo. O módulo `ssl` não
+    configura o cache de sessões do OpenSSL no servidor (sem session id context ele não
+    guarda nada), então os tickets são o único caminho. O contexto deve ser criado antes do
+    fork dos workers: as chaves dos tickets são geradas aqui, e compartilhá-las deixa um
+    cliente retomar a sessão em qualquer worker.
+    :param certfile: Certificado (PEM), com a cadeia intermediária
+    :param keyfile: Chave privada (PEM); padrão: a que estiver no próprio `certfile`
+    :param min_version: Versão mínima do TLS (`1.2` ou `1.3`)
+    :param ciphers: Cifras do TLS 1.2 no formato do OpenSSL (as do TLS 1.3 não são configuráveis pelo `ssl`)
+    :param alpn: Protocolos oferecidos no ALPN (`h2`, `http/1.1`)
+    :param session_tickets: Tickets enviados a cada handshake do TLS 1.3 (um por conexão que o
+        cliente pode retomar em paralelo); 0 desliga os tickets, e com eles a retomada
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = TLS_VERSIONS[min_version]
+    context.load_cert_chain(certfile, keyfile)
+    if ciphers:
+        context.set_ciphers(ciphers)
+    if alpn:
+        context.set_alpn_protocols(list(alpn))
+    # Sem renegociação (TLS 1.2) e sem compressão (CRIME); ECDH novo a cada handshake
+    context.options |= ssl.OP_NO_RENEGOTIATION | ssl.OP_NO_COMPRESSION | ssl.OP_SINGLE_ECDH_USE
+    context.num_tickets = session_tickets
+    if not session_tickets:
+        context.options |= ssl.OP_NO_TICKET
+    return context
+
+
+class TlsConnection(Connection):
+    """
+    Conexão com TLS (SSLSocket criado com `do_handshake_on_connect=False`) no loop de
+    eventos do httpServer. O handshake é feito pelo loop antes da primeira leitura
+    (`handshake`); os buffers de um lote vão juntos em um único `send` (um registro TLS) e
+    os arquivos são lidos em blocos, já que sendfile enviaria os bytes sem criptografar.
+    Fica neste módulo para o módulo ssl só ser importado com TLS ligado.
+    """
+    # O OpenSSL também pode precisar ler antes de enviar (e vice-versa)
+    would_block = Connection.would_block + (ssl.SSLWantReadError, ssl.SSLWantWriteError)
+    tls = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handshaking = True
+
+    def handshake(self) -> int:
+        """
+        Avança o handshake sem bloquear. Retorna o evento do selector que o OpenSSL está
+        esperando, ou 0 quando o handshake terminou.
+
+        :raises OSError: handshake recusado (ssl.SSLError) ou conexão perdida
+        """
+        try:
+            self.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            return selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            return selectors.EVENT_WRITE
+        self.handshaking = False
+        return 0
+
+    def recv(self, size: int = 65536) -> bytes:
+        data = self.sock.recv(size)
+        # Um registro já decifrado pode ter sobrado no OpenSSL, e o selector não o vê
+        while data and self.sock.pending():
+            data += self.sock.recv(size)
+        (self.reader if self.h2 is None else self.h2).feed(data)
+        return data
+
+    def queue_buffers(self, buffers: list):
+        super().queue_buffers([buffer.iter_chunks() if isinstance(buffer, FileRegion) else buffer for buffer in buffers])
+
+    def _send(self, buffers: list) -> int:
+        return self.sock.send(buffers[0] if len(buffers) == 1 else b''.join(buffers))
+
+
+class TlsStats:
+    """
+    Contadores dos handshakes TLS: total, sessões retomadas, falhas, protocolo escolhido no
+    ALPN e versão do TLS, mais a taxa de handshakes por segundo numa janela deslizante de
+    `window` segundos (contados em baldes de um segundo).
+    Não é thread-safe: é usado pela thread do loop de eventos.
+    :param window: Segundos da janela da taxa de handshakes
+    """
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.handshakes = 0
+        self.resumed = 0
+        self.failures = 0
+        self.alpn = collections.Counter()
+        self.versions = collections.Counter()
+        # [segundo, handshakes concluídos nele]
+        self._buckets = collections.deque()
+
+    def handshake_completed(self, ssl_object, now: Optional[float] = None):
+        """
+        Registra um handshake concluído (`ssl_object`: SSLSocket ou SSLObject).
+        """
+        self.handshakes += 1
+        if ssl_object.session_reused:
+            self.resumed += 1
+        self.alpn[ssl_object.selected_alpn_protocol() or 'none'] += 1
+        self.versions[ssl_object.version()] += 1
+        second = int(time.monotonic() if now is None else now)
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([second, 1])
+        self._expire(second)
+
+    def handshake_failed(self):
+        self.failures += 1
+
+    def _expire(self, second: int):
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def handshakes_per_second(self, now: Optional[float] = None) -> float:
+        self._expire(int(time.monotonic() if now is None else now))
+        return sum(count for _, count in self._buckets) / self.window
+
+    def stats(self) -> dict:
+        return {
+            'handshakes': self.handshakes,
+            'handshakes_per_second': round(self.handshakes_per_second(), 2),
+            'resumed': self.resumed,
+            'resumption_rate': round(self.resumed / self.handshakes, 4) if self.handshakes else 0.0,
+            'failures': self.failures,
+            'alpn': dict(self.alpn),
+            'versions': dict(self.versions),
+        }
@@ -1,26 +1,99 @@
+import time
+# Início da partida para o --profile-startup, antes dos imports
+STARTED_AT = time.perf_counter()
 import sys
-from controllers.server import httpServer
 from controllers.Preprocessing import Preprocessing
+from controllers.startupProfile import StartupProfile
+from models.serverModes import serverModes
 
 
 if __name__ == '__main__':
     dict_args = Preprocessing.args_parser()
+    startup = StartupProfile(dict_args['PROFILE_STARTUP'], start=STARTED_AT)
+    startup.mark('args')
     server_port = dict_args['SERVER_PORT']
     type_server = dict_args['TYPE_SERVER']
+    workers = dict_args['WORKERS']
+    server_mode = dict_args['SERVER_MODE']
+    # Só o backend escolhido é importado: o asyncio sozinho pesa dezenas de ms na partida
+    if server_mode == serverModes.ASYNCIO.value:
+        from controllers.asyncServer import asyncHttpServer as server_class
+    else:
+        from controllers.server import httpServer as server_class
+    from controllers.accessLog import AccessLog
+    startup.mark(f'import {server_class.__module__}')
+    server_options = {
+        'pool_size': dict_args['POOL_SIZE'],
+        'queue_depth': dict_args['QUEUE_DEPTH'],
+        'static_dirs': dict_args['STATIC_DIRS'],
+        'compression': dict_args['COMPRESSION'],
+        'compress_min_size': dict_args['COMPRESS_MIN_SIZE'],
+        'compact_json': dict_args['COMPACT_JSON'],
+        'metrics': dict_args['METRICS'],
+        'access_log': AccessLog(
+                            dict_args['ACCESS_LOG'],
+                            log_format=dict_args['LOG_FORMAT'],
+                            level=dict_args['LOG_LEVEL'],
+                            sample_rate=dict_args['LOG_SAMPLE'],
+                            max_bytes=dict_args['LOG_MAX_BYTES'],
+                            ),
+        'rate_limit': dict_args['RATE_LIMIT'],
+        'rate_burst': dict_args['RATE_BURST'],
+        'max_connections_per_ip': dict_args['MAX_CONNS_PER_IP'],
+        'ipv6_prefix': dict_args['IPV6_PREFIX'],
+        'header_timeout': dict_args['HEADER_TIMEOUT'],
+        'body_timeout': dict_args['BODY_TIMEOUT'],
+        'write_timeout': dict_args['WRITE_TIMEOUT'],
+        'keepalive_timeout': dict_args['KEEPALIVE_TIMEOUT'],
+        'drain_timeout': dict_args['DRAIN_TIMEOUT'],
+        'db_shards': dict_args['DB_SHARDS'],
+        'db_indexes': dict_args['DB_INDEXES'],
+        'h2c': dict_args['H2C'],
+        'startup_profile': startup,
+    }
+    if dict_args['TLS_CERT']:
+        from controllers.tls import create_tls_context
+        # Criado antes do fork: os workers compartilham as chaves dos session tickets
+        server_options['tls_context'] = create_tls_context(
+                                    dict_args['TLS_CERT'],
+                                    dict_args['TLS_KEY'],
+                                    min_version=dict_args['TLS_MIN_VERSION'],
+                                    ciphers=dict_args['TLS_CIPHERS'],
+                                    alpn=dict_args['TLS_ALPN'],
+                                    session_tickets=dict_args['TLS_TICKETS'],
+                                    )
+        print(f"TLS ligado (ALPN: {', '.join(dict_args['TLS_ALPN']) or 'nenhum'})")
+        startup.mark('tls context')
     print(f"Porta: {server_port}")
     print(f"Tipo de servidor: {type_server}")
+    print(f"Modo do servidor: {server_mode}")
     # Cria o servidor de acordo com a porta e o tipo de servidor
     print(f"Iniciando servidor {type_server} na porta {server_port}")
+
+    if workers > 1:
+        print(f"Modo multi-processo com {workers} workers")
+        from controllers.database import Database
+        from controllers.supervisor import WorkerSupervisor
+        # A migração do banco para shards acontece aqui, uma vez, e não em cada worker
+        Database(shards=dict_args['DB_SHARDS']).open()
+        supervisor = WorkerSupervisor(
+                                    lambda **kwargs: server_class(port=server_port, type=type_server, **server_options, **kwargs),
+                                    workers,
+                                    )
+        supervisor.run()
+        sys.exit(0)
    
-    httpserver = httpServer(
+    httpserver = server_class(
                             port=server_port, 
                             type=type_server,
+                            **server_options,
                             )
+    # SIGTERM/SIGINT: encerramento gracioso; SIGHUP/SIGUSR2: reload sem derrubar conexões
+    httpserver.install_signal_handlers()
     try:
         print('Iniciando servidor...')
         httpserver.start()
-        
-    except KeyboardInterrupt:
+    finally:
         print('Encerrando servidor...')
         httpserver.close()
     
@@ -17,14 +17,26 @@ class HttpStatus(Enum):
     OK = 200
     CREATED = 201
     NO_CONTENT = 204
+    PARTIAL_CONTENT = 206
+    
+    # 3xx Redirection
+    NOT_MODIFIED = 304
     
     # 4xx Client Error
     BAD_REQUEST = 400
+    UNAUTHORIZED = 401
     NOT_FOUND = 404
     METHOD_NOT_ALLOWED = 405
+    REQUEST_TIMEOUT = 408
+    PAYLOAD_TOO_LARGE = 413
+    RANGE_NOT_SATISFIABLE = 416
+    TOO_MANY_REQUESTS = 429
+    REQUEST_HEADER_FIELDS_TOO_LARGE = 431
     
     # 5xx Server Error
     INTERNAL_SERVER_ERROR = 500
+    NOT_IMPLEMENTED = 501
+    SERVICE_UNAVAILABLE = 503
 
 def get_status_message(status_code: int) -> str:
     """
@@ -34,9 +46,19 @@ def get_status_message(status_code: int) -> str:
         200: "OK",
         201: "Created",
         204: "No Content",
+        206: "Partial Content",
+        304: "Not Modified",
         400: "Bad Request",
+        401: "Unauthorized",
         404: "Not Found",
         405: "Method Not Allowed",
-        500: "Internal Server Error"
+        408: "Request Timeout",
+        413: "Payload Too Large",
+        416: "Range Not Satisfiable",
+        429: "Too Many Requests",
+        431: "Request Header Fields Too Large",
+        500: "Internal Server Error",
+        501: "Not Implemented",
+        503: "Service Unavailable"
     }
     return status_messages.get(status_code, "Unknown Status")
@@ -0,0 +1,9 @@
+from enum import Enum
+class serverModes(Enum):
+    """
+    Especifica os backends de execução possíveis para o servidor.
+    Selectors: Loop de eventos próprio sobre selectors (epoll no Linux)
+    Asyncio: Loop de eventos do asyncio, com suporte a handlers async def
+    """
+    SELECTORS = 'selectors'
+    ASYNCIO = 'asyncio'